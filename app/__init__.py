@@ -1,7 +1,7 @@
 from flask import Flask
 from safrs import SAFRSAPI
 from config import Config
-from .database import db
+from .database import db, create_missing_columns, create_missing_indexes
 from .controllers.api import api_bp
 from .models import Manufacturer, ProductImage, ProductCountryRegulation
 from flask_cors import CORS
@@ -16,6 +16,13 @@ def create_app():
     with app.app_context():
         from .models import Warehouse, InventoryItem, InventoryTransaction, Product
         db.create_all()
+        create_missing_columns()
+        create_missing_indexes()
+
+        from .services.stock_rollup import ensure_stock_totals
+        from .services.product_search import create_search_index
+        ensure_stock_totals()
+        create_search_index()
 
         api = SAFRSAPI(app,
                       host=Config.HOST_SWAGGER,
@@ -37,4 +44,14 @@ def create_app():
     app.register_blueprint(pubsub_bp, url_prefix='/api/pubsub')
     app.register_blueprint(inventory_bp, url_prefix='/api/inventory')
 
+    # GET condicionales con ETag para los listados que se consultan periódicamente
+    from app.services.http_cache import init_http_cache
+    init_http_cache(app)
+
+    # Retomar las importaciones que otra instancia dejó a medias o que fallaron con reintentos
+    if Config.CSV_IMPORT_ASYNC:
+        from app.services.import_jobs import import_jobs
+        with app.app_context():
+            import_jobs.resume(app)
+
     return app
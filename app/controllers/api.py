@@ -4,4 +4,16 @@ api_bp = Blueprint("api", __name__)
 
 @api_bp.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "UP"}), 200
\ No newline at end of file
+    return jsonify({"status": "UP"}), 200
+
+@api_bp.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Aciertos, fallos y ocupación de las cachés en memoria de esta instancia"""
+    from app.services.product_catalog import product_catalog
+    from app.services.page_counts import count_cache_stats
+    from app.services.pubsub_dedupe import pubsub_dedupe
+    return jsonify({
+        "product_catalog": product_catalog.stats(),
+        "page_counts": count_cache_stats(),
+        "pubsub_dedupe": pubsub_dedupe.cache.stats()
+    }), 200
@@ -1,3 +1,70 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
 
 db = SQLAlchemy()
+
+
+def dialect_insert(table):
+    """
+    Devuelve un INSERT con soporte de ``ON CONFLICT`` para el motor en uso.
+    PostgreSQL y SQLite comparten la misma sintaxis; para otros motores
+    devuelve None y el llamador debe usar el camino fila por fila.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    return None
+
+
+# Índices únicos que no se pudieron crear (por ejemplo, por filas duplicadas); los upserts
+# con ON CONFLICT sobre sus columnas fallarían
+failed_unique_indexes = set()
+
+
+def create_missing_columns():
+    """
+    ``create_all`` no modifica las tablas que ya existían; esto les agrega
+    las columnas nulables declaradas en los modelos después de crearlas.
+    """
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            try:
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql(
+                        f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+                        f"{column.type.compile(dialect=db.engine.dialect)}"
+                    )
+            except SQLAlchemyError as e:
+                print(f"No se pudo agregar la columna {table.name}.{column.name}: {str(e)}")
+
+
+def create_missing_indexes():
+    """
+    ``create_all`` solo crea índices de las tablas nuevas; esto agrega los
+    índices declarados en los modelos a tablas que ya existían.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+                failed_unique_indexes.discard(index.name)
+            except SQLAlchemyError as e:
+                print(f"No se pudo crear el índice {index.name}: {str(e)}")
+                if index.unique:
+                    failed_unique_indexes.add(index.name)
+
+
+def unique_index_available(name):
+    """False si el índice único ``name`` no se pudo crear al iniciar."""
+    return name not in failed_unique_indexes
@@ -5,3 +5,15 @@ from .product import Product
 from .manufacturer import Manufacturer
 from .product_image import ProductImage
 from .product_country_regulation import ProductCountryRegulation
+from .import_checkpoint import ImportCheckpoint
+from .processed_message import ProcessedMessage
+from .import_job import ImportJob
+from .import_row_hash import ImportRowHash
+from .product_stock_total import ProductStockTotal
+from .warehouse_stock_total import WarehouseStockTotal
+from .inventory_snapshot import InventorySnapshot
+from .table_version import TableVersion
+from app.services import stock_rollup  # noqa: F401 registra los eventos que mantienen product_stock_totals
+from app.services import product_search  # noqa: F401 registra los eventos que mantienen el índice de búsqueda
+from app.services import write_versions  # noqa: F401 registra los eventos que versionan las tablas escritas
+from app.services import product_catalog  # noqa: F401 registra los eventos que invalidan el catálogo en caché
@@ -0,0 +1,18 @@
+import time
+from app import db
+
+# --------------------- MODELO: IMPORT_CHECKPOINTS ---------------------
+# Avance de cada importación de CSV: permite retomar un archivo desde la última fila confirmada
+class ImportCheckpoint(db.Model):
+    __tablename__ = "import_checkpoints"
+    __table_args__ = (
+        db.Index("ix_import_checkpoints_file", "bucket", "filename", "generation", unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    bucket = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(1024), nullable=False)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)  # generación del objeto en GCS
+    last_row = db.Column(db.Integer, nullable=False, default=0)  # última fila de datos confirmada
+    completed = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
+    updated_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
@@ -0,0 +1,58 @@
+import time
+from app import db
+
+# --------------------- MODELO: IMPORT_JOBS ---------------------
+# Importaciones de CSV en segundo plano; compartidas entre instancias para consultar su estado y retomarlas
+class ImportJob(db.Model):
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        db.Index("ix_import_jobs_active_key", "active_key", unique=True),
+        db.Index("ix_import_jobs_state_heartbeat", "state", "heartbeat_at"),
+    )
+    id = db.Column(db.String(32), primary_key=True)
+    bucket = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(1024), nullable=False)
+    generation = db.Column(db.String(64))  # generación del objeto en GCS, tal como llegó en el mensaje
+    source = db.Column(db.String(1024))
+    message_id = db.Column(db.String(255))  # mensaje de Pub/Sub que se registra al terminar bien
+    # Archivo del trabajo mientras está pendiente (en cola, en curso o fallido con reintentos); NULL al terminar
+    active_key = db.Column(db.String(1400))
+    state = db.Column(db.String(20), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_rejected = db.Column(db.Integer, nullable=False, default=0)
+    reject_file = db.Column(db.String(1400))
+    message = db.Column(db.Text)
+    created_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
+    started_at = db.Column(db.BigInteger)
+    finished_at = db.Column(db.BigInteger)
+    heartbeat_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))  # último avance
+
+    @staticmethod
+    def key_for(bucket, filename, generation):
+        return f"{bucket}/{filename}#{generation or ''}"
+
+    @property
+    def rows_per_second(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return round(self.rows_processed / elapsed, 2) if elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "bucket": self.bucket,
+            "filename": self.filename,
+            "generation": self.generation,
+            "state": self.state,
+            "attempts": self.attempts,
+            "rows_processed": self.rows_processed,
+            "rows_per_second": self.rows_per_second,
+            "rows_rejected": self.rows_rejected,
+            "reject_file": self.reject_file,
+            "message": self.message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
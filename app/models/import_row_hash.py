@@ -0,0 +1,17 @@
+import time
+from app import db
+
+# --------------------- MODELO: IMPORT_ROW_HASHES ---------------------
+# Huella del contenido de cada fila (sku, bodega) en la última importación de una fuente
+class ImportRowHash(db.Model):
+    __tablename__ = "import_row_hashes"
+    __table_args__ = (
+        db.Index("ix_import_row_hashes_key", "source", "sku", "warehouse_id", unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    source = db.Column(db.String(1024), nullable=False)  # origen del catálogo, por defecto bucket/archivo
+    sku = db.Column(db.String(100), nullable=False)
+    warehouse_id = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(32), nullable=False)
+    run_id = db.Column(db.String(32))  # última importación cuyo archivo traía la fila; las demás se retiran
+    updated_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
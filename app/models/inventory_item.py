@@ -6,6 +6,14 @@ from datetime import datetime
 # --------------------- MODELO: INVENTORY_ITEMS ---------------------
 class InventoryItem(SAFRSBase, db.Model):
     __tablename__ = "inventory_items"
+    # Un item por producto y bodega; necesario para los upserts masivos del CSV
+    __table_args__ = (
+        db.Index("ix_inventory_items_product_warehouse", "product_id", "warehouse_id", unique=True),
+        # Paginación por cursor ordenada por fecha de actualización
+        db.Index("ix_inventory_items_updated_at_id", "updated_at", "id"),
+        # Items de una bodega (historial de movimientos por bodega)
+        db.Index("ix_inventory_items_warehouse_id", "warehouse_id", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
     warehouse_id = db.Column(db.Integer, db.ForeignKey("warehouses.id"), nullable=False)
@@ -15,11 +23,17 @@ class InventoryItem(SAFRSBase, db.Model):
     created_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
     updated_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
 
-    warehouse = db.relationship("Warehouse", back_populates="inventory_items", lazy="joined")
+    # La carga de warehouse y transactions la decide cada endpoint (app/services/item_loading.py);
+    # un JOIN de transactions por defecto repetiría cada item por cada movimiento
+    warehouse = db.relationship("Warehouse", back_populates="inventory_items")
     product = db.relationship("Product", back_populates="items", lazy="joined")
     # Relación uno a muchos con transactions
     transactions = db.relationship("InventoryTransaction", back_populates="inventory_item",
-                                   cascade="all, delete-orphan", lazy="joined")
+                                   cascade="all, delete-orphan")
+    # Snapshots del libro (app/services/ledger_replay.py); se borran con el item y no se publican en la API
+    snapshots = db.relationship("InventorySnapshot", back_populates="inventory_item",
+                                cascade="all, delete-orphan")
+    exclude_rels = ["snapshots"]
 
     def to_dict(self):
         result = super().to_dict()
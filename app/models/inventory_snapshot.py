@@ -0,0 +1,20 @@
+import time
+from app import db
+
+# --------------------- MODELO: INVENTORY_SNAPSHOTS ---------------------
+# Cantidad de cada item según el libro de movimientos, hasta un movimiento de corte; evita recorrer todo el historial
+class InventorySnapshot(db.Model):
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        db.Index("ix_inventory_snapshots_item_cutoff", "inventory_item_id", "as_of_transaction_id", unique=True),
+        db.Index("ix_inventory_snapshots_cutoff", "as_of_transaction_id"),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    inventory_item_id = db.Column(db.Integer, db.ForeignKey("inventory_items.id", ondelete="CASCADE"),
+                                  nullable=False)
+    quantity = db.Column(db.BigInteger, nullable=False)
+    as_of_transaction_id = db.Column(db.Integer, nullable=False)  # último inventory_transactions.id incluido
+    as_of_date = db.Column(db.BigInteger, nullable=False)  # transaction_date más reciente incluido
+    created_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
+
+    inventory_item = db.relationship("InventoryItem", back_populates="snapshots")
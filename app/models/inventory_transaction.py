@@ -5,6 +5,14 @@ from app import db
 # --------------------- MODELO: INVENTORY_TRANSACTIONS ---------------------
 class InventoryTransaction(SAFRSBase, db.Model):
     __tablename__ = "inventory_transactions"
+    __table_args__ = (
+        # Cola de movimientos de un item a partir de su snapshot (repetición del libro)
+        db.Index("ix_inventory_transactions_item_id", "inventory_item_id", "id"),
+        # Historial paginado por (transaction_date, id): completo, por item y por tipo
+        db.Index("ix_inventory_transactions_date_id", "transaction_date", "id"),
+        db.Index("ix_inventory_transactions_item_date_id", "inventory_item_id", "transaction_date", "id"),
+        db.Index("ix_inventory_transactions_type_date_id", "transaction_type", "transaction_date", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     inventory_item_id = db.Column(db.Integer, db.ForeignKey("inventory_items.id"), nullable=False)
     transaction_type = db.Column(db.String(50), nullable=False)
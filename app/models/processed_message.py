@@ -0,0 +1,17 @@
+import time
+from app import db
+
+# --------------------- MODELO: PROCESSED_MESSAGES ---------------------
+# Mensajes de Pub/Sub ya confirmados, para descartar las reentregas
+class ProcessedMessage(db.Model):
+    __tablename__ = "processed_messages"
+    __table_args__ = (
+        db.Index("ix_processed_messages_object", "bucket", "filename", "generation"),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    message_id = db.Column(db.String(255), unique=True)
+    bucket = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(1024), nullable=False)
+    generation = db.Column(db.BigInteger)  # generación del objeto en GCS, si se conoce
+    completed = db.Column(db.Boolean, nullable=False, default=False)  # la importación terminó bien
+    created_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
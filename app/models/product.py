@@ -2,8 +2,10 @@ import time
 import json
 from safrs import SAFRSBase, jsonapi_rpc
 from app import db
-from sqlalchemy import func
+from sqlalchemy import event
 from app.models.inventory_item import InventoryItem
+from app.models.product_stock_total import ProductStockTotal
+from app.services.stock_totals import product_total_quantity, track_loaded_product
 from sqlalchemy import or_, and_
 
 # --------------------- MODELO: PRODUCTS --------------------------
@@ -27,11 +29,8 @@ class Product(SAFRSBase, db.Model):
 
     def to_dict(self):
         result = super().to_dict()
-        # Calculate total quantity of items
-        total_quantity = db.session.query(func.sum(InventoryItem.quantity)).filter(
-            InventoryItem.product_id == self.id
-        ).scalar() or 0
-        result['total_quantity'] = total_quantity
+        # Total de existencias; en listados se calcula para toda la página con una sola consulta
+        result['total_quantity'] = product_total_quantity(self.id)
         return result
 
     @classmethod
@@ -46,7 +45,9 @@ class Product(SAFRSBase, db.Model):
                 example: "Kit"
                 required: true
         """
-        return cls.query.filter(cls.name.ilike(f'%{name}%')).all()
+        from app.services.product_search import search_products
+        # Índice de trigramas; los resultados más parecidos al texto buscado van primero
+        return search_products(cls.query, name)
 
     @classmethod
     @jsonapi_rpc(http_methods=['GET'])
@@ -54,23 +55,22 @@ class Product(SAFRSBase, db.Model):
         """
         description: Search products by partial name match and minimum stock level
         """
-        # Subquery to get total quantity for each product
-        total_quantity = db.session.query(
-            InventoryItem.product_id,
-            func.sum(InventoryItem.quantity).label('total')
-        ).group_by(InventoryItem.product_id).subquery()
-
-        # Join with the subquery and filter by name and stock
+        from app.services.product_search import name_contains
+        # Totales mantenidos en product_stock_totals (indexados por total_quantity)
         query = cls.query.outerjoin(
-            total_quantity,
-            cls.id == total_quantity.c.product_id
+            ProductStockTotal,
+            cls.id == ProductStockTotal.product_id
         ).filter(
-            cls.name.ilike(f'%{name}%'),
+            name_contains(name),
             or_(
-                total_quantity.c.total >= min_stock,
-                total_quantity.c.total == None  # Include products with no stock if min_stock is 0
+                ProductStockTotal.total_quantity >= min_stock,
+                ProductStockTotal.total_quantity == None  # Include products with no stock if min_stock is 0
             )
         )
 
         return query.all()
 
+
+@event.listens_for(Product, 'load')
+def _track_loaded_product(target, context):
+    track_loaded_product(target.id)
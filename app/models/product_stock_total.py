@@ -0,0 +1,15 @@
+import time
+from app import db
+
+# --------------------- MODELO: PRODUCT_STOCK_TOTALS ---------------------
+# Existencias agregadas por producto; se mantiene con incrementos en cada cambio de inventory_items
+class ProductStockTotal(db.Model):
+    __tablename__ = "product_stock_totals"
+    __table_args__ = (
+        db.Index("ix_product_stock_totals_total_quantity", "total_quantity"),
+    )
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id"), primary_key=True)
+    total_quantity = db.Column(db.BigInteger, nullable=False, default=0)
+    warehouse_count = db.Column(db.Integer, nullable=False, default=0)  # bodegas con item del producto
+    warehouses_in_stock = db.Column(db.Integer, nullable=False, default=0)  # bodegas con cantidad > 0
+    updated_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
@@ -0,0 +1,8 @@
+from app import db
+
+# --------------------- MODELO: TABLE_VERSIONS ---------------------
+# Versión de escritura de cada tabla; sube en la misma transacción que la escribe (app/services/write_versions.py)
+class TableVersion(db.Model):
+    __tablename__ = "table_versions"
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,13 @@
+import time
+from app import db
+
+# --------------------- MODELO: WAREHOUSE_STOCK_TOTALS ---------------------
+# Existencias agregadas por bodega para la ocupación; se mantiene con incrementos en cada cambio de inventory_items
+class WarehouseStockTotal(db.Model):
+    __tablename__ = "warehouse_stock_totals"
+    warehouse_id = db.Column(db.Integer, db.ForeignKey("warehouses.id", ondelete="CASCADE"),
+                             primary_key=True)
+    total_quantity = db.Column(db.BigInteger, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)  # items (productos) en la bodega
+    items_in_stock = db.Column(db.Integer, nullable=False, default=0)  # items con cantidad > 0
+    updated_at = db.Column(db.BigInteger, nullable=False, default=lambda: int(time.time()))
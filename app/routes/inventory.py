@@ -1,12 +1,47 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from app.models.inventory_item import InventoryItem
 from app.models.product import Product
 from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from app import db
+from app.services.product_search import name_contains
+from app.services.pagination import InvalidCursorError, InvalidPageLimitError, cursor_links, keyset_page, page_limit
+from app.services.page_counts import InvalidTotalModeError, page_total, total_mode
+from app.services.item_loading import InvalidIncludeError, item_loading_options, requested_includes
+from app.services.fast_jsonapi import item_rows, json_response, serialize_item_rows, serialize_transaction_rows
+from app.services.inventory_export import EXPORT_FORMATS, export_rows, export_statement
+from app.services.stock_transfers import TransferError, parse_transfer_request, transfer_stock
+from app.services.stock_adjustments import AdjustmentError, apply_adjustments, parse_adjustment_request
+from app.services.ledger_replay import MAX_REPLAY_ITEMS, reconciliation_report, replay_quantities, take_snapshots
+from app.services.transaction_history import HISTORY_ORDER, history_query
+from app.services.warehouse_utilization import (
+    InvalidThresholdError, country_utilization, parse_thresholds, warehouse_utilization
+)
 from safrs import jsonapi_format_response
 
 inventory_bp = Blueprint('inventory', __name__)
 
+# Columnas de orden admitidas con page[cursor]; la última es única
+KEYSET_SORTS = {
+    'id': (InventoryItem.id,),
+    'updated_at': (InventoryItem.updated_at, InventoryItem.id)
+}
+
+def _keyset_response(query, sorts=('id',)):
+    """Página en modo cursor con el formato de SAFRS y el enlace a la siguiente en links.next"""
+    sort = request.args.get('sort', 'id')
+    if sort not in sorts:
+        return jsonify({"error": f"Unsupported sort for cursor pagination: {sort}"}), 400
+    try:
+        limit = page_limit()
+        items, next_cursor = keyset_page(query, KEYSET_SORTS[sort], request.args.get('page[cursor]'), limit)
+    except InvalidPageLimitError as e:
+        return jsonify({"error": str(e)}), 400
+    except InvalidCursorError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    # En modo cursor no se cuenta el total: meta.count y meta.total quedan en null
+    return jsonapi_format_response(items, meta={"limit": limit}, links=cursor_links(next_cursor))
+
 @inventory_bp.route('/search_by_product_name', methods=['GET'])
 def search_by_product_name():
     name = request.args.get('name')
@@ -17,13 +52,22 @@ def search_by_product_name():
     page = request.args.get('page[offset]', 0, type=int)
     limit = request.args.get('page[limit]', 250, type=int)
     
-    # Realizar la búsqueda con paginación
+    # Realizar la búsqueda con paginación; el producto se toma del JOIN de la búsqueda
+    try:
+        options = item_loading_options({'product': 'contains_eager'}, requested_includes())
+    except InvalidIncludeError as e:
+        return jsonify({"error": str(e)}), 400
     query = InventoryItem.query.join(Product).filter(Product.name == name)
-    total = query.count()
-    items = query.offset(page).limit(limit).all()
+    if 'page[cursor]' in request.args:
+        return _keyset_response(query.options(*options))
+    try:
+        total = page_total(query, ('search_by_product_name', name), total_mode())
+    except InvalidTotalModeError as e:
+        return jsonify({"error": str(e)}), 400
+    items = query.options(*options).offset(page).limit(limit).all()
     
-    # Usar el formato nativo de SAFRS
-    return jsonapi_format_response(items, page=page, limit=limit, total=total)
+    # Usar el formato nativo de SAFRS: count se publica como meta.count y meta.total
+    return jsonapi_format_response(items, meta={"offset": page, "limit": limit}, count=total)
 
 @inventory_bp.route('/search_by_product_name_partial', methods=['GET'])
 def search_by_product_name_partial():
@@ -35,77 +79,44 @@ def search_by_product_name_partial():
     page = request.args.get('page[offset]', 0, type=int)
     limit = request.args.get('page[limit]', 250, type=int)
     
-    # Realizar la búsqueda con paginación y eager loading de productos
-    query = InventoryItem.query.join(Product).filter(Product.name.ilike(f'%{name}%'))
-    total = query.count()
-    items = query.offset(page).limit(limit).all()
-    
-    # Preparar la respuesta en formato JSON:API
-    data = []
-    included = []
-    
-    for item in items:
-        item_dict = {
-            "type": "InventoryItem",
-            "id": str(item.id),
-            "attributes": {
-                "product_id": item.product_id,
-                "warehouse_id": item.warehouse_id,
-                "quantity": item.quantity,
-                "location": item.location,
-                "expiry_date": item.expiry_date,
-                "created_at": item.created_at,
-                "updated_at": item.updated_at
-            },
-            "relationships": {
-                "product": {
-                    "data": {
-                        "type": "Product",
-                        "id": str(item.product_id)
-                    }
-                }
-            }
+    # Realizar la búsqueda con paginación; se leen solo las columnas que se serializan
+    query = InventoryItem.query.join(Product).filter(name_contains(name))
+    if 'page[cursor]' in request.args:
+        try:
+            limit = page_limit()
+            rows, next_cursor = keyset_page(item_rows(query), KEYSET_SORTS['id'], request.args.get('page[cursor]'), limit)
+        except InvalidPageLimitError as e:
+            return jsonify({"error": str(e)}), 400
+        except InvalidCursorError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        links = cursor_links(next_cursor)
+        total = None
+    else:
+        # La búsqueda parcial no distingue mayúsculas, así que la clave del conteo tampoco
+        try:
+            total = page_total(query, ('search_by_product_name_partial', name.casefold()), total_mode())
+        except InvalidTotalModeError as e:
+            return jsonify({"error": str(e)}), 400
+        rows = item_rows(query).offset(page).limit(limit).all()
+        links = {
+            "self": f"/api/inventory/search_by_product_name_partial?name={name}&page[offset]={page}&page[limit]={limit}"
         }
-        
-        if item.product:
-            item_dict["attributes"]["product_name"] = item.product.name
-            item_dict["attributes"]["product_sku"] = item.product.sku
-            
-            # Agregar el producto a included
-            product_dict = {
-                "type": "Product",
-                "id": str(item.product.id),
-                "attributes": {
-                    "name": item.product.name,
-                    "sku": item.product.sku,
-                    "description": item.product.description,
-                    "unit_price": float(item.product.unit_price),
-                    "storage_conditions": item.product.storage_conditions,
-                    "delivery_time": item.product.delivery_time,
-                    "manufacturer_id": item.product.manufacturer_id,
-                    "created_at": item.product.created_at,
-                    "updated_at": item.product.updated_at
-                }
-            }
-            included.append(product_dict)
-        
-        data.append(item_dict)
     
+    # Preparar la respuesta en formato JSON:API; cada producto una sola vez en included
+    data, included = serialize_item_rows(rows)
     response = {
         "data": data,
         "included": included,
         "jsonapi": {"version": "1.0"},
-        "links": {
-            "self": f"/api/inventory/search_by_product_name_partial?name={name}&page[offset]={page}&page[limit]={limit}"
-        },
+        "links": links,
         "meta": {
-            "count": len(items),
+            "count": len(data),
             "limit": limit,
             "total": total
         }
     }
     
-    return jsonify(response)
+    return json_response(response)
 
 @inventory_bp.route('/all_items', methods=['GET'])
 def get_all_items():
@@ -114,10 +125,183 @@ def get_all_items():
     page = request.args.get('page[offset]', 0, type=int)
     limit = request.args.get('page[limit]', 250, type=int)
     
-    # Realizar la consulta con paginación
+    # Solo el producto (product_name y product_sku); bodega y movimientos únicamente con include=
+    try:
+        options = item_loading_options({'product': 'joined'}, requested_includes())
+    except InvalidIncludeError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Realizar la consulta con paginación; con page[cursor] se pagina por (id) o (updated_at, id)
     query = InventoryItem.query
-    total = query.count()
-    items = query.offset(page).limit(limit).all()
+    if 'page[cursor]' in request.args:
+        return _keyset_response(query.options(*options), sorts=('id', 'updated_at'))
+    try:
+        total = page_total(query, ('all_items',), total_mode())
+    except InvalidTotalModeError as e:
+        return jsonify({"error": str(e)}), 400
+    items = query.options(*options).offset(page).limit(limit).all()
     
-    # Usar el formato nativo de SAFRS
-    return jsonapi_format_response(items, page=page, limit=limit, total=total) 
\ No newline at end of file
+    # Usar el formato nativo de SAFRS: count se publica como meta.count y meta.total
+    return jsonapi_format_response(items, meta={"offset": page, "limit": limit}, count=total)
+
+@inventory_bp.route('/export', methods=['GET'])
+def export_items():
+    """Exporta todos los items de inventario como NDJSON o CSV en una sola respuesta por streaming"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported export format: {export_format}"}), 400
+
+    include = request.args.get('include', '')
+    if include not in ('', 'product'):
+        return jsonify({"error": f"Invalid Relationship '{include}'"}), 400
+
+    # Filtros opcionales: bodega, items actualizados desde un timestamp y columnas del producto
+    statement = export_statement(
+        warehouse_id=request.args.get('warehouse_id', type=int),
+        updated_since=request.args.get('updated_since', type=int),
+        with_product=include == 'product'
+    )
+    response = Response(stream_with_context(export_rows(statement, export_format)),
+                        mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=inventory.{export_format}'
+    return response
+
+@inventory_bp.route('/transfers', methods=['POST'])
+def transfer_items():
+    """Traslada existencias entre bodegas: todos los movimientos del lote se aplican o ninguno"""
+    try:
+        moves, user_id, notes = parse_transfer_request(request.get_json(silent=True))
+        items, transactions = transfer_stock(moves, user_id, notes)
+        # Se arma antes del commit: después los objetos expiran y leerlos costaría una consulta por item
+        result = {
+            "moves": len(moves),
+            "transactions": [transaction.id for transaction in transactions],
+            "items": [{
+                "id": item.id,
+                "product_id": item.product_id,
+                "warehouse_id": item.warehouse_id,
+                "quantity": item.quantity
+            } for item in items]
+        }
+        db.session.commit()
+    except TransferError as e:
+        db.session.rollback()
+        error = {"error": str(e)}
+        if e.move is not None:
+            error["move"] = e.move
+        return jsonify(error), e.status
+    except IntegrityError:
+        # Otro traslado creó el mismo item de destino al mismo tiempo; el lote se puede reintentar
+        db.session.rollback()
+        return jsonify({"error": "Concurrent transfer, retry"}), 409
+
+    return jsonify(result), 201
+
+@inventory_bp.route('/adjustments', methods=['POST'])
+def adjust_items():
+    """Ajusta en lote las cantidades (conteos cíclicos, descuentos de pedidos): se aplican todos o ninguno"""
+    try:
+        adjustments, user_id = parse_adjustment_request(request.get_json(silent=True))
+        quantities = apply_adjustments(adjustments, user_id)
+        db.session.commit()
+    except AdjustmentError as e:
+        db.session.rollback()
+        error = {"error": str(e)}
+        if e.details is not None:
+            error["details"] = e.details
+        return jsonify(error), e.status
+
+    return jsonify({
+        "adjustments": len(adjustments),
+        "items": [{"id": item_id, "quantity": quantity} for item_id, quantity in quantities.items()]
+    }), 200
+
+@inventory_bp.route('/ledger/snapshots', methods=['POST'])
+def snapshot_ledger():
+    """Toma snapshots de las cantidades según el libro de movimientos (pensado para un job periódico)"""
+    try:
+        count, cutoff, cutoff_date = take_snapshots()
+        db.session.commit()
+    except IntegrityError:
+        # Otra toma escribió el mismo corte al mismo tiempo
+        db.session.rollback()
+        return jsonify({"error": "Concurrent snapshot, retry"}), 409
+
+    return jsonify({"snapshots": count, "as_of_transaction_id": cutoff, "as_of_date": cutoff_date}), 200
+
+@inventory_bp.route('/ledger/quantities', methods=['GET'])
+def replay_ledger():
+    """Reconstruye desde el libro la cantidad actual o en un punto (movimiento o fecha) de los items pedidos"""
+    item_ids = request.args.getlist('inventory_item_id', type=int)
+    if not item_ids or len(item_ids) > MAX_REPLAY_ITEMS:
+        return jsonify({"error": f"Between 1 and {MAX_REPLAY_ITEMS} inventory_item_id are required"}), 400
+
+    quantities = replay_quantities(
+        item_ids,
+        as_of_transaction_id=request.args.get('as_of_transaction_id', type=int),
+        as_of_date=request.args.get('as_of_date', type=int)
+    )
+    return jsonify({
+        "items": [{"id": item_id, "quantity": quantity} for item_id, quantity in quantities.items()]
+    }), 200
+
+@inventory_bp.route('/ledger/reconciliation', methods=['GET'])
+def reconcile_ledger():
+    """Reporte de diferencias entre la cantidad de cada item y la que resulta del libro"""
+    limit = request.args.get('limit', 100, type=int)
+    if limit < 0:
+        return jsonify({"error": "limit must be non-negative"}), 400
+    report = reconciliation_report(warehouse_id=request.args.get('warehouse_id', type=int), limit=limit)
+    return jsonify(report), 200
+
+@inventory_bp.route('/transactions', methods=['GET'])
+def transaction_history():
+    """Historial de movimientos filtrado por item, bodega, tipo y rango de fechas, paginado por cursor"""
+    try:
+        limit = page_limit()
+    except InvalidPageLimitError as e:
+        return jsonify({"error": str(e)}), 400
+    # Por defecto los más recientes primero; sort=transaction_date recorre del más antiguo al más nuevo
+    sort = request.args.get('sort', '-transaction_date')
+    if sort not in ('transaction_date', '-transaction_date'):
+        return jsonify({"error": f"Unsupported sort for transaction history: {sort}"}), 400
+
+    query = history_query(
+        inventory_item_id=request.args.get('inventory_item_id', type=int),
+        warehouse_id=request.args.get('warehouse_id', type=int),
+        transaction_types=request.args.getlist('transaction_type'),
+        date_from=request.args.get('date_from', type=int),
+        date_to=request.args.get('date_to', type=int)
+    )
+    try:
+        rows, next_cursor = keyset_page(query, HISTORY_ORDER, request.args.get('page[cursor]'), limit,
+                                        descending=sort.startswith('-'))
+    except InvalidCursorError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    data = serialize_transaction_rows(rows)
+    return json_response({
+        "data": data,
+        "jsonapi": {"version": "1.0"},
+        "links": cursor_links(next_cursor),
+        "meta": {"count": len(data), "limit": limit}
+    })
+
+@inventory_bp.route('/utilization/warehouses', methods=['GET'])
+def utilization_by_warehouse():
+    """Ocupación de cada bodega; min_utilization y max_utilization (en porcentaje) filtran, p. ej. sobre el 90%"""
+    try:
+        min_utilization, max_utilization = parse_thresholds(request.args)
+    except InvalidThresholdError as e:
+        return jsonify({"error": str(e)}), 400
+    warehouses = warehouse_utilization(min_utilization, max_utilization, country=request.args.get('country'))
+    return jsonify({"warehouses": warehouses}), 200
+
+@inventory_bp.route('/utilization/countries', methods=['GET'])
+def utilization_by_country():
+    """Ocupación agregada de las bodegas de cada país, con los mismos umbrales"""
+    try:
+        min_utilization, max_utilization = parse_thresholds(request.args)
+    except InvalidThresholdError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"countries": country_utilization(min_utilization, max_utilization)}), 200
@@ -1,7 +1,10 @@
 import json
 import base64
-from flask import Blueprint, request
+from flask import Blueprint, current_app, jsonify, request
+from config import Config
 from app.services.csv_processor import CSVProcessor
+from app.services.import_jobs import import_jobs, ImportQueueFullError
+from app.services.pubsub_dedupe import pubsub_dedupe
 
 pubsub_bp = Blueprint('pubsub', __name__)
 
@@ -31,6 +34,12 @@ def process_csv():
         message = envelope['message']
         print(f"Contenido del mensaje: {message}")
 
+        # Las reentregas de un mensaje ya confirmado se descartan sin tocar el almacenamiento
+        message_id = message.get('messageId')
+        if Config.PUBSUB_DEDUPE and pubsub_dedupe.is_duplicate_message(message_id):
+            print(f"Mensaje duplicado ignorado: {message_id}")
+            return 'Duplicate message ignored', 200
+
         if not message.get('data'):
             print("Error: No se encontró 'data' en el mensaje")
             return 'No data in message', 400
@@ -67,14 +76,48 @@ def process_csv():
             print("Error: Falta el campo 'filename' en los datos")
             return 'Missing required field: filename', 400
 
+        if Config.CSV_IMPORT_PARTIAL and data['filename'].startswith(Config.CSV_REJECTS_PREFIX) \
+                and Config.CSV_REJECTS_BUCKET in ('', data['bucket']):
+            # Los archivos de rechazos se revisan a mano; importarlos de nuevo generaría rechazos en cadena
+            print(f"Archivo de rechazos ignorado: {data['filename']}")
+            return 'Reject file ignored', 200
+
         print(f"Procesando archivo: bucket={data['bucket']}, filename={data['filename']}")
+        generation = data.get('generation') or message.get('attributes', {}).get('objectGeneration')
+
+        if Config.PUBSUB_DEDUPE and pubsub_dedupe.is_completed_object(data['bucket'], data['filename'], generation):
+            print(f"Archivo ya importado: generation={generation}")
+            pubsub_dedupe.record_message(message_id, data['bucket'], data['filename'], generation)
+            return 'File already processed', 200
+
+        if Config.CSV_IMPORT_ASYNC:
+            # Guardar el trabajo en import_jobs y confirmar el mensaje antes del plazo de Pub/Sub;
+            # el mensaje se registra como procesado cuando la importación termina bien
+            try:
+                job, created = import_jobs.submit(current_app._get_current_object(),
+                                                  data['bucket'], data['filename'], generation,
+                                                  source=data.get('source'), message_id=message_id)
+            except ImportQueueFullError:
+                print("Error: La cola de importaciones está llena")
+                return 'Import queue is full', 503
+
+            print(f"Importación {'encolada' if created else 'ya registrada'}: {job.id}")
+            return jsonify({
+                "job": job.to_dict(),
+                "links": {"self": f"/api/pubsub/jobs/{job.id}"}
+            }), 202
 
         # Procesar el archivo CSV
         processor = CSVProcessor(data['bucket'], data['filename'])
         success, message = processor.process()
 
         if success:
-            print("CSV procesado exitosamente")
+            print(f"CSV procesado exitosamente: {message}")
+            if Config.PUBSUB_DEDUPE:
+                pubsub_dedupe.record_message(message_id, data['bucket'], data['filename'], generation)
+                pubsub_dedupe.mark_completed(data['bucket'], data['filename'], generation)
+            if Config.CSV_IMPORT_PARTIAL and processor.rows_rejected:
+                return f'CSV processed with {processor.rows_rejected} rejected rows: {processor.reject_file}', 200
             return 'CSV processed successfully', 200
         else:
             print(f"Error procesando CSV: {message}")
@@ -83,3 +126,10 @@ def process_csv():
     except Exception as e:
         print(f"Error inesperado: {str(e)}")
         return f'Error: {str(e)}', 500
+
+@pubsub_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
@@ -0,0 +1,94 @@
+import io
+import mmap
+import os
+
+# Tamaño por defecto de cada lectura contra el almacenamiento (1 MiB)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def open_csv_stream(blob, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8'):
+    """
+    Abre un blob como flujo de texto que se descarga y decodifica por partes.
+
+    El blob se lee en bloques de ``chunk_size`` bytes y el ``TextIOWrapper``
+    aplica un decodificador incremental, de modo que un carácter multibyte
+    partido entre dos bloques se decodifica correctamente y la memoria usada
+    no depende del tamaño del archivo. ``newline=''`` deja los saltos de línea
+    intactos, como exige el módulo ``csv``.
+    """
+    raw = blob.open('rb', chunk_size=chunk_size)
+    return io.TextIOWrapper(raw, encoding=encoding, newline='')
+
+
+class MmapReader(io.RawIOBase):
+    """Lector de solo lectura sobre un archivo mapeado en memoria."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Copia directa desde las páginas mapeadas al búfer del lector de texto
+        size = min(len(buffer), len(self._view) - self._pos)
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._map.close()
+            self._file.close()
+        super().close()
+
+
+# --------------------- BLOBS LOCALES (sin red) ---------------------
+class InMemoryBlob:
+    """Sustituto de ``google.cloud.storage.Blob`` respaldado por bytes en memoria."""
+
+    def __init__(self, name, data, generation=1):
+        self.name = name
+        self.data = data.encode('utf-8') if isinstance(data, str) else data
+        self.generation = generation
+
+    def open(self, mode='rb', chunk_size=None):
+        if mode != 'rb':
+            raise ValueError(f"Modo no soportado: {mode}")
+        return io.BytesIO(self.data)
+
+    def download_as_text(self, encoding='utf-8'):
+        return self.data.decode(encoding)
+
+    def reload(self):
+        pass
+
+
+class LocalFileBlob:
+    """Sustituto de ``google.cloud.storage.Blob`` que lee un archivo del disco mediante ``mmap``."""
+
+    def __init__(self, path, generation=None):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.generation = generation
+
+    def open(self, mode='rb', chunk_size=None):
+        if mode != 'rb':
+            raise ValueError(f"Modo no soportado: {mode}")
+        if os.path.getsize(self.path) == 0:
+            # mmap no admite archivos vacíos
+            return io.BytesIO(b'')
+        return MmapReader(self.path)
+
+    def download_as_text(self, encoding='utf-8'):
+        with open(self.path, 'r', encoding=encoding, newline='') as f:
+            return f.read()
+
+    def reload(self):
+        # La generación local es la fecha de modificación en nanosegundos
+        if self.generation is None:
+            self.generation = os.stat(self.path).st_mtime_ns
@@ -0,0 +1,134 @@
+import hashlib
+import multiprocessing
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Fila del CSV ya convertida a sus tipos; ``line`` es el número de fila de datos (desde 1)
+ParsedRow = namedtuple('ParsedRow', [
+    'line', 'sku', 'manufacturer_id', 'name', 'description', 'unit_price',
+    'storage_conditions', 'delivery_time', 'warehouse_id', 'quantity',
+    'location', 'expiry_date', 'content_hash'
+])
+
+# Fila que no pasó la validación; ``raw`` es el diccionario leído del CSV
+RejectedRow = namedtuple('RejectedRow', ['line', 'reason', 'raw'])
+
+# Columnas que forman la huella del contenido de una fila
+HASHED_COLUMNS = (
+    'sku', 'manufacturer_id', 'name', 'description', 'unit_price', 'storage_conditions',
+    'delivery_time', 'warehouse_id', 'quantity', 'location', 'expiry_date'
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def content_hash(row):
+    raw = '\x1f'.join(row[column] or '' for column in HASHED_COLUMNS)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def parse_row(line, row, with_hash=False):
+    return ParsedRow(
+        line=line,
+        sku=row['sku'],
+        manufacturer_id=int(row['manufacturer_id']),
+        name=row['name'],
+        description=row['description'],
+        unit_price=float(row['unit_price']),
+        storage_conditions=row['storage_conditions'],
+        delivery_time=int(row['delivery_time']),
+        warehouse_id=int(row['warehouse_id']),
+        quantity=int(row['quantity']),
+        location=row['location'],
+        expiry_date=int(row['expiry_date']),
+        content_hash=content_hash(row) if with_hash else None
+    )
+
+
+def validate_row(line, row, with_hash=False):
+    """Como ``parse_row`` pero devuelve ``RejectedRow`` en lugar de lanzar la excepción."""
+    if None in row:
+        return RejectedRow(line, "La fila tiene más columnas que el encabezado", row)
+    try:
+        parsed = parse_row(line, row, with_hash)
+    except KeyError as e:
+        return RejectedRow(line, f"Falta la columna {e}", row)
+    except (TypeError, ValueError) as e:
+        return RejectedRow(line, f"Valor inválido: {e}", row)
+    if not parsed.sku:
+        return RejectedRow(line, "El sku está vacío", row)
+    if parsed.quantity < 0:
+        return RejectedRow(line, "La cantidad no puede ser negativa", row)
+    return parsed
+
+
+def parse_chunk(chunk, with_hash=False, partial=False):
+    """
+    Convierte un bloque de pares (línea, fila) en ``ParsedRow``; se ejecuta en los procesos del pool.
+
+    Con ``partial`` las filas inválidas no detienen el bloque: quedan en la
+    lista como ``RejectedRow``.
+    """
+    if partial:
+        return [validate_row(line, row, with_hash) for line, row in chunk]
+    return [parse_row(line, row, with_hash) for line, row in chunk]
+
+
+def _pool_context():
+    # fork copiaría un proceso con hilos del servidor (y sus locks tomados); forkserver arranca de un proceso limpio
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _get_pool(workers):
+    # Un pool por tamaño, compartido entre importaciones para no crear procesos en cada archivo
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        return pool
+
+
+def shutdown_pools():
+    """
+    Detiene los procesos de los pools. Un proceso hijo de multiprocessing
+    (como los escenarios del benchmark) debe llamarla antes de terminar: al
+    salir espera a sus hijos antes de que se cierren los pools.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def parse_chunks(chunks, workers=0, with_hash=False, partial=False):
+    """
+    Devuelve los bloques convertidos en el mismo orden en que se leyeron.
+
+    Con ``workers`` > 1 la conversión corre en un pool de procesos y, mientras
+    el llamador escribe un bloque en la base de datos, los siguientes ya se
+    están convirtiendo. Se mantienen a lo sumo ``2 * workers`` bloques en vuelo
+    para que la memoria no dependa del tamaño del archivo. Con ``with_hash``
+    cada fila lleva además la huella de su contenido.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield parse_chunk(chunk, with_hash, partial)
+        return
+
+    pool = _get_pool(workers)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.submit(parse_chunk, chunk, with_hash, partial))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Si el escritor se detiene (error) no se sigue convirtiendo el resto
+        for future in pending:
+            future.cancel()
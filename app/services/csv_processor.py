@@ -1,69 +1,348 @@
 import csv
 import io
+import itertools
 from datetime import datetime
-from google.cloud import storage
+from google.api_core.exceptions import NotFound
+from sqlalchemy.exc import SQLAlchemyError
+from config import Config
 from app import db
+from app.database import dialect_insert, unique_index_available
 from app.models.product import Product
 from app.models.inventory_item import InventoryItem
+from app.models.import_checkpoint import ImportCheckpoint
+from app.services.blob_stream import open_csv_stream
+from app.services.storage_backends import get_storage_backend
+from app.services.csv_parsing import RejectedRow, parse_chunks
+from app.services.import_diff import ImportDiff
+from app.services.import_rejects import RejectWriter
+from app.services.stock_rollup import add_item_change, apply_stock_deltas, current_quantities
+from app.services.product_search import track_product_names
+from app.services.product_catalog import product_catalog
+
+# Índice del ON CONFLICT (product_id, warehouse_id) del modo 'bulk'
+BULK_ITEM_INDEX = 'ix_inventory_items_product_warehouse'
+
+def _chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 class CSVProcessor:
-    def __init__(self, bucket_name, filename):
+    def __init__(self, bucket_name, filename, blob=None, streaming=None, mode=None, chunk_size=None,
+                 checkpoints=None, generation=None, parse_workers=None, on_progress=None,
+                 diff=None, source=None, partial=None):
         self.bucket_name = bucket_name
         self.filename = filename
-        self.storage_client = storage.Client()
-        self.bucket = self.storage_client.bucket(bucket_name)
-        self.blob = self.bucket.blob(filename)
+        # En modo streaming el archivo se lee por bloques en lugar de descargarse completo
+        self.streaming = Config.CSV_STREAMING if streaming is None else streaming
+        # 'row' consulta fila por fila; 'bulk' resuelve y escribe cada bloque con pocas sentencias
+        self.mode = mode or Config.CSV_IMPORT_MODE
+        # El upsert de 'bulk' necesita el índice único (product_id, warehouse_id)
+        if self.mode == 'bulk' and not unique_index_available(BULK_ITEM_INDEX):
+            print(f"Falta el índice {BULK_ITEM_INDEX}; la importación usa el modo 'row'")
+            self.mode = 'row'
+        # Cada bloque se confirma por separado; con checkpoints se guarda la última fila confirmada
+        self.chunk_size = chunk_size or Config.CSV_IMPORT_CHUNK_SIZE
+        self.checkpoints = Config.CSV_IMPORT_CHECKPOINTS if checkpoints is None else checkpoints
+        self.generation = generation
+        # Procesos que convierten y validan los bloques mientras se escribe el anterior
+        self.parse_workers = Config.CSV_PARSE_WORKERS if parse_workers is None else parse_workers
+        self.rows_processed = 0
+        # Se invoca con el total de filas confirmadas después de cada bloque
+        self.on_progress = on_progress
+        # En modo diff solo se escriben las filas que cambiaron desde la importación anterior de la fuente
+        self.diff = Config.CSV_IMPORT_DIFF if diff is None else diff
+        self.source = source or f"{bucket_name}/{filename}"
+        self.rows_skipped = 0
+        self.rows_removed = 0
+        # En modo parcial las filas inválidas se rechazan sin detener la importación
+        self.partial = Config.CSV_IMPORT_PARTIAL if partial is None else partial
+        self.rows_rejected = 0
+        self.reject_file = None
+        # Sin blob explícito se usa el backend configurado (GCS, disco local o memoria)
+        self.blob = blob if blob is not None else get_storage_backend().get_blob(bucket_name, filename)
+
+    def _open_csv(self):
+        if self.streaming:
+            return open_csv_stream(self.blob, chunk_size=Config.CSV_STREAM_CHUNK_SIZE)
+        # Descargar el archivo CSV completo
+        return io.StringIO(self.blob.download_as_text())
 
     def process(self):
+        rejects = RejectWriter() if self.partial else None
         try:
-            # Descargar el archivo CSV
-            csv_content = self.blob.download_as_text()
+            checkpoint = self._load_checkpoint() if self.checkpoints else None
+            if checkpoint is not None and checkpoint.completed:
+                return True, "Archivo ya procesado anteriormente"
+            start_row = checkpoint.last_row if checkpoint is not None else 0
+            if rejects is not None and start_row:
+                self._resume_rejects(rejects, start_row)
+            import_diff = ImportDiff(self.source, self.chunk_size) if self.diff else None
+            parse_rejected = False
 
             # Procesar el CSV
-            csv_file = io.StringIO(csv_content)
-            reader = csv.DictReader(csv_file)
-
-            for row in reader:
-                # Crear o actualizar el producto
-                product = Product.query.filter_by(sku=row['sku']).first()
-                if not product:
-                    product = Product(
-                        manufacturer_id=int(row['manufacturer_id']),
-                        name=row['name'],
-                        description=row['description'],
-                        sku=row['sku'],
-                        unit_price=float(row['unit_price']),
-                        storage_conditions=row['storage_conditions'],
-                        delivery_time=int(row['delivery_time'])
-                    )
-                    db.session.add(product)
-                    db.session.flush()  # Para obtener el ID del producto
-
-                # Crear o actualizar el item de inventario
-                inventory_item = InventoryItem.query.filter_by(
-                    product_id=product.id,
-                    warehouse_id=int(row['warehouse_id'])
-                ).first()
-
-                if not inventory_item:
-                    inventory_item = InventoryItem(
-                        product_id=product.id,
-                        warehouse_id=int(row['warehouse_id']),
-                        quantity=int(row['quantity']),
-                        location=row['location'],
-                        expiry_date=int(row['expiry_date'])
-                    )
-                    db.session.add(inventory_item)
-                else:
-                    inventory_item.quantity = int(row['quantity'])
-                    inventory_item.location = row['location']
-                    inventory_item.expiry_date = int(row['expiry_date'])
-                    inventory_item.updated_at = int(datetime.now().timestamp())
-
-            # Guardar todos los cambios
-            db.session.commit()
+            with self._open_csv() as csv_file:
+                reader = csv.DictReader(csv_file)
+                # Numerar las filas de datos y saltar las ya confirmadas en una entrega anterior
+                rows = itertools.islice(enumerate(reader, start=1), start_row, None)
+                # Etapa de conversión (posiblemente en paralelo) y un único escritor en orden
+                chunks = parse_chunks(_chunked(rows, self.chunk_size), self.parse_workers,
+                                      with_hash=self.diff, partial=self.partial)
+                for parsed in chunks:
+                    rejected_before = self.rows_rejected
+                    valid = parsed
+                    if rejects is not None:
+                        valid = [row for row in parsed if not isinstance(row, RejectedRow)]
+                        for row in parsed:
+                            if isinstance(row, RejectedRow):
+                                rejects.add(row.line, row.reason, row.raw)
+                                parse_rejected = True
+
+                    changed = import_diff.changed_rows(valid) if import_diff else valid
+                    if rejects is not None:
+                        changed = self._apply_partial(changed, rejects)
+                    else:
+                        self._apply(changed)
+                    if import_diff:
+                        import_diff.store(changed)
+                        self.rows_skipped = import_diff.rows_skipped
+                    self.rows_rejected = rejects.count if rejects is not None else 0
+
+                    self.rows_processed = parsed[-1].line
+                    if checkpoint is not None:
+                        checkpoint.last_row = self.rows_processed
+                        checkpoint.updated_at = int(datetime.now().timestamp())
+
+                    # Con checkpoints los rechazos se suben antes de confirmar el bloque: si la
+                    # importación se interrumpe, la reanudación parte del archivo ya subido
+                    if checkpoint is not None and self.rows_rejected > rejected_before:
+                        self.reject_file = self._upload_rejects(rejects)
+
+                    # Guardar el bloque junto con su punto de control
+                    db.session.commit()
+                    if self.on_progress:
+                        self.on_progress(self.rows_processed)
+
+            # Las filas retiradas solo se conocen si se leyó el archivo completo en esta ejecución
+            if import_diff and start_row == 0 and not parse_rejected:
+                import_diff.remove_missing()
+                self.rows_removed = import_diff.rows_removed
+            elif import_diff and parse_rejected:
+                # Una fila ilegible puede ser la de un item vigente: no se retira nada
+                print("Hay filas rechazadas al validar: no se retiran filas ausentes")
+            elif import_diff:
+                print(f"Importación reanudada en la fila {start_row}: no se retiran filas ausentes")
+
+            if rejects is not None and rejects.count and checkpoint is None:
+                self.reject_file = self._upload_rejects(rejects)
+
+            if checkpoint is not None:
+                checkpoint.completed = True
+            if import_diff or checkpoint is not None:
+                db.session.commit()
+            if self.rows_rejected:
+                return True, f"Archivo procesado con {self.rows_rejected} filas rechazadas: {self.reject_file}"
             return True, "Archivo procesado exitosamente"
 
         except Exception as e:
             db.session.rollback()
             return False, f"Error procesando el archivo: {str(e)}"
+        finally:
+            if rejects is not None:
+                rejects.close()
+
+    def _apply(self, rows):
+        if self.mode == 'bulk':
+            if rows:
+                self._process_chunk(rows)
+        else:
+            for row in rows:
+                self._process_row(row)
+
+    def _apply_partial(self, rows, rejects):
+        """
+        Aplica el bloque dentro de un savepoint; si la base de datos rechaza
+        alguna fila, se reintenta fila por fila para aislar las culpables.
+        Devuelve las filas aplicadas.
+        """
+        try:
+            with db.session.begin_nested():
+                self._apply(rows)
+            return rows
+        except SQLAlchemyError:
+            pass
+
+        applied = []
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    self._apply([row])
+                applied.append(row)
+            except SQLAlchemyError as e:
+                reason = str(getattr(e, 'orig', None) or e)
+                rejects.add(row.line, f"Error de base de datos: {reason}", row._asdict())
+        return applied
+
+    def _rejects_location(self):
+        # Con checkpoints la generación ya se conoce: cada reanudación usa el mismo archivo
+        bucket_name = Config.CSV_REJECTS_BUCKET or self.bucket_name
+        stamp = self.generation or int(datetime.now().timestamp())
+        return bucket_name, f"{Config.CSV_REJECTS_PREFIX}{self.filename}.{stamp}.rejects.csv"
+
+    def _upload_rejects(self, rejects):
+        bucket_name, filename = self._rejects_location()
+        path = rejects.upload(get_storage_backend(), bucket_name, filename)
+        print(f"{rejects.count} filas rechazadas guardadas en {path}")
+        return path
+
+    def _resume_rejects(self, rejects, start_row):
+        """Recupera los rechazos de los bloques confirmados en una ejecución anterior."""
+        bucket_name, filename = self._rejects_location()
+        try:
+            text = get_storage_backend().get_blob(bucket_name, filename).download_as_text()
+        except (FileNotFoundError, NotFound):
+            return
+        rejects.load(text, start_row)
+        self.rows_rejected = rejects.count
+        if rejects.count:
+            self.reject_file = f"{bucket_name}/{filename}"
+
+    def _load_checkpoint(self):
+        generation = self._blob_generation()
+        checkpoint = db.session.query(ImportCheckpoint).filter_by(
+            bucket=self.bucket_name,
+            filename=self.filename,
+            generation=generation
+        ).first()
+        if not checkpoint:
+            checkpoint = ImportCheckpoint(
+                bucket=self.bucket_name,
+                filename=self.filename,
+                generation=generation
+            )
+            db.session.add(checkpoint)
+        return checkpoint
+
+    def _blob_generation(self):
+        # La generación identifica la versión del objeto; un archivo re-subido empieza de cero
+        if self.generation is None:
+            self.blob.reload()
+            self.generation = self.blob.generation or 0
+        return int(self.generation)
+
+    def _process_row(self, row):
+        # Crear o actualizar el producto; el id existente se resuelve con el catálogo en caché
+        product = product_catalog.get_by_sku(row.sku)
+        if not product:
+            product = Product(
+                manufacturer_id=row.manufacturer_id,
+                name=row.name,
+                description=row.description,
+                sku=row.sku,
+                unit_price=row.unit_price,
+                storage_conditions=row.storage_conditions,
+                delivery_time=row.delivery_time
+            )
+            db.session.add(product)
+            db.session.flush()  # Para obtener el ID del producto
+
+        # Crear o actualizar el item de inventario
+        inventory_item = InventoryItem.query.filter_by(
+            product_id=product.id,
+            warehouse_id=row.warehouse_id
+        ).first()
+
+        if not inventory_item:
+            inventory_item = InventoryItem(
+                product_id=product.id,
+                warehouse_id=row.warehouse_id,
+                quantity=row.quantity,
+                location=row.location,
+                expiry_date=row.expiry_date
+            )
+            db.session.add(inventory_item)
+        else:
+            inventory_item.quantity = row.quantity
+            inventory_item.location = row.location
+            inventory_item.expiry_date = row.expiry_date
+            inventory_item.updated_at = int(datetime.now().timestamp())
+
+    def _process_chunk(self, rows):
+        product_insert = dialect_insert(Product.__table__)
+        item_insert = dialect_insert(InventoryItem.__table__)
+        if product_insert is None or item_insert is None:
+            # Motor sin ON CONFLICT: se procesa fila por fila
+            for row in rows:
+                self._process_row(row)
+            return
+
+        now = int(datetime.now().timestamp())
+
+        # Resolver todos los SKU del bloque con una sola consulta IN
+        rows_by_sku = {}
+        for row in rows:
+            rows_by_sku.setdefault(row.sku, row)
+        product_ids = product_catalog.ids_by_sku(rows_by_sku.keys())
+
+        # Insertar en un solo lote los productos que no existen
+        missing = [self._product_values(row, now)
+                   for sku, row in rows_by_sku.items() if sku not in product_ids]
+        if missing:
+            db.session.execute(product_insert.on_conflict_do_nothing(index_elements=['sku']), missing)
+            product_ids.update(product_catalog.ids_by_sku([values['sku'] for values in missing]))
+            track_product_names(db.session, [(product_ids[values['sku']], values['name']) for values in missing])
+
+        # Upsert de los items; si el bloque repite producto y bodega gana la última fila
+        items = {}
+        for row in rows:
+            items[(product_ids[row.sku], row.warehouse_id)] = self._item_values(row, product_ids[row.sku], now)
+
+        # Cantidades previas para actualizar los totales por producto y por bodega con la diferencia
+        previous = current_quantities(items.keys())
+        deltas = {}
+        for (product_id, warehouse_id), values in items.items():
+            add_item_change(deltas, product_id, warehouse_id, previous.get((product_id, warehouse_id)), values['quantity'])
+
+        excluded = item_insert.excluded
+        upsert = item_insert.on_conflict_do_update(
+            index_elements=['product_id', 'warehouse_id'],
+            set_={
+                'quantity': excluded.quantity,
+                'location': excluded.location,
+                'expiry_date': excluded.expiry_date,
+                'updated_at': excluded.updated_at
+            }
+        )
+        db.session.execute(upsert, list(items.values()))
+        apply_stock_deltas(deltas)
+
+    @staticmethod
+    def _product_values(row, now):
+        return {
+            'manufacturer_id': row.manufacturer_id,
+            'name': row.name,
+            'description': row.description,
+            'sku': row.sku,
+            'unit_price': row.unit_price,
+            'storage_conditions': row.storage_conditions,
+            'delivery_time': row.delivery_time,
+            'created_at': now,
+            'updated_at': now
+        }
+
+    @staticmethod
+    def _item_values(row, product_id, now):
+        return {
+            'product_id': product_id,
+            'warehouse_id': row.warehouse_id,
+            'quantity': row.quantity,
+            'location': row.location,
+            'expiry_date': row.expiry_date,
+            'created_at': now,
+            'updated_at': now
+        }
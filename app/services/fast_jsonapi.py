@@ -0,0 +1,131 @@
+import json
+from flask import Response
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_transaction import InventoryTransaction
+from app.models.product import Product
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+# Columnas de la fila plana (item y su producto) que se serializa sin instanciar modelos
+ITEM_COLUMNS = (
+    InventoryItem.id,
+    InventoryItem.product_id,
+    InventoryItem.warehouse_id,
+    InventoryItem.quantity,
+    InventoryItem.location,
+    InventoryItem.expiry_date,
+    InventoryItem.created_at,
+    InventoryItem.updated_at
+)
+PRODUCT_COLUMNS = (
+    Product.name.label('product_name'),
+    Product.sku.label('product_sku'),
+    Product.description.label('product_description'),
+    Product.unit_price.label('product_unit_price'),
+    Product.storage_conditions.label('product_storage_conditions'),
+    Product.delivery_time.label('product_delivery_time'),
+    Product.manufacturer_id.label('product_manufacturer_id'),
+    Product.created_at.label('product_created_at'),
+    Product.updated_at.label('product_updated_at')
+)
+
+TRANSACTION_COLUMNS = (
+    InventoryTransaction.id,
+    InventoryTransaction.inventory_item_id,
+    InventoryTransaction.transaction_type,
+    InventoryTransaction.quantity,
+    InventoryTransaction.from_warehouse_id,
+    InventoryTransaction.to_warehouse_id,
+    InventoryTransaction.transaction_date,
+    InventoryTransaction.user_id,
+    InventoryTransaction.notes
+)
+
+
+def item_rows(query):
+    """Convierte una consulta de InventoryItem unida a Product en filas de columnas."""
+    return query.with_entities(*ITEM_COLUMNS, *PRODUCT_COLUMNS)
+
+
+def serialize_item_rows(rows):
+    """
+    Devuelve ``(data, included)`` en formato JSON:API a partir de filas de
+    ``item_rows``.
+
+    Cada producto aparece una sola vez en ``included`` aunque tenga
+    existencias en varias bodegas de la página.
+    """
+    data = []
+    included = {}
+    for row in rows:
+        product_id = str(row.product_id)
+        data.append({
+            "type": "InventoryItem",
+            "id": str(row.id),
+            "attributes": {
+                "product_id": row.product_id,
+                "warehouse_id": row.warehouse_id,
+                "quantity": row.quantity,
+                "location": row.location,
+                "expiry_date": row.expiry_date,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+                "product_name": row.product_name,
+                "product_sku": row.product_sku
+            },
+            "relationships": {
+                "product": {"data": {"type": "Product", "id": product_id}}
+            }
+        })
+        if product_id not in included:
+            included[product_id] = {
+                "type": "Product",
+                "id": product_id,
+                "attributes": {
+                    "name": row.product_name,
+                    "sku": row.product_sku,
+                    "description": row.product_description,
+                    "unit_price": float(row.product_unit_price),
+                    "storage_conditions": row.product_storage_conditions,
+                    "delivery_time": row.product_delivery_time,
+                    "manufacturer_id": row.product_manufacturer_id,
+                    "created_at": row.product_created_at,
+                    "updated_at": row.product_updated_at
+                }
+            }
+    return data, list(included.values())
+
+
+def serialize_transaction_rows(rows):
+    """Documentos JSON:API de movimientos a partir de filas con ``TRANSACTION_COLUMNS``."""
+    return [{
+        "type": "InventoryTransaction",
+        "id": str(row.id),
+        "attributes": {
+            "inventory_item_id": row.inventory_item_id,
+            "transaction_type": row.transaction_type,
+            "quantity": row.quantity,
+            "from_warehouse_id": row.from_warehouse_id,
+            "to_warehouse_id": row.to_warehouse_id,
+            "transaction_date": row.transaction_date,
+            "user_id": row.user_id,
+            "notes": row.notes
+        },
+        "relationships": {
+            "inventory_item": {"data": {"type": "InventoryItem", "id": str(row.inventory_item_id)}}
+        }
+    } for row in rows]
+
+
+def dumps(document):
+    """Codifica ``document`` a bytes JSON con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.dumps(document)
+    return json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_response(document, status=200):
+    return Response(dumps(document), status=status, mimetype='application/json')
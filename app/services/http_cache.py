@@ -0,0 +1,73 @@
+import hashlib
+from flask import g, request
+from config import Config
+from app.services.write_versions import table_versions
+
+# Tablas de las que depende cada ruta de lectura, por prefijo de la ruta
+ETAG_ROUTES = (
+    # Antes que /api/inventory/: gana el primer prefijo que coincide
+    ('/api/inventory/transactions', ('inventory_transactions',)),
+    ('/api/inventory/ledger/', ('inventory_items', 'inventory_transactions', 'inventory_snapshots')),
+    ('/api/inventory/utilization/', ('warehouses', 'inventory_items', 'warehouse_stock_totals')),
+    # include=warehouse,transactions agrega bodegas y movimientos a los items
+    ('/api/inventory/', ('inventory_items', 'products', 'warehouses', 'inventory_transactions')),
+    ('/api/inventory_items', ('inventory_items', 'products', 'warehouses', 'inventory_transactions')),
+    # total_quantity de cada producto sale de los items; include= agrega fabricante, imágenes y regulaciones
+    ('/api/products', ('products', 'inventory_items', 'manufacturers', 'product_images',
+                       'product_country_regulations'))
+)
+
+
+def route_tables(path):
+    for prefix, tables in ETAG_ROUTES:
+        if path.startswith(prefix):
+            return tables
+    return None
+
+
+def compute_etag(full_path, tables):
+    """
+    ETag de ``full_path`` (ruta y parámetros) a partir de las versiones de
+    escritura de ``tables``.
+
+    Las versiones se guardan en la base y suben en la misma transacción que
+    escribe la tabla, así todas las instancias calculan el mismo ETag y una
+    escritura confirmada en cualquiera lo cambia de inmediato. Se publica
+    débil (W/): no garantiza igualdad byte a byte de la respuesta.
+    """
+    key = f"{table_versions(tables)}:{full_path}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _cache_control(response):
+    # El cliente revalida siempre con If-None-Match; la CDN responde sola durante s-maxage
+    response.headers['Cache-Control'] = f"public, max-age=0, s-maxage={Config.HTTP_CACHE_MAX_AGE}"
+
+
+def init_http_cache(app):
+    """Registra en ``app`` los GET condicionales (ETag / If-None-Match) de las rutas de ETAG_ROUTES."""
+
+    @app.before_request
+    def _check_if_none_match():
+        if not Config.HTTP_ETAGS or request.method not in ('GET', 'HEAD'):
+            return None
+        tables = route_tables(request.path)
+        if tables is None:
+            return None
+        # Se calcula antes de consultar: una escritura intermedia cambia el ETag de la siguiente petición.
+        # La lectura de las versiones es la única consulta de un 304
+        g.etag = compute_etag(request.full_path, tables)
+        if request.if_none_match.contains_weak(g.etag):
+            response = app.response_class(status=304)
+            response.set_etag(g.etag, weak=True)
+            _cache_control(response)
+            return response
+        return None
+
+    @app.after_request
+    def _add_etag(response):
+        etag = g.pop('etag', None)
+        if etag is not None and response.status_code == 200:
+            response.set_etag(etag, weak=True)
+            _cache_control(response)
+        return response
@@ -0,0 +1,131 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import bindparam, delete, or_, tuple_, update
+from app import db
+from app.database import dialect_insert
+from app.models.product import Product
+from app.models.inventory_item import InventoryItem
+from app.models.import_row_hash import ImportRowHash
+from app.services.stock_rollup import add_item_change, apply_stock_deltas, current_quantities
+
+
+class ImportDiff:
+    """
+    Compara cada fila del CSV con la huella guardada en la importación anterior
+    de la misma fuente, para escribir solo las filas nuevas o modificadas.
+
+    Cada huella vista en el archivo se marca con el ``run_id`` de esta
+    importación; al terminar, las huellas de la fuente con otra marca son las
+    filas retiradas: su existencia queda en 0 (el item no se borra para
+    conservar su historial de transacciones) y se elimina su huella. Las
+    claves vistas no se guardan en memoria.
+    """
+
+    def __init__(self, source, chunk_size=1000):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.run_id = uuid.uuid4().hex
+        self.rows_skipped = 0
+        self.rows_removed = 0
+
+    def changed_rows(self, rows):
+        # Si el bloque repite (sku, bodega) cuenta la última fila
+        latest = {}
+        for row in rows:
+            latest[(row.sku, row.warehouse_id)] = row
+        if latest:
+            # Las filas sin cambios (y las que luego se rechacen) siguen vigentes; las nuevas se marcan al guardarlas
+            db.session.execute(update(ImportRowHash.__table__).where(
+                ImportRowHash.__table__.c.source == self.source,
+                tuple_(ImportRowHash.__table__.c.sku, ImportRowHash.__table__.c.warehouse_id).in_(list(latest))
+            ).values(run_id=self.run_id))
+
+        previous = {
+            (sku, warehouse_id): content_hash
+            for sku, warehouse_id, content_hash in db.session.query(
+                ImportRowHash.sku, ImportRowHash.warehouse_id, ImportRowHash.content_hash
+            ).filter(
+                ImportRowHash.source == self.source,
+                ImportRowHash.sku.in_({sku for sku, _ in latest})
+            )
+        }
+        changed = [row for key, row in latest.items() if previous.get(key) != row.content_hash]
+        self.rows_skipped += len(rows) - len(changed)
+        return changed
+
+    def store(self, rows):
+        if not rows:
+            return
+        now = int(datetime.now().timestamp())
+        values = [{
+            'source': self.source,
+            'sku': row.sku,
+            'warehouse_id': row.warehouse_id,
+            'content_hash': row.content_hash,
+            'run_id': self.run_id,
+            'updated_at': now
+        } for row in rows]
+
+        insert = dialect_insert(ImportRowHash.__table__)
+        if insert is not None:
+            db.session.execute(insert.on_conflict_do_update(
+                index_elements=['source', 'sku', 'warehouse_id'],
+                set_={'content_hash': insert.excluded.content_hash, 'run_id': insert.excluded.run_id,
+                      'updated_at': insert.excluded.updated_at}
+            ), values)
+            return
+
+        for value in values:
+            row_hash = db.session.query(ImportRowHash).filter_by(
+                source=self.source, sku=value['sku'], warehouse_id=value['warehouse_id']
+            ).first()
+            if row_hash:
+                row_hash.content_hash = value['content_hash']
+                row_hash.run_id = self.run_id
+                row_hash.updated_at = now
+            else:
+                db.session.add(ImportRowHash(**value))
+
+    def remove_missing(self):
+        """Retira las filas de la importación anterior que no aparecieron en este archivo."""
+        now = int(datetime.now().timestamp())
+        missing = db.session.query(ImportRowHash.sku, ImportRowHash.warehouse_id).filter(
+            ImportRowHash.source == self.source,
+            or_(ImportRowHash.run_id.is_(None), ImportRowHash.run_id != self.run_id)
+        ).order_by(ImportRowHash.id).limit(self.chunk_size)
+
+        # Cada bloque borra sus huellas: la siguiente consulta trae las que siguen
+        while True:
+            chunk = missing.all()
+            if not chunk:
+                break
+            product_ids = {
+                sku: product_id
+                for sku, product_id in db.session.query(Product.sku, Product.id).filter(
+                    Product.sku.in_({sku for sku, _ in chunk})
+                )
+            }
+            items = [{'b_product_id': product_ids[sku], 'b_warehouse_id': warehouse_id}
+                     for sku, warehouse_id in chunk if sku in product_ids]
+            if items:
+                previous = current_quantities((item['b_product_id'], item['b_warehouse_id']) for item in items)
+                deltas = {}
+                for (product_id, warehouse_id), quantity in previous.items():
+                    add_item_change(deltas, product_id, warehouse_id, quantity, 0)
+                db.session.execute(
+                    update(InventoryItem.__table__).where(
+                        InventoryItem.__table__.c.product_id == bindparam('b_product_id'),
+                        InventoryItem.__table__.c.warehouse_id == bindparam('b_warehouse_id')
+                    ).values(quantity=0, updated_at=now),
+                    items
+                )
+                apply_stock_deltas(deltas)
+            db.session.execute(
+                delete(ImportRowHash.__table__).where(
+                    ImportRowHash.__table__.c.source == self.source,
+                    ImportRowHash.__table__.c.sku == bindparam('b_sku'),
+                    ImportRowHash.__table__.c.warehouse_id == bindparam('b_warehouse_id')
+                ),
+                [{'b_sku': sku, 'b_warehouse_id': warehouse_id} for sku, warehouse_id in chunk]
+            )
+            self.rows_removed += len(chunk)
@@ -0,0 +1,197 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from app import db
+from app.models.import_job import ImportJob
+from app.services.csv_processor import CSVProcessor
+from app.services.pubsub_dedupe import pubsub_dedupe
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class ImportQueueFullError(Exception):
+    """No hay cupo para encolar más importaciones en esta instancia."""
+
+
+class ImportJobManager:
+    """
+    Ejecuta las importaciones de CSV en un pool acotado de hilos; los
+    trabajos se guardan en ``import_jobs`` antes de confirmar el mensaje.
+
+    Un archivo (bucket, nombre y generación) tiene a lo sumo un trabajo
+    pendiente, por el índice único de ``active_key``: las reentregas de
+    Pub/Sub reciben el mismo trabajo en lugar de lanzar otro, aunque lleguen
+    a otra instancia. Un trabajo fallido conserva el archivo hasta agotar
+    ``max_attempts`` intentos, y uno en cola o en curso sin avances durante
+    ``stale_after`` segundos se da por abandonado (su instancia se detuvo).
+    ``resume`` retoma ambos al iniciar la instancia; una reentrega del mismo
+    archivo también los retoma.
+    """
+
+    def __init__(self, max_workers, max_queued, max_attempts=3, stale_after=900):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='csv-import')
+        # Trabajos en cola o en curso en esta instancia: id -> Future
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def submit(self, app, bucket, filename, generation=None, source=None, message_id=None):
+        """Registra la importación, la encola y devuelve ``(job, created)``."""
+        key = ImportJob.key_for(bucket, filename, generation)
+        while True:
+            job = db.session.query(ImportJob).filter_by(active_key=key).first()
+            if job is not None:
+                # Reentrega: se retoma aquí si el trabajo quedó abandonado o fallido
+                if self._claimable(job):
+                    self._check_capacity()
+                    heartbeat = self._claim(job)
+                    if heartbeat is not None:
+                        print(f"Importación {job.id} retomada")
+                        self._enqueue(app, job.id, heartbeat)
+                return job, False
+
+            self._check_capacity()
+            job = ImportJob(id=uuid.uuid4().hex, bucket=bucket, filename=filename, generation=generation,
+                            source=source, message_id=message_id, active_key=key, state=QUEUED,
+                            heartbeat_at=int(time.time()))
+            db.session.add(job)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Otra instancia registró el mismo archivo al mismo tiempo
+                db.session.rollback()
+                continue
+            self._enqueue(app, job.id, job.heartbeat_at)
+            return job, True
+
+    def resume(self, app):
+        """Encola en esta instancia los trabajos abandonados y los fallidos con reintentos; se llama al iniciar."""
+        cutoff = int(time.time()) - self.stale_after
+        pending = db.session.query(ImportJob).filter(
+            ImportJob.active_key.isnot(None),
+            or_(ImportJob.state == FAILED, ImportJob.heartbeat_at <= cutoff)
+        ).order_by(ImportJob.created_at).all()
+        resumed = 0
+        for job in pending:
+            if not self._claimable(job):
+                continue
+            try:
+                self._check_capacity()
+            except ImportQueueFullError:
+                break
+            heartbeat = self._claim(job)
+            if heartbeat is not None:
+                self._enqueue(app, job.id, heartbeat)
+                resumed += 1
+        if resumed:
+            print(f"{resumed} importaciones pendientes retomadas")
+        return resumed
+
+    def get(self, job_id):
+        return db.session.get(ImportJob, job_id)
+
+    def wait(self, job_id, timeout=None):
+        """Espera a que termine el trabajo si se ejecuta en esta instancia."""
+        with self._lock:
+            future = self._local.get(job_id)
+        if future is not None:
+            future.result(timeout)
+
+    def _check_capacity(self):
+        with self._lock:
+            if len(self._local) >= self.max_workers + self.max_queued:
+                raise ImportQueueFullError("Import queue is full")
+
+    def _claimable(self, job):
+        """True si el trabajo falló o quedó abandonado y no se ejecuta en esta instancia."""
+        with self._lock:
+            if job.id in self._local:
+                return False
+        return job.state == FAILED or job.heartbeat_at <= int(time.time()) - self.stale_after
+
+    def _claim(self, job):
+        """Toma el trabajo; devuelve su nuevo latido, o None si otra instancia lo tomó primero."""
+        now = int(time.time())
+        # Solo una instancia cambia el estado y el latido que leyó
+        claimed = db.session.query(ImportJob).filter_by(
+            id=job.id, state=job.state, heartbeat_at=job.heartbeat_at
+        ).update({'state': QUEUED, 'heartbeat_at': now}, synchronize_session=False)
+        db.session.commit()
+        return now if claimed else None
+
+    def _enqueue(self, app, job_id, heartbeat):
+        with self._lock:
+            future = self._executor.submit(self._run, app, job_id, heartbeat)
+            self._local[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._local.pop(job_id, None)
+
+    def _run(self, app, job_id, heartbeat):
+        with app.app_context():
+            try:
+                now = int(time.time())
+                # Si mientras esperaba en la cola otra instancia lo dio por abandonado, el latido ya cambió
+                started = db.session.query(ImportJob).filter_by(
+                    id=job_id, state=QUEUED, heartbeat_at=heartbeat
+                ).update({'state': RUNNING, 'started_at': now, 'finished_at': None, 'heartbeat_at': now,
+                          'attempts': ImportJob.attempts + 1}, synchronize_session=False)
+                db.session.commit()
+                if not started:
+                    print(f"Importación {job_id} tomada por otra instancia")
+                    return
+
+                job = db.session.get(ImportJob, job_id)
+                try:
+                    processor = CSVProcessor(job.bucket, job.filename, generation=job.generation,
+                                             source=job.source, on_progress=lambda rows: self._progress(job, rows))
+                    success, message = processor.process()
+                    job.rows_processed = processor.rows_processed
+                    job.rows_rejected = processor.rows_rejected
+                    job.reject_file = processor.reject_file
+                except Exception as e:
+                    db.session.rollback()
+                    success, message = False, f"Error: {str(e)}"
+                self._finish(job, success, message)
+            finally:
+                db.session.remove()
+
+    def _progress(self, job, rows):
+        # Se invoca después de confirmar cada bloque: el commit solo lleva el avance del trabajo
+        job.rows_processed = rows
+        job.heartbeat_at = int(time.time())
+        db.session.commit()
+
+    def _finish(self, job, success, message):
+        job.state = SUCCEEDED if success else FAILED
+        job.message = message
+        job.finished_at = job.heartbeat_at = int(time.time())
+        # Un trabajo fallido con intentos restantes conserva el archivo para retomarlo
+        if success or job.attempts >= self.max_attempts:
+            job.active_key = None
+        db.session.commit()
+        if success and Config.PUBSUB_DEDUPE:
+            # El mensaje se da por procesado solo cuando la importación terminó
+            pubsub_dedupe.record_message(job.message_id, job.bucket, job.filename, job.generation)
+            pubsub_dedupe.mark_completed(job.bucket, job.filename, job.generation)
+        print(f"Importación {job.id} terminada ({job.state}): {job.message}")
+
+
+import_jobs = ImportJobManager(
+    max_workers=Config.CSV_IMPORT_WORKERS,
+    max_queued=Config.CSV_IMPORT_QUEUE_SIZE,
+    max_attempts=Config.CSV_IMPORT_MAX_ATTEMPTS,
+    stale_after=Config.CSV_IMPORT_JOB_STALE_AFTER
+)
@@ -0,0 +1,60 @@
+import csv
+import io
+import tempfile
+from app.services.csv_parsing import HASHED_COLUMNS
+
+# Columnas del archivo de rechazos: número de fila, motivo y la fila original
+REJECT_COLUMNS = ('line', 'reason') + HASHED_COLUMNS
+
+
+class RejectWriter:
+    """
+    Acumula las filas rechazadas de una importación en un archivo temporal y
+    lo sube al almacenamiento (al final, o tras cada bloque con rechazos si
+    la importación tiene checkpoints).
+
+    El archivo conserva las columnas originales, así que una vez corregido se
+    puede volver a subir como un catálogo más: las columnas ``line`` y
+    ``reason`` se ignoran al importar.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._file = None
+        self._text = None
+        self._writer = None
+
+    def add(self, line, reason, raw):
+        if self._writer is None:
+            # A partir de 1 MiB el contenido pasa de memoria a disco
+            self._file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+b')
+            self._text = io.TextIOWrapper(self._file, encoding='utf-8', newline='')
+            self._writer = csv.DictWriter(self._text, fieldnames=REJECT_COLUMNS, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow({**{column: raw.get(column) for column in HASHED_COLUMNS},
+                               'line': line, 'reason': reason})
+        self.count += 1
+
+    def load(self, text, last_line):
+        """
+        Agrega las filas de un archivo de rechazos ya subido hasta ``last_line``
+        (las de bloques confirmados); al reanudar, las posteriores se vuelven
+        a procesar.
+        """
+        for row in csv.DictReader(io.StringIO(text)):
+            if int(row['line']) <= last_line:
+                self.add(int(row['line']), row['reason'], row)
+
+    def upload(self, backend, bucket_name, filename):
+        """Sube el archivo si hubo rechazos; devuelve la ruta ``bucket/archivo`` o None."""
+        if self._writer is None:
+            return None
+        self._text.flush()
+        self._file.seek(0)
+        backend.upload(bucket_name, filename, self._file)
+        return f"{bucket_name}/{filename}"
+
+    def close(self):
+        if self._text is not None:
+            self._text.close()
+            self._text = self._writer = self._file = None
@@ -0,0 +1,48 @@
+import csv
+import io
+from sqlalchemy import select
+from config import Config
+from app import db
+from app.models.inventory_item import InventoryItem
+from app.models.product import Product
+from app.services.fast_jsonapi import ITEM_COLUMNS, dumps
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+PRODUCT_EXPORT_COLUMNS = (Product.sku.label('product_sku'), Product.name.label('product_name'))
+
+
+def export_statement(warehouse_id=None, updated_since=None, with_product=False):
+    """SELECT de los items a exportar ordenados por id, con filtros opcionales."""
+    columns = ITEM_COLUMNS + (PRODUCT_EXPORT_COLUMNS if with_product else ())
+    statement = select(*columns).order_by(InventoryItem.id)
+    if with_product:
+        statement = statement.join(Product, Product.id == InventoryItem.product_id)
+    if warehouse_id is not None:
+        statement = statement.where(InventoryItem.warehouse_id == warehouse_id)
+    if updated_since is not None:
+        statement = statement.where(InventoryItem.updated_at >= updated_since)
+    # yield_per usa un cursor del lado del servidor en PostgreSQL y entrega las filas por bloques
+    return statement.execution_options(yield_per=Config.EXPORT_BATCH_SIZE)
+
+
+def export_rows(statement, export_format):
+    """
+    Genera el contenido de la exportación por bloques de ``EXPORT_BATCH_SIZE``
+    filas; la memoria usada no depende del tamaño del inventario.
+    """
+    result = db.session.execute(statement)
+    keys = list(result.keys())
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(keys)
+        for partition in result.partitions():
+            writer.writerows(partition)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    else:
+        for partition in result.partitions():
+            yield b''.join(dumps(dict(zip(keys, row))) + b'\n' for row in partition)
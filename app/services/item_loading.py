@@ -0,0 +1,52 @@
+from flask import request
+from sqlalchemy.orm import contains_eager, joinedload, lazyload, noload, selectinload
+from app.models.inventory_item import InventoryItem
+
+# Relaciones de InventoryItem que se pueden pedir con include=
+ITEM_RELATIONSHIPS = {
+    'product': InventoryItem.product,
+    'warehouse': InventoryItem.warehouse,
+    'transactions': InventoryItem.transactions
+}
+# 'contains_eager' reutiliza el JOIN que la consulta ya hace (búsquedas por nombre de producto)
+LOADERS = {
+    'noload': noload,
+    'select': lazyload,
+    'selectin': selectinload,
+    'joined': joinedload,
+    'contains_eager': contains_eager
+}
+INCLUDE_ALL = '+all'
+
+
+class InvalidIncludeError(ValueError):
+    """Se pidió incluir una relación que InventoryItem no tiene."""
+
+
+def requested_includes():
+    """Relaciones de primer nivel pedidas en el parámetro ``include`` de la petición."""
+    included = {path.split('.')[0] for path in request.args.get('include', '').split(',') if path}
+    if INCLUDE_ALL in included:
+        return set(ITEM_RELATIONSHIPS)
+    unknown = included.difference(ITEM_RELATIONSHIPS)
+    if unknown:
+        raise InvalidIncludeError(f"Invalid Relationship '{sorted(unknown)[0]}'")
+    return included
+
+
+def item_loading_options(defaults, included=()):
+    """
+    Opciones de carga de las relaciones de InventoryItem para un endpoint.
+
+    ``defaults`` indica la estrategia de las relaciones que el endpoint usa
+    siempre; las pedidas en ``included`` se cargan por adelantado (las de
+    uno a muchos con ``selectin``, en una consulta aparte, para no
+    multiplicar las filas de la página) y el resto no se carga.
+    """
+    options = []
+    for name, attribute in ITEM_RELATIONSHIPS.items():
+        strategy = defaults.get(name, 'noload')
+        if name in included and strategy == 'noload':
+            strategy = 'selectin' if attribute.property.uselist else 'joined'
+        options.append(LOADERS[strategy](attribute))
+    return options
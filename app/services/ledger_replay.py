@@ -0,0 +1,188 @@
+import heapq
+import time
+from sqlalchemy import and_, case, func, insert, literal, select, union_all
+from config import Config
+from app import db
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_snapshot import InventorySnapshot
+from app.models.inventory_transaction import InventoryTransaction
+
+# Tipos de movimiento que descuentan existencias; el resto suma su cantidad tal cual
+# (IN y TRANSFER_IN la guardan positiva, ADJUSTMENT guarda el delta con signo)
+OUTBOUND_TYPES = ('OUT', 'TRANSFER_OUT')
+# Items máximos por consulta de cantidades repetidas
+MAX_REPLAY_ITEMS = 1000
+
+_items = InventoryItem.__table__
+_snapshots = InventorySnapshot.__table__
+_transactions = InventoryTransaction.__table__
+
+_signed_quantity = case(
+    (_transactions.c.transaction_type.in_(OUTBOUND_TYPES), -_transactions.c.quantity),
+    else_=_transactions.c.quantity
+)
+
+
+def latest_cutoff(as_of_transaction_id=None, as_of_date=None):
+    """
+    ``(as_of_transaction_id, as_of_date)`` de la última toma de snapshots que
+    no pasa del punto pedido; ``(0, 0)`` si no hay ninguna.
+
+    Cada toma cubre todos los movimientos hasta su corte y los cortes y las
+    fechas solo crecen, así que la última toma anterior al punto sirve de base
+    para todos los items.
+    """
+    query = select(func.max(_snapshots.c.as_of_transaction_id), func.max(_snapshots.c.as_of_date))
+    if as_of_transaction_id is not None:
+        query = query.where(_snapshots.c.as_of_transaction_id <= as_of_transaction_id)
+    if as_of_date is not None:
+        query = query.where(_snapshots.c.as_of_date <= as_of_date)
+    cutoff, cutoff_date = db.session.execute(query).one()
+    return cutoff or 0, cutoff_date or 0
+
+
+def _snapshot_part(cutoff, item_ids=None):
+    """Último snapshot de cada item hasta el corte (los items sin movimientos nuevos conservan uno anterior)."""
+    latest = select(
+        _snapshots.c.inventory_item_id,
+        func.max(_snapshots.c.as_of_transaction_id).label('as_of_transaction_id')
+    ).where(_snapshots.c.as_of_transaction_id <= cutoff)
+    if item_ids is not None:
+        latest = latest.where(_snapshots.c.inventory_item_id.in_(item_ids))
+    latest = latest.group_by(_snapshots.c.inventory_item_id).subquery()
+    return select(_snapshots.c.inventory_item_id, _snapshots.c.quantity).join(latest, and_(
+        latest.c.inventory_item_id == _snapshots.c.inventory_item_id,
+        latest.c.as_of_transaction_id == _snapshots.c.as_of_transaction_id
+    ))
+
+
+def _tail_part(cutoff, as_of_transaction_id=None, as_of_date=None, item_ids=None):
+    """Movimientos posteriores al corte, con signo; un rango del índice primario en lugar de toda la tabla."""
+    query = select(_transactions.c.inventory_item_id, _signed_quantity.label('quantity')).where(
+        _transactions.c.id > cutoff
+    )
+    if as_of_transaction_id is not None:
+        query = query.where(_transactions.c.id <= as_of_transaction_id)
+    if as_of_date is not None:
+        query = query.where(_transactions.c.transaction_date <= as_of_date)
+    if item_ids is not None:
+        query = query.where(_transactions.c.inventory_item_id.in_(item_ids))
+    return query
+
+
+def ledger_statement(as_of_transaction_id=None, as_of_date=None, item_ids=None):
+    """
+    SELECT de ``(inventory_item_id, quantity)`` según el libro: el último
+    snapshot de cada item más la cola de movimientos posteriores, hasta el
+    movimiento o la fecha indicados (o hasta hoy). Los items sin movimientos
+    no aparecen.
+    """
+    cutoff, _ = latest_cutoff(as_of_transaction_id, as_of_date)
+    parts = union_all(
+        _snapshot_part(cutoff, item_ids),
+        _tail_part(cutoff, as_of_transaction_id, as_of_date, item_ids)
+    ).subquery()
+    return select(
+        parts.c.inventory_item_id, func.sum(parts.c.quantity).label('quantity')
+    ).group_by(parts.c.inventory_item_id)
+
+
+def replay_quantities(item_ids, as_of_transaction_id=None, as_of_date=None):
+    """Cantidades de ``item_ids`` reconstruidas desde el libro; 0 para los items sin movimientos."""
+    quantities = dict.fromkeys(item_ids, 0)
+    quantities.update(db.session.execute(
+        ledger_statement(as_of_transaction_id, as_of_date, list(quantities))
+    ).all())
+    return quantities
+
+
+def take_snapshots(now=None):
+    """
+    Toma snapshots de los items con movimientos desde la toma anterior, en
+    la transacción actual y sin confirmarla.
+
+    Un solo INSERT ... SELECT suma al snapshot anterior de cada item los
+    movimientos nuevos hasta el corte: el último movimiento con más de
+    ``LEDGER_SNAPSHOT_LAG`` segundos, así no se salta uno de una transacción
+    aún sin confirmar. Devuelve ``(filas, corte, fecha del corte)``; dos tomas
+    simultáneas chocan en el índice único y la segunda falla con IntegrityError.
+    """
+    now = int(time.time()) if now is None else now
+    previous, previous_date = latest_cutoff()
+    cutoff = db.session.execute(select(func.max(_transactions.c.id)).where(
+        _transactions.c.id > previous,
+        _transactions.c.transaction_date <= now - Config.LEDGER_SNAPSHOT_LAG
+    )).scalar()
+    if cutoff is None:
+        return 0, previous, previous_date
+    # Movimientos de la cola más nuevos que el corte, pero con id menor, también entran
+    cutoff_date = max(previous_date, db.session.execute(select(func.max(_transactions.c.transaction_date)).where(
+        _transactions.c.id > previous, _transactions.c.id <= cutoff
+    )).scalar())
+
+    tail = select(
+        _transactions.c.inventory_item_id, func.sum(_signed_quantity).label('delta')
+    ).where(
+        _transactions.c.id > previous, _transactions.c.id <= cutoff
+    ).group_by(_transactions.c.inventory_item_id).subquery()
+    base = _snapshot_part(previous).subquery()
+    rows = select(
+        tail.c.inventory_item_id,
+        func.coalesce(base.c.quantity, 0) + tail.c.delta,
+        literal(cutoff),
+        literal(cutoff_date),
+        literal(now)
+    ).select_from(tail.outerjoin(base, base.c.inventory_item_id == tail.c.inventory_item_id))
+    result = db.session.execute(insert(_snapshots).from_select(
+        ['inventory_item_id', 'quantity', 'as_of_transaction_id', 'as_of_date', 'created_at'], rows
+    ))
+    return result.rowcount, cutoff, cutoff_date
+
+
+def reconciliation_report(warehouse_id=None, limit=100):
+    """
+    Compara la cantidad de cada item con la que resulta del libro.
+
+    Cantidades y libro se leen en una sola consulta, así una escritura
+    concurrente no aparece como diferencia. Devuelve los totales y los
+    ``limit`` items con mayor diferencia absoluta. Los items cargados por
+    importación de CSV sin movimientos en el libro muestran como diferencia
+    toda su cantidad.
+    """
+    ledger = ledger_statement().subquery()
+    query = select(
+        _items.c.id, _items.c.product_id, _items.c.warehouse_id, _items.c.quantity,
+        func.coalesce(ledger.c.quantity, 0).label('ledger_quantity')
+    ).select_from(_items.outerjoin(ledger, ledger.c.inventory_item_id == _items.c.id))
+    if warehouse_id is not None:
+        query = query.where(_items.c.warehouse_id == warehouse_id)
+
+    checked = drifted = total_drift = 0
+    largest = []
+    for row in db.session.execute(query.execution_options(yield_per=Config.EXPORT_BATCH_SIZE)):
+        checked += 1
+        drift = row.quantity - row.ledger_quantity
+        if not drift:
+            continue
+        drifted += 1
+        total_drift += abs(drift)
+        entry = (abs(drift), -row.id, {
+            "inventory_item_id": row.id,
+            "product_id": row.product_id,
+            "warehouse_id": row.warehouse_id,
+            "quantity": row.quantity,
+            "ledger_quantity": row.ledger_quantity,
+            "drift": drift
+        })
+        # Montículo acotado: la memoria no crece con el número de items
+        if len(largest) < limit:
+            heapq.heappush(largest, entry)
+        elif limit:
+            heapq.heappushpop(largest, entry)
+
+    return {
+        "items_checked": checked,
+        "items_with_drift": drifted,
+        "total_drift": total_drift,
+        "drift": [entry for _, _, entry in sorted(largest, key=lambda e: (e[0], e[1]), reverse=True)]
+    }
@@ -0,0 +1,102 @@
+import json
+from flask import request
+from sqlalchemy import text
+from config import Config
+from app import db
+from app.models.inventory_item import InventoryItem
+from app.models.product import Product
+from app.services.ttl_cache import TTLCache
+from app.services.write_versions import table_versions
+
+# Modos de page[total]: conteo exacto, exacto en caché, estimación del planificador o sin total
+TOTAL_MODES = ('exact', 'cached', 'estimate', 'none')
+# Tablas cuyas escrituras cambian los totales de los listados de inventario
+COUNTED_TABLES = (InventoryItem.__tablename__, Product.__tablename__)
+
+_cache = TTLCache(Config.PAGINATION_COUNT_CACHE_SIZE, Config.PAGINATION_COUNT_CACHE_TTL)
+
+
+class InvalidTotalModeError(ValueError):
+    """El modo de total pedido no existe."""
+
+
+def total_mode():
+    """Modo de total de la petición: ``page[total]`` o el configurado por defecto."""
+    mode = request.args.get('page[total]', Config.PAGINATION_TOTAL_MODE)
+    if mode not in TOTAL_MODES:
+        raise InvalidTotalModeError(f"Unsupported total mode: {mode}")
+    return mode
+
+
+def page_total(query, key, mode):
+    """
+    Total de registros de ``query`` según ``mode``.
+
+    ``key`` identifica el listado y sus filtros ya normalizados (por ejemplo
+    ``('all_items',)``) y es la clave del conteo en caché. ``estimate`` solo
+    existe en PostgreSQL; en otros motores se responde con el conteo en caché.
+    Con ``none`` no se consulta nada y el total es None.
+    """
+    if mode == 'none':
+        return None
+    if mode == 'estimate':
+        estimate = estimated_count(query)
+        if estimate is not None:
+            return estimate
+        mode = 'cached'
+    if mode == 'cached':
+        return cached_count(query, key)
+    return query.count()
+
+
+def cached_count(query, key):
+    """
+    Conteo exacto guardado por listado y filtros.
+
+    Cada entrada lleva las versiones de escritura de items y productos con
+    que se calculó (app/services/write_versions.py); una escritura confirmada
+    en cualquier instancia sube la versión y deja obsoletas todas las
+    entradas.
+    """
+    version = table_versions(COUNTED_TABLES)
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    total = query.count()
+    _cache.set(key, (version, total))
+    return total
+
+
+def estimated_count(query):
+    """
+    Filas estimadas por el planificador de PostgreSQL; None en otros motores.
+
+    Sin filtros se lee ``reltuples`` de ``pg_class`` (lo que mantiene
+    ANALYZE); con filtros se usa el ``Plan Rows`` de ``EXPLAIN``.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        return None
+    statement = query.order_by(None).statement
+    if statement.whereclause is None and len(statement.get_final_froms()) == 1:
+        table = statement.get_final_froms()[0]
+        reltuples = connection.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {'table': table.name}
+        ).scalar()
+        # -1: la tabla nunca se ha analizado
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+    compiled = statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_cache_stats():
+    return _cache.stats()
+
+
+def reset_count_cache():
+    _cache.clear()
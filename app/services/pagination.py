@@ -0,0 +1,79 @@
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+from flask import request
+from sqlalchemy import tuple_
+
+# Registros máximos por página en modo cursor
+MAX_PAGE_LIMIT = 1000
+
+
+class InvalidCursorError(ValueError):
+    """El cursor de paginación no es válido para este listado."""
+
+
+class InvalidPageLimitError(ValueError):
+    """``page[limit]`` fuera del rango admitido."""
+
+
+def page_limit(default=250):
+    """``page[limit]`` de la petición actual; entre 1 y MAX_PAGE_LIMIT."""
+    limit = request.args.get('page[limit]', default, type=int)
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise InvalidPageLimitError(f"page[limit] must be between 1 and {MAX_PAGE_LIMIT}")
+    return limit
+
+
+def encode_cursor(values):
+    """Cursor opaco con los valores de las columnas de orden del último registro de la página."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or \
+            not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        raise InvalidCursorError("Invalid cursor")
+    return values
+
+
+def keyset_page(query, columns, cursor, limit, descending=False):
+    """
+    Devuelve ``(items, next_cursor)`` de la página que sigue a ``cursor``.
+
+    En lugar de ``OFFSET`` se filtra por las columnas de orden (la última
+    debe ser única, normalmente ``id``) a partir del último registro de la
+    página anterior, así cualquier página cuesta lo mismo que la primera si
+    existe un índice sobre esas columnas. Con ``cursor`` vacío se devuelve la
+    primera página. ``next_cursor`` es None en la última página. Con
+    ``descending`` todas las columnas se recorren de mayor a menor. ``limit``
+    debe ser al menos 1 (ver ``page_limit``).
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        key = columns[0] if len(columns) == 1 else tuple_(*columns)
+        bound = values[0] if len(columns) == 1 else tuple_(*values)
+        query = query.filter(key < bound if descending else key > bound)
+
+    # Un registro extra indica si hay otra página sin contar el total
+    order = [column.desc() for column in columns] if descending else columns
+    items = query.order_by(*order).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(getattr(items[-1], column.key) for column in columns)
+
+
+def cursor_links(next_cursor):
+    """Enlaces JSON:API ``self`` y ``next`` de la petición actual en modo cursor."""
+    args = [(key, value) for key, value in request.args.items(multi=True)
+            if key not in ('page[cursor]', 'page[offset]')]
+    links = {"self": f"{request.path}?{urlencode(args + [('page[cursor]', request.args.get('page[cursor]', ''))])}"}
+    links["next"] = f"{request.path}?{urlencode(args + [('page[cursor]', next_cursor)])}" if next_cursor else None
+    return links
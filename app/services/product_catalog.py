@@ -0,0 +1,156 @@
+import threading
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from config import Config
+from app import db
+from app.models.product import Product
+from app.services.ttl_cache import TTLCache
+from app.services.write_versions import written_tables
+
+# Copia de solo lectura de un producto; no se comparten instancias del ORM entre sesiones
+CATALOG_COLUMNS = ('id', 'sku', 'name', 'manufacturer_id', 'unit_price', 'delivery_time')
+CatalogEntry = namedtuple('CatalogEntry', CATALOG_COLUMNS)
+
+
+def _entry(product):
+    return CatalogEntry(*(getattr(product, column) for column in CATALOG_COLUMNS))
+
+
+class ProductCatalog:
+    """
+    Caché de productos por id y por SKU, de tamaño acotado, con TTL y
+    desalojo LRU.
+
+    Las entradas se guardan por id; el SKU apunta al id y se comprueba al
+    leer, así invalidar un id basta aunque el SKU haya cambiado. Los cambios
+    confirmados sobre ``Product`` invalidan sus entradas (eventos al final
+    del archivo); las escrituras de otras instancias se ven al vencer el TTL.
+    Lo leído en una transacción que escribió productos no se guarda, porque
+    podría revertirse.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.cache = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key):
+        product_id = key[1] if key[0] == 'id' else self.cache.get(key)
+        entry = self.cache.get(('id', product_id)) if product_id is not None else None
+        if entry is not None and key[0] == 'sku' and entry.sku != key[1]:
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def _store(self, entries):
+        if Product.__tablename__ in written_tables(db.session):
+            return
+        for entry in entries:
+            self.cache.set(('id', entry.id), entry)
+            self.cache.set(('sku', entry.sku), entry.id)
+
+    def get_by_id(self, product_id):
+        if not Config.PRODUCT_CATALOG_CACHE:
+            product = db.session.get(Product, product_id)
+            return _entry(product) if product is not None else None
+        entry = self._cached(('id', product_id))
+        if entry is None:
+            product = db.session.get(Product, product_id)
+            if product is None:
+                return None
+            entry = _entry(product)
+            self._store([entry])
+        return entry
+
+    def get_by_sku(self, sku):
+        if not Config.PRODUCT_CATALOG_CACHE:
+            product = Product.query.filter_by(sku=sku).first()
+            return _entry(product) if product is not None else None
+        entry = self._cached(('sku', sku))
+        if entry is None:
+            product = Product.query.filter_by(sku=sku).first()
+            if product is None:
+                return None
+            entry = _entry(product)
+            self._store([entry])
+        return entry
+
+    def ids_by_sku(self, skus):
+        """Ids de los SKU que existen; los que faltan en caché se leen con una sola consulta IN."""
+        skus = list(skus)
+        ids = {}
+        if Config.PRODUCT_CATALOG_CACHE:
+            for sku in skus:
+                entry = self._cached(('sku', sku))
+                if entry is not None:
+                    ids[sku] = entry.id
+            skus = [sku for sku in skus if sku not in ids]
+        if not skus:
+            return ids
+        columns = [getattr(Product, column) for column in CATALOG_COLUMNS]
+        entries = [CatalogEntry(*row) for row in db.session.query(*columns).filter(Product.sku.in_(skus))]
+        if Config.PRODUCT_CATALOG_CACHE:
+            self._store(entries)
+        ids.update((entry.sku, entry.id) for entry in entries)
+        return ids
+
+    def invalidate(self, product_ids):
+        for product_id in product_ids:
+            self.cache.delete(('id', product_id))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                **self.cache.stats(),
+                "enabled": Config.PRODUCT_CATALOG_CACHE,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+product_catalog = ProductCatalog(Config.PRODUCT_CATALOG_CACHE_SIZE, Config.PRODUCT_CATALOG_CACHE_TTL)
+
+
+# --------------------- INVALIDACIÓN ---------------------
+@event.listens_for(Session, 'after_flush')
+def _collect_product_changes(session, flush_context):
+    changed = [inspect(product).identity[0] for product in (*session.dirty, *session.deleted)
+               if isinstance(product, Product) and inspect(product).identity is not None]
+    if changed:
+        session.info.setdefault('catalog_invalidate', set()).update(changed)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_product_changes(orm_execute_state):
+    # UPDATE/DELETE masivos: no se sabe qué filas cambian, se vacía la caché al confirmar
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name == Product.__tablename__:
+            orm_execute_state.session.info['catalog_clear'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    changed = session.info.pop('catalog_invalidate', None)
+    if session.info.pop('catalog_clear', False):
+        product_catalog.clear()
+    elif changed:
+        product_catalog.invalidate(changed)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_product_changes(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('catalog_invalidate', None)
+        session.info.pop('catalog_clear', None)
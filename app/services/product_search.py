@@ -0,0 +1,305 @@
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event, false, func, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from config import Config
+from app import db
+from app.models.product import Product
+
+# Longitud de los n-gramas; con búsquedas más cortas no hay n-grama que consultar
+NGRAM_SIZE = 3
+# Si el índice devuelve más candidatos que esto, la búsqueda no es selectiva y se usa ILIKE
+MAX_CANDIDATES = 5000
+
+
+def _normalize(value):
+    return (value or '').casefold()
+
+
+def _ngrams(value):
+    return {value[i:i + NGRAM_SIZE] for i in range(len(value) - NGRAM_SIZE + 1)}
+
+
+def similarity(query, name):
+    """Proporción de n-gramas compartidos, como ``similarity()`` de pg_trgm."""
+    a, b = _ngrams(_normalize(query)), _ngrams(_normalize(name))
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NgramIndex:
+    """
+    Índice invertido en memoria de n-gramas de ``products.name``.
+
+    Para motores sin pg_trgm: una búsqueda intersecta las listas de los
+    n-gramas de la consulta (empezando por la más corta) y confirma la
+    subcadena en el nombre normalizado, así el resultado coincide con
+    ``ILIKE '%consulta%'``.
+    """
+
+    def __init__(self):
+        self.names = {}
+        self.sizes = {}
+        self.postings = {}
+        self.built_at = None
+        self._lock = threading.RLock()
+        # Cambios confirmados mientras se construye; se aplican otra vez sobre el índice nuevo
+        self._pending = None
+
+    def build(self, rows):
+        """
+        Construye el índice desde ``rows`` (id, nombre) sin bloquear las
+        búsquedas, que siguen usando el anterior hasta el reemplazo.
+        """
+        with self._lock:
+            self._pending = []
+        built = NgramIndex()
+        try:
+            for product_id, name in rows:
+                built._add(product_id, name)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            self.names, self.sizes, self.postings = built.names, built.sizes, built.postings
+            for product_id, name in self._pending:
+                self._update(product_id, name)
+            self._pending = None
+            self.built_at = time.monotonic()
+
+    def update(self, product_id, name):
+        """Indexa (o reindexa) un producto; con ``name`` None lo elimina."""
+        with self._lock:
+            self._update(product_id, name)
+            if self._pending is not None:
+                self._pending.append((product_id, name))
+
+    def _update(self, product_id, name):
+        self._remove(product_id)
+        if name is not None:
+            self._add(product_id, name)
+
+    def _add(self, product_id, name):
+        normalized = _normalize(name)
+        grams = _ngrams(normalized)
+        self.names[product_id] = normalized
+        self.sizes[product_id] = len(grams)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(product_id)
+
+    def _remove(self, product_id):
+        normalized = self.names.pop(product_id, None)
+        if normalized is None:
+            return
+        del self.sizes[product_id]
+        for gram in _ngrams(normalized):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, query, ranked=True):
+        """
+        Ids cuyo nombre contiene ``query``; None si la consulta es más corta que un n-grama.
+
+        Con ``ranked`` se ordenan de mayor a menor similitud con la consulta.
+        """
+        query = _normalize(query)
+        grams = _ngrams(query)
+        if not grams:
+            return None
+        with self._lock:
+            lists = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+            candidates = set(lists[0])
+            for ids in lists[1:]:
+                candidates &= ids
+                if not candidates:
+                    break
+            matches = [product_id for product_id in candidates if query in self.names[product_id]]
+            if ranked:
+                # Todos los n-gramas de la consulta están en cada coincidencia, así que la
+                # similitud es n-gramas(consulta) / n-gramas(nombre): gana el nombre con menos
+                matches.sort(key=lambda product_id: (self.sizes[product_id], product_id))
+        return matches
+
+    def __len__(self):
+        return len(self.names)
+
+
+_index = NgramIndex()
+_index_lock = threading.Lock()
+_rebuilding = False
+# pg_trgm y el índice GIN existen; None mientras no se ha comprobado
+_trigram_ready = None
+
+
+def search_engine():
+    """'trigram' (pg_trgm), 'ngram' (índice en memoria) o 'ilike' según configuración y motor."""
+    engine = Config.PRODUCT_SEARCH_ENGINE
+    if engine == 'auto':
+        # Se decide por la URL configurada, sin abrir una conexión
+        uri = current_app.config.get('SQLALCHEMY_DATABASE_URI') if has_app_context() else None
+        backend = make_url(uri or Config.SQLALCHEMY_DATABASE_URI).get_backend_name()
+        engine = 'trigram' if backend == 'postgresql' else 'ngram'
+    # Sin pg_trgm, similarity() no existe: se busca con ILIKE
+    if engine == 'trigram' and _trigram_ready is False:
+        return 'ilike'
+    return engine
+
+
+def build_ngram_index():
+    """Construye el índice en memoria desde ``products`` en la transacción actual."""
+    _index.build(db.session.query(Product.id, Product.name).yield_per(10000))
+    return _index
+
+
+def get_ngram_index():
+    """
+    Índice en memoria, construido desde la base al primer uso.
+
+    Al vencer su TTL se reconstruye en un hilo aparte para ver las escrituras
+    de otras instancias; mientras tanto se sigue usando el anterior, que ya
+    incluye las escrituras confirmadas en esta instancia.
+    """
+    global _rebuilding
+    if _index.built_at is None:
+        with _index_lock:
+            if _index.built_at is None:
+                build_ngram_index()
+        return _index
+    with _index_lock:
+        if _rebuilding or time.monotonic() - _index.built_at <= Config.PRODUCT_SEARCH_INDEX_TTL:
+            return _index
+        _rebuilding = True
+    threading.Thread(target=_rebuild, args=(current_app._get_current_object(),),
+                     name='product-search-index', daemon=True).start()
+    return _index
+
+
+def _rebuild(app):
+    global _rebuilding
+    try:
+        with app.app_context():
+            try:
+                build_ngram_index()
+            finally:
+                db.session.remove()
+    except Exception as e:
+        print(f"No se pudo reconstruir el índice de búsqueda: {str(e)}")
+    finally:
+        with _index_lock:
+            _rebuilding = False
+
+
+def reset_ngram_index():
+    with _index_lock:
+        _index.build([])
+        _index.built_at = None
+
+
+def _ngram_ids(name, ranked=True):
+    ids = get_ngram_index().search(name, ranked)
+    if ids is None or len(ids) > MAX_CANDIDATES:
+        return None
+    return ids
+
+
+def name_contains(name):
+    """Condición equivalente a ``Product.name.ilike('%name%')`` respaldada por el índice de n-gramas."""
+    if search_engine() == 'ngram':
+        ids = _ngram_ids(name, ranked=False)
+        if ids is not None:
+            return Product.id.in_(ids) if ids else false()
+    # En PostgreSQL el índice GIN de pg_trgm atiende directamente el ILIKE
+    return Product.name.ilike(f'%{name}%')
+
+
+def search_products(query, name):
+    """Aplica el filtro por nombre a ``query`` (de Product) y ordena por relevancia."""
+    engine = search_engine()
+    if engine == 'trigram':
+        return query.filter(Product.name.ilike(f'%{name}%')).order_by(
+            func.similarity(Product.name, name).desc(), Product.id
+        ).all()
+    ids = _ngram_ids(name) if engine == 'ngram' else None
+    if ids is None:
+        products = query.filter(Product.name.ilike(f'%{name}%')).all()
+        return sorted(products, key=lambda product: (-similarity(name, product.name), product.id))
+    if not ids:
+        return []
+    rank = {product_id: position for position, product_id in enumerate(ids)}
+    products = query.filter(Product.id.in_(ids)).all()
+    return sorted(products, key=lambda product: rank[product.id])
+
+
+def create_search_index():
+    """
+    Crea la extensión pg_trgm y el índice GIN sobre ``products.name`` en
+    PostgreSQL y registra si quedaron disponibles; si no, la búsqueda usa
+    ILIKE en lugar de similarity().
+    """
+    global _trigram_ready
+    if db.engine.dialect.name != 'postgresql' or Config.PRODUCT_SEARCH_ENGINE not in ('auto', 'trigram'):
+        return
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)"
+            ))
+    except SQLAlchemyError as e:
+        print(f"No se pudo crear el índice de trigramas: {str(e)}")
+    # Sin permisos para crearlos, pudo crearlos antes un administrador
+    try:
+        with db.engine.connect() as connection:
+            _trigram_ready = connection.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') "
+                "AND EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'ix_products_name_trgm')"
+            )).scalar()
+    except SQLAlchemyError as e:
+        print(f"No se pudo comprobar el índice de trigramas: {str(e)}")
+        _trigram_ready = False
+    if not _trigram_ready:
+        print("pg_trgm no está disponible: la búsqueda por nombre usa ILIKE")
+
+
+# --------------------- ACTUALIZACIÓN DEL ÍNDICE EN MEMORIA ---------------------
+def track_product_names(session, rows):
+    """Registra (id, nombre) escritos sin el ORM; se indexan cuando la transacción se confirma."""
+    session.info.setdefault('product_search_changes', []).extend(rows)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_product_changes(session, flush_context):
+    changes = []
+    for product in session.new:
+        if isinstance(product, Product):
+            changes.append((product.id, product.name))
+    for product in session.dirty:
+        if isinstance(product, Product) and session.is_modified(product):
+            changes.append((product.id, product.name))
+    for product in session.deleted:
+        if isinstance(product, Product):
+            changes.append((inspect(product).identity[0], None))
+    if changes:
+        track_product_names(session, changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_product_changes(session):
+    changes = session.info.pop('product_search_changes', None)
+    if changes and _index.built_at is not None:
+        for product_id, name in changes:
+            _index.update(product_id, name)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_product_changes(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('product_search_changes', None)
@@ -0,0 +1,88 @@
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from app import db
+from app.models.processed_message import ProcessedMessage
+from app.services.ttl_cache import TTLCache
+
+
+def _generation(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class PubSubDeduplicator:
+    """
+    Descarta entregas repetidas de Pub/Sub por ``messageId`` y por generación del objeto.
+
+    Primero se consulta una caché LRU en memoria (sin E/S); si no hay acierto
+    se consulta la tabla ``processed_messages``, compartida entre instancias.
+    Solo se guardan resultados positivos, así que un mensaje nuevo cuesta una
+    única consulta indexada.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.cache = TTLCache(maxsize, ttl)
+
+    def is_duplicate_message(self, message_id):
+        if not message_id:
+            return False
+        key = ('message', message_id)
+        if key in self.cache:
+            return True
+        found = db.session.query(ProcessedMessage.id).filter_by(message_id=message_id).first() is not None
+        if found:
+            self.cache.set(key, True)
+        return found
+
+    def is_completed_object(self, bucket, filename, generation):
+        generation = _generation(generation)
+        if generation is None:
+            return False
+        key = ('object', bucket, filename, generation)
+        if key in self.cache:
+            return True
+        found = db.session.query(ProcessedMessage.id).filter_by(
+            bucket=bucket, filename=filename, generation=generation, completed=True
+        ).first() is not None
+        if found:
+            self.cache.set(key, True)
+        return found
+
+    def record_message(self, message_id, bucket, filename, generation):
+        """Registra un mensaje que ya fue confirmado a Pub/Sub."""
+        if not message_id:
+            return
+        try:
+            db.session.add(ProcessedMessage(
+                message_id=message_id,
+                bucket=bucket,
+                filename=filename,
+                generation=_generation(generation)
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # Otra entrega concurrente del mismo mensaje ya lo registró
+            db.session.rollback()
+        self.cache.set(('message', message_id), True)
+
+    def mark_completed(self, bucket, filename, generation):
+        """Marca la generación del archivo como importada por completo."""
+        generation = _generation(generation)
+        if generation is None:
+            return
+        updated = db.session.query(ProcessedMessage).filter_by(
+            bucket=bucket, filename=filename, generation=generation
+        ).update({'completed': True})
+        if not updated:
+            db.session.add(ProcessedMessage(bucket=bucket, filename=filename,
+                                            generation=generation, completed=True))
+        db.session.commit()
+        self.cache.set(('object', bucket, filename, generation), True)
+
+
+pubsub_dedupe = PubSubDeduplicator(
+    maxsize=Config.PUBSUB_DEDUPE_CACHE_SIZE,
+    ttl=Config.PUBSUB_DEDUPE_CACHE_TTL
+)
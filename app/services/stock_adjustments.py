@@ -0,0 +1,138 @@
+import time
+from sqlalchemy import bindparam, insert, tuple_, update
+from config import Config
+from app import db
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_transaction import InventoryTransaction
+from app.models.product import Product
+from app.services.stock_rollup import add_item_change, apply_stock_deltas
+
+ADJUSTMENT = 'ADJUSTMENT'
+# Máximo de ids o pares (SKU, bodega) por consulta IN
+BATCH_SIZE = 500
+
+_items = InventoryItem.__table__
+_transactions = InventoryTransaction.__table__
+
+
+class AdjustmentError(ValueError):
+    """Ajuste inválido; ``status`` es el código HTTP y ``details`` los ajustes afectados."""
+
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+def _int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_adjustment_request(payload):
+    """
+    Valida ``{"user_id", "adjustments": [...]}``; cada ajuste trae
+    ``inventory_item_id`` o ``sku`` y ``warehouse_id``, un ``delta`` distinto
+    de cero y un ``reason`` opcional. Devuelve ``(adjustments, user_id)``.
+    """
+    if not isinstance(payload, dict):
+        raise AdjustmentError("Invalid JSON body")
+    user_id = payload.get('user_id')
+    if not _int(user_id) or user_id <= 0:
+        raise AdjustmentError("user_id is required")
+    adjustments = payload.get('adjustments')
+    if not isinstance(adjustments, list) or not adjustments:
+        raise AdjustmentError("adjustments must be a non-empty list")
+    if len(adjustments) > Config.ADJUSTMENT_MAX_ITEMS:
+        raise AdjustmentError(f"At most {Config.ADJUSTMENT_MAX_ITEMS} adjustments per request")
+
+    for index, adjustment in enumerate(adjustments):
+        if not isinstance(adjustment, dict) or not _int(adjustment.get('delta')) or adjustment['delta'] == 0:
+            raise AdjustmentError("Each adjustment needs a non-zero integer delta", details=[{"adjustment": index}])
+        by_id = _int(adjustment.get('inventory_item_id'))
+        by_sku = isinstance(adjustment.get('sku'), str) and _int(adjustment.get('warehouse_id'))
+        if by_id == by_sku:
+            raise AdjustmentError("Each adjustment needs inventory_item_id or sku and warehouse_id",
+                                  details=[{"adjustment": index}])
+        if adjustment.get('reason') is not None and not isinstance(adjustment['reason'], str):
+            raise AdjustmentError("reason must be a string", details=[{"adjustment": index}])
+    return adjustments, user_id
+
+
+def _resolve_item_ids(adjustments):
+    """Ids de item de cada ajuste; los dados por SKU y bodega se resuelven con consultas IN."""
+    keys = sorted({(adjustment['sku'], adjustment['warehouse_id'])
+                   for adjustment in adjustments if not _int(adjustment.get('inventory_item_id'))})
+    by_key = {}
+    for start in range(0, len(keys), BATCH_SIZE):
+        chunk = keys[start:start + BATCH_SIZE]
+        by_key.update(((sku, warehouse_id), item_id) for item_id, sku, warehouse_id in db.session.query(
+            InventoryItem.id, Product.sku, InventoryItem.warehouse_id
+        ).join(Product, Product.id == InventoryItem.product_id).filter(
+            tuple_(Product.sku, InventoryItem.warehouse_id).in_(chunk)
+        ))
+    return [adjustment['inventory_item_id'] if _int(adjustment.get('inventory_item_id'))
+            else by_key.get((adjustment['sku'], adjustment['warehouse_id']))
+            for adjustment in adjustments]
+
+
+def _lock_quantities(item_ids):
+    """(product_id, warehouse_id, cantidad) de los items, bloqueados en orden de id hasta el commit."""
+    item_ids = sorted(item_ids)
+    current = {}
+    for start in range(0, len(item_ids), BATCH_SIZE):
+        chunk = item_ids[start:start + BATCH_SIZE]
+        rows = db.session.query(
+            InventoryItem.id, InventoryItem.product_id, InventoryItem.warehouse_id, InventoryItem.quantity
+        ).filter(InventoryItem.id.in_(chunk)).order_by(InventoryItem.id).with_for_update()
+        current.update((item_id, (product_id, warehouse_id, quantity))
+                       for item_id, product_id, warehouse_id, quantity in rows)
+    return current
+
+
+def apply_adjustments(adjustments, user_id):
+    """
+    Aplica los ajustes en la transacción actual, sin confirmarla.
+
+    Los deltas de un mismo item se suman y se valida que la cantidad final
+    no sea negativa; si algún ajuste no procede se lanza AdjustmentError y
+    no se escribe nada. Las cantidades se actualizan con un único UPDATE
+    preparado ejecutado en lote (executemany) y el libro de movimientos con
+    un INSERT en lote; los totales por producto y por bodega se ajustan con
+    la diferencia.
+    Devuelve ``{item_id: cantidad final}``.
+    """
+    item_ids = _resolve_item_ids(adjustments)
+    current = _lock_quantities({item_id for item_id in item_ids if item_id is not None})
+
+    missing = [{"adjustment": index} for index, item_id in enumerate(item_ids) if item_id not in current]
+    if missing:
+        raise AdjustmentError("Inventory item not found", status=404, details=missing)
+
+    final = {}
+    for item_id, adjustment in zip(item_ids, adjustments):
+        final[item_id] = final.get(item_id, current[item_id][2]) + adjustment['delta']
+    negative = [{"adjustment": index, "inventory_item_id": item_id, "available": current[item_id][2]}
+                for index, item_id in enumerate(item_ids) if final[item_id] < 0]
+    if negative:
+        raise AdjustmentError("Insufficient stock", status=409, details=negative)
+
+    now = int(time.time())
+    db.session.execute(
+        update(_items).where(_items.c.id == bindparam('b_id')).values(quantity=bindparam('b_quantity'), updated_at=now),
+        [{'b_id': item_id, 'b_quantity': quantity} for item_id, quantity in final.items()]
+    )
+    db.session.execute(insert(_transactions), [{
+        'inventory_item_id': item_id,
+        'transaction_type': ADJUSTMENT,
+        'quantity': adjustment['delta'],
+        'transaction_date': now,
+        'user_id': user_id,
+        'notes': adjustment.get('reason')
+    } for item_id, adjustment in zip(item_ids, adjustments)])
+
+    deltas = {}
+    for item_id, quantity in final.items():
+        product_id, warehouse_id, previous = current[item_id]
+        add_item_change(deltas, product_id, warehouse_id, previous, quantity)
+    apply_stock_deltas(deltas)
+    return final
@@ -0,0 +1,202 @@
+from datetime import datetime
+from sqlalchemy import bindparam, case, delete, event, func, inspect, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+from app import db
+from app.database import dialect_insert
+from app.models.inventory_item import InventoryItem
+from app.models.product_stock_total import ProductStockTotal
+from app.models.warehouse import Warehouse
+from app.models.warehouse_stock_total import WarehouseStockTotal
+
+_totals = ProductStockTotal.__table__
+_warehouse_totals = WarehouseStockTotal.__table__
+_items = InventoryItem.__table__
+
+# Contadores de cada tabla, en el orden de los deltas: total, items, items con existencias
+_PRODUCT_COUNTERS = ('total_quantity', 'warehouse_count', 'warehouses_in_stock')
+_WAREHOUSE_COUNTERS = ('total_quantity', 'item_count', 'items_in_stock')
+
+
+def add_item_change(deltas, product_id, warehouse_id, old_quantity, new_quantity):
+    """
+    Acumula en ``deltas`` el efecto de un cambio en el item (producto, bodega).
+
+    ``old_quantity`` es None si el item no existía y ``new_quantity`` es None
+    si el item se eliminó. ``deltas`` es un dict (product_id, warehouse_id) ->
+    [total, items, items con existencias]; ``apply_stock_deltas`` lo suma por
+    producto y por bodega.
+    """
+    delta = deltas.setdefault((product_id, warehouse_id), [0, 0, 0])
+    delta[0] += (new_quantity or 0) - (old_quantity or 0)
+    delta[1] += (new_quantity is not None) - (old_quantity is not None)
+    delta[2] += (new_quantity is not None and new_quantity > 0) - (old_quantity is not None and old_quantity > 0)
+
+
+def current_quantities(keys):
+    """
+    Cantidades actuales de los items (product_id, warehouse_id) indicados.
+
+    En PostgreSQL solo esas filas quedan bloqueadas hasta el commit, en orden
+    de (producto, bodega), para que otra escritura concurrente no cambie la
+    cantidad entre esta lectura y el UPDATE que la reemplaza.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return {}
+    query = db.session.query(
+        InventoryItem.product_id, InventoryItem.warehouse_id, InventoryItem.quantity
+    ).filter(
+        tuple_(InventoryItem.product_id, InventoryItem.warehouse_id).in_(keys)
+    ).order_by(InventoryItem.product_id, InventoryItem.warehouse_id).with_for_update()
+    return {(product_id, warehouse_id): quantity for product_id, warehouse_id, quantity in query}
+
+
+def apply_stock_deltas(deltas, connection=None, deleted_warehouses=()):
+    """
+    Suma los incrementos a ``product_stock_totals`` y ``warehouse_stock_totals``
+    en la transacción actual. Las bodegas de ``deleted_warehouses`` ya no
+    tienen fila de totales (ON DELETE CASCADE) y sus incrementos se omiten.
+    """
+    by_product = {}
+    by_warehouse = {}
+    for (product_id, warehouse_id), delta in deltas.items():
+        for totals, key in ((by_product, product_id), (by_warehouse, warehouse_id)):
+            if totals is by_warehouse and key in deleted_warehouses:
+                continue
+            total = totals.setdefault(key, [0, 0, 0])
+            for index, value in enumerate(delta):
+                total[index] += value
+
+    execute = connection.execute if connection is not None else db.session.execute
+    now = int(datetime.now().timestamp())
+    # Siempre productos y luego bodegas: dos escrituras concurrentes bloquean las filas en el mismo orden
+    _add_counters(execute, _totals, 'product_id', _PRODUCT_COUNTERS, by_product, now)
+    _add_counters(execute, _warehouse_totals, 'warehouse_id', _WAREHOUSE_COUNTERS, by_warehouse, now)
+
+
+def _add_counters(execute, table, key, counters, deltas, now):
+    values = [{key: value, **dict(zip(counters, delta)), 'updated_at': now}
+              for value, delta in deltas.items() if any(delta)]
+    if not values:
+        return
+
+    upsert = dialect_insert(table)
+    if upsert is not None:
+        execute(upsert.on_conflict_do_update(
+            index_elements=[key],
+            set_={
+                **{counter: table.c[counter] + upsert.excluded[counter] for counter in counters},
+                'updated_at': upsert.excluded.updated_at
+            }
+        ), values)
+    else:
+        for value in values:
+            result = execute(update(table).where(table.c[key] == value[key]).values(
+                **{counter: table.c[counter] + value[counter] for counter in counters},
+                updated_at=now
+            ))
+            if result.rowcount == 0:
+                execute(insert(table), [value])
+
+    # Un producto o una bodega sin items no tiene fila, igual que en el GROUP BY de inventory_items
+    emptied = [{'b_key': value[key]} for value in values if value[counters[1]] < 0]
+    if emptied:
+        execute(delete(table).where(
+            table.c[key] == bindparam('b_key'),
+            table.c[counters[1]] <= 0
+        ), emptied)
+
+
+def rebuild_stock_totals():
+    """Recalcula las tablas de totales completas desde ``inventory_items``; no confirma la transacción."""
+    now = int(datetime.now().timestamp())
+    for table, key, counters in ((_totals, 'product_id', _PRODUCT_COUNTERS),
+                                 (_warehouse_totals, 'warehouse_id', _WAREHOUSE_COUNTERS)):
+        db.session.execute(delete(table))
+        db.session.execute(insert(table).from_select(
+            [key, *counters, 'updated_at'],
+            select(
+                _items.c[key],
+                func.sum(_items.c.quantity),
+                func.count(),
+                func.sum(case((_items.c.quantity > 0, 1), else_=0)),
+                now
+            ).group_by(_items.c[key])
+        ))
+
+
+def ensure_stock_totals():
+    """Llena las tablas la primera vez que se despliega sobre una base con inventario."""
+    if db.session.query(InventoryItem.id).first() is not None and (
+            db.session.query(ProductStockTotal.product_id).first() is None
+            or db.session.query(WarehouseStockTotal.warehouse_id).first() is None):
+        print("Construyendo product_stock_totals y warehouse_stock_totals desde inventory_items")
+        rebuild_stock_totals()
+        db.session.commit()
+
+
+# --------------------- CAMBIOS POR EL ORM ---------------------
+_TRACKED = ('product_id', 'warehouse_id', 'quantity')
+
+
+def _new_values(item, old):
+    # Los atributos que no se asignaron conservan el valor de la fila
+    values = []
+    for attribute, old_value in zip(_TRACKED, old):
+        history = inspect(item).attrs[attribute].history
+        values.append(history.added[0] if history.added else old_value)
+    return tuple(values)
+
+
+@event.listens_for(Session, 'before_flush')
+def _lock_changed_items(session, flush_context, instances):
+    """
+    Lee con FOR UPDATE la fila de los items que se van a modificar o borrar.
+
+    El valor anterior del historial del ORM es el que cargó la sesión, que
+    otra transacción pudo cambiar después; el incremento de los totales se
+    calcula contra la fila bloqueada, que nadie más cambia hasta el commit.
+    """
+    ids = sorted(
+        inspect(item).identity[0] for item in (*session.dirty, *session.deleted)
+        if isinstance(item, InventoryItem) and inspect(item).persistent
+        and (item in session.deleted or any(inspect(item).attrs[name].history.has_changes() for name in _TRACKED))
+    )
+    previous = {}
+    if ids:
+        rows = session.connection().execute(
+            select(_items.c.id, _items.c.product_id, _items.c.warehouse_id, _items.c.quantity)
+            .where(_items.c.id.in_(ids)).order_by(_items.c.id).with_for_update()
+        )
+        previous = {row.id: (row.product_id, row.warehouse_id, row.quantity) for row in rows}
+    session.info['stock_rollup_previous'] = previous
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_item_changes(session, flush_context):
+    # new, dirty y deleted aún reflejan el estado previo al flush
+    previous = session.info.pop('stock_rollup_previous', {})
+    deltas = {}
+    for item in session.new:
+        if isinstance(item, InventoryItem):
+            add_item_change(deltas, item.product_id, item.warehouse_id, None, item.quantity)
+    for item in session.deleted:
+        if isinstance(item, InventoryItem):
+            # Una fila que otra transacción ya borró no cambia los totales
+            old = previous.get(inspect(item).identity[0])
+            if old is not None:
+                add_item_change(deltas, *old[:2], old[2], None)
+    for item in session.dirty:
+        if isinstance(item, InventoryItem) and inspect(item).identity[0] in previous:
+            old = previous[inspect(item).identity[0]]
+            old_product_id, old_warehouse_id, old_quantity = old
+            product_id, warehouse_id, quantity = _new_values(item, old)
+            if (old_product_id, old_warehouse_id) != (product_id, warehouse_id):
+                add_item_change(deltas, old_product_id, old_warehouse_id, old_quantity, None)
+                add_item_change(deltas, product_id, warehouse_id, None, quantity)
+            elif old_quantity != quantity:
+                add_item_change(deltas, product_id, warehouse_id, old_quantity, quantity)
+    if deltas:
+        # El DELETE de la bodega ya se emitió y borró su fila de totales
+        deleted_warehouses = {warehouse.id for warehouse in session.deleted if isinstance(warehouse, Warehouse)}
+        apply_stock_deltas(deltas, session.connection(), deleted_warehouses)
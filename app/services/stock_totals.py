@@ -0,0 +1,70 @@
+from itertools import chain
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models.inventory_item import InventoryItem
+from app.models.product_stock_total import ProductStockTotal
+
+# Máximo de ids por consulta IN al calcular los totales de una página
+BATCH_SIZE = 500
+
+
+def track_loaded_product(product_id):
+    """Registra un producto cargado en la petición actual para incluirlo en el próximo cálculo por lotes."""
+    if has_request_context():
+        g.setdefault('_stock_totals_loaded', set()).add(product_id)
+
+
+def clear_request_totals():
+    """Descarta los totales calculados en la petición (tras escribir items)."""
+    if has_request_context():
+        g.pop('_stock_totals', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _clear_totals_after_flush(session, flush_context):
+    if any(isinstance(obj, InventoryItem) for obj in chain(session.new, session.dirty, session.deleted)):
+        clear_request_totals()
+
+
+def product_total_quantity(product_id):
+    """
+    Existencia total de un producto en todas las bodegas, leída de
+    ``product_stock_totals``.
+
+    Dentro de una petición, la primera consulta lee con un solo ``IN`` los
+    totales de todos los productos cargados hasta ese momento (por ejemplo,
+    la página completa de un listado) y los siguientes productos se leen del
+    resultado. Con un único producto pendiente se consulta solo su fila.
+    """
+    if not has_request_context():
+        return _single_total(product_id)
+
+    totals = g.setdefault('_stock_totals', {})
+    if product_id not in totals:
+        pending = g.get('_stock_totals_loaded', set()).difference(totals)
+        pending.add(product_id)
+        if len(pending) == 1:
+            totals[product_id] = _single_total(product_id)
+        else:
+            totals.update(_grouped_totals(pending))
+    return totals[product_id]
+
+
+def _single_total(product_id):
+    return db.session.query(ProductStockTotal.total_quantity).filter(
+        ProductStockTotal.product_id == product_id
+    ).scalar() or 0
+
+
+def _grouped_totals(product_ids):
+    product_ids = list(product_ids)
+    totals = dict.fromkeys(product_ids, 0)
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        chunk = product_ids[start:start + BATCH_SIZE]
+        totals.update(db.session.query(
+            ProductStockTotal.product_id,
+            ProductStockTotal.total_quantity
+        ).filter(ProductStockTotal.product_id.in_(chunk)))
+    return {product_id: total or 0 for product_id, total in totals.items()}
@@ -0,0 +1,128 @@
+import time
+from collections import namedtuple
+from sqlalchemy import tuple_
+from config import Config
+from app import db
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_transaction import InventoryTransaction
+from app.models.warehouse import Warehouse
+from app.services.item_loading import item_loading_options
+
+TRANSFER_OUT = 'TRANSFER_OUT'
+TRANSFER_IN = 'TRANSFER_IN'
+# Máximo de pares (producto, bodega) por SELECT ... FOR UPDATE
+LOCK_BATCH_SIZE = 500
+
+Move = namedtuple('Move', ['product_id', 'from_warehouse_id', 'to_warehouse_id', 'quantity'])
+
+
+class TransferError(ValueError):
+    """Traslado inválido; ``status`` es el código HTTP y ``move`` el índice del movimiento."""
+
+    def __init__(self, message, status=400, move=None):
+        super().__init__(message)
+        self.status = status
+        self.move = move
+
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def parse_transfer_request(payload):
+    """Valida el cuerpo ``{"user_id", "notes", "moves": [...]}`` y devuelve ``(moves, user_id, notes)``."""
+    if not isinstance(payload, dict):
+        raise TransferError("Invalid JSON body")
+    user_id = payload.get('user_id')
+    if not _positive_int(user_id):
+        raise TransferError("user_id is required")
+    raw_moves = payload.get('moves')
+    if not isinstance(raw_moves, list) or not raw_moves:
+        raise TransferError("moves must be a non-empty list")
+    if len(raw_moves) > Config.TRANSFER_MAX_MOVES:
+        raise TransferError(f"At most {Config.TRANSFER_MAX_MOVES} moves per request")
+
+    moves = []
+    for index, raw in enumerate(raw_moves):
+        if not isinstance(raw, dict) or not all(_positive_int(raw.get(field)) for field in Move._fields):
+            raise TransferError(f"Each move needs positive integer {', '.join(Move._fields)}", move=index)
+        move = Move(*(raw[field] for field in Move._fields))
+        if move.from_warehouse_id == move.to_warehouse_id:
+            raise TransferError("Source and target warehouse must differ", move=index)
+        moves.append(move)
+    return moves, user_id, payload.get('notes')
+
+
+def lock_items(keys):
+    """
+    Bloquea (FOR UPDATE) y devuelve los items existentes de los pares
+    (product_id, warehouse_id) indicados.
+
+    Se bloquean siempre en el mismo orden, así dos traslados concurrentes
+    sobre los mismos items esperan uno al otro en lugar de entrar en un
+    interbloqueo. Las relaciones no se cargan: FOR UPDATE no admite el lado
+    opcional de un OUTER JOIN.
+    """
+    keys = sorted(set(keys))
+    items = {}
+    for start in range(0, len(keys), LOCK_BATCH_SIZE):
+        chunk = keys[start:start + LOCK_BATCH_SIZE]
+        query = db.session.query(InventoryItem).options(*item_loading_options({})).filter(
+            tuple_(InventoryItem.product_id, InventoryItem.warehouse_id).in_(chunk)
+        ).order_by(InventoryItem.product_id, InventoryItem.warehouse_id).with_for_update()
+        items.update(((item.product_id, item.warehouse_id), item) for item in query)
+    return items
+
+
+def transfer_stock(moves, user_id, notes=None):
+    """
+    Aplica los movimientos en la transacción actual, en orden, sin confirmarla.
+
+    Cada movimiento descuenta del item de origen, suma al de destino (que se
+    crea si la bodega aún no tiene el producto) y registra un par de
+    movimientos TRANSFER_OUT / TRANSFER_IN. Si algún movimiento no procede
+    se lanza TransferError y el llamador debe revertir todo el lote.
+    Devuelve ``(items, transactions)``.
+    """
+    targets = {move.to_warehouse_id for move in moves}
+    existing = {warehouse_id for warehouse_id, in db.session.query(Warehouse.id).filter(Warehouse.id.in_(targets))}
+    for index, move in enumerate(moves):
+        if move.to_warehouse_id not in existing:
+            raise TransferError(f"Warehouse {move.to_warehouse_id} not found", status=404, move=index)
+
+    items = lock_items([(move.product_id, warehouse_id) for move in moves
+                        for warehouse_id in (move.from_warehouse_id, move.to_warehouse_id)])
+    now = int(time.time())
+    ledger = []
+    for index, move in enumerate(moves):
+        source = items.get((move.product_id, move.from_warehouse_id))
+        if source is None or source.quantity < move.quantity:
+            raise TransferError("Insufficient stock", status=409, move=index)
+        target = items.get((move.product_id, move.to_warehouse_id))
+        if target is None:
+            target = InventoryItem(product_id=move.product_id, warehouse_id=move.to_warehouse_id,
+                                   quantity=0, expiry_date=source.expiry_date, created_at=now)
+            db.session.add(target)
+            items[(move.product_id, move.to_warehouse_id)] = target
+
+        source.quantity -= move.quantity
+        target.quantity += move.quantity
+        source.updated_at = target.updated_at = now
+        ledger.append((source, TRANSFER_OUT, move))
+        ledger.append((target, TRANSFER_IN, move))
+
+    # Ids de los items de destino recién creados
+    db.session.flush()
+    transactions = [InventoryTransaction(
+        inventory_item_id=item.id,
+        transaction_type=transaction_type,
+        quantity=move.quantity,
+        from_warehouse_id=move.from_warehouse_id,
+        to_warehouse_id=move.to_warehouse_id,
+        transaction_date=now,
+        user_id=user_id,
+        notes=notes
+    ) for item, transaction_type, move in ledger]
+    db.session.add_all(transactions)
+    db.session.flush()
+    return list(items.values()), transactions
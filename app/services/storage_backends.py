@@ -0,0 +1,118 @@
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from google.cloud import storage
+from config import Config
+from app.services.blob_stream import InMemoryBlob, LocalFileBlob
+
+
+class StorageBackend(ABC):
+    """Origen de los archivos a importar; devuelve objetos con la interfaz de ``Blob`` de GCS."""
+
+    @abstractmethod
+    def get_blob(self, bucket_name, filename):
+        """Objeto con la interfaz de ``Blob`` del archivo indicado."""
+
+    @abstractmethod
+    def upload(self, bucket_name, filename, file_obj, content_type='text/csv'):
+        """Guarda el contenido binario de ``file_obj`` (desde su posición actual) como un archivo nuevo."""
+
+
+class GCSStorageBackend(StorageBackend):
+    """Google Cloud Storage con un único cliente compartido por todas las importaciones."""
+
+    def __init__(self, client=None):
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = storage.Client()
+        return self._client
+
+    def get_blob(self, bucket_name, filename):
+        return self.client.bucket(bucket_name).blob(filename)
+
+    def upload(self, bucket_name, filename, file_obj, content_type='text/csv'):
+        self.get_blob(bucket_name, filename).upload_from_file(file_obj, content_type=content_type)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Archivos locales en ``<root>/<bucket>/<filename>``, leídos con ``mmap``."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, bucket_name, filename):
+        path = os.path.abspath(os.path.join(self.root, bucket_name, filename))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Ruta fuera del directorio de almacenamiento: {filename}")
+        return path
+
+    def get_blob(self, bucket_name, filename):
+        path = self._path(bucket_name, filename)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No existe el archivo {bucket_name}/{filename}")
+        return LocalFileBlob(path)
+
+    def upload(self, bucket_name, filename, file_obj, content_type='text/csv'):
+        path = self._path(bucket_name, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(file_obj, f)
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """Archivos en memoria para pruebas y benchmarks."""
+
+    def __init__(self):
+        self.blobs = {}
+
+    def put(self, bucket_name, filename, data, generation=1):
+        blob = InMemoryBlob(filename, data, generation)
+        self.blobs[(bucket_name, filename)] = blob
+        return blob
+
+    def upload(self, bucket_name, filename, file_obj, content_type='text/csv'):
+        self.put(bucket_name, filename, file_obj.read())
+
+    def get_blob(self, bucket_name, filename):
+        try:
+            return self.blobs[(bucket_name, filename)]
+        except KeyError:
+            raise FileNotFoundError(f"No existe el archivo {bucket_name}/{filename}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_storage_backend(kind=None):
+    kind = kind or Config.STORAGE_BACKEND
+    if kind == 'gcs':
+        return GCSStorageBackend()
+    if kind == 'local':
+        return LocalStorageBackend(Config.STORAGE_LOCAL_ROOT)
+    if kind == 'memory':
+        return InMemoryStorageBackend()
+    raise ValueError(f"Backend de almacenamiento desconocido: {kind}")
+
+
+def get_storage_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_storage_backend()
+    return _backend
+
+
+def set_storage_backend(backend):
+    """Reemplaza el backend compartido; con None se vuelve a crear según la configuración."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,33 @@
+from app import db
+from app.models.inventory_item import InventoryItem
+from app.models.inventory_transaction import InventoryTransaction
+from app.services.fast_jsonapi import TRANSACTION_COLUMNS
+
+# Columnas de orden del historial; cada filtro tiene un índice que termina en ellas
+HISTORY_ORDER = (InventoryTransaction.transaction_date, InventoryTransaction.id)
+
+
+def history_query(inventory_item_id=None, warehouse_id=None, transaction_types=(), date_from=None, date_to=None):
+    """
+    Consulta de columnas de movimientos con los filtros indicados, sin orden
+    ni límite (los pone ``keyset_page`` con ``HISTORY_ORDER``).
+
+    La bodega es la del item del movimiento; se resuelve con una subconsulta
+    sobre ``inventory_items`` en lugar de un JOIN para que el orden siga
+    saliendo de los índices de ``inventory_transactions``. Las fechas son
+    timestamps inclusivos.
+    """
+    query = db.session.query(*TRANSACTION_COLUMNS)
+    if inventory_item_id is not None:
+        query = query.filter(InventoryTransaction.inventory_item_id == inventory_item_id)
+    if warehouse_id is not None:
+        query = query.filter(InventoryTransaction.inventory_item_id.in_(
+            db.session.query(InventoryItem.id).filter(InventoryItem.warehouse_id == warehouse_id)
+        ))
+    if transaction_types:
+        query = query.filter(InventoryTransaction.transaction_type.in_(transaction_types))
+    if date_from is not None:
+        query = query.filter(InventoryTransaction.transaction_date >= date_from)
+    if date_to is not None:
+        query = query.filter(InventoryTransaction.transaction_date <= date_to)
+    return query
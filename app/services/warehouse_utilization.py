@@ -0,0 +1,100 @@
+from sqlalchemy import func
+from app import db
+from app.models.warehouse import Warehouse
+from app.models.warehouse_stock_total import WarehouseStockTotal
+
+# Una bodega sin items no tiene fila en warehouse_stock_totals
+_total_quantity = func.coalesce(WarehouseStockTotal.total_quantity, 0)
+
+
+class InvalidThresholdError(ValueError):
+    """Umbral de ocupación inválido."""
+
+
+def parse_thresholds(args):
+    """``(min_utilization, max_utilization)`` en porcentaje desde los parámetros de la petición."""
+    thresholds = []
+    for name in ('min_utilization', 'max_utilization'):
+        value = args.get(name)
+        if value is None:
+            thresholds.append(None)
+            continue
+        try:
+            threshold = float(value)
+        except ValueError:
+            raise InvalidThresholdError(f"{name} must be a number")
+        if threshold < 0:
+            raise InvalidThresholdError(f"{name} must be non-negative")
+        thresholds.append(threshold)
+    return tuple(thresholds)
+
+
+def _threshold_filters(quantity, capacity, min_utilization, max_utilization):
+    # Sin dividir por la capacidad: cantidad * 100 frente a umbral * capacidad. Sin capacidad la
+    # ocupación no está definida y no entra en ningún umbral
+    if min_utilization is None and max_utilization is None:
+        return []
+    filters = [capacity > 0]
+    if min_utilization is not None:
+        filters.append(quantity * 100 >= capacity * min_utilization)
+    if max_utilization is not None:
+        filters.append(quantity * 100 <= capacity * max_utilization)
+    return filters
+
+
+def _percent(quantity, capacity):
+    return round(quantity * 100 / capacity, 2) if capacity > 0 else None
+
+
+def warehouse_utilization(min_utilization=None, max_utilization=None, country=None):
+    """
+    Ocupación de cada bodega (existencias sobre ``capacity``, en porcentaje)
+    leída de ``warehouse_stock_totals``: una fila por bodega en lugar de
+    sumar ``inventory_items`` en cada petición. Los umbrales filtran en la
+    consulta, así un job que pregunta por las bodegas sobre el 90% solo
+    recibe esas.
+    """
+    query = db.session.query(
+        Warehouse.id,
+        Warehouse.name,
+        Warehouse.country,
+        Warehouse.capacity,
+        _total_quantity.label('total_quantity'),
+        func.coalesce(WarehouseStockTotal.item_count, 0).label('item_count'),
+        func.coalesce(WarehouseStockTotal.items_in_stock, 0).label('items_in_stock')
+    ).outerjoin(WarehouseStockTotal, WarehouseStockTotal.warehouse_id == Warehouse.id)
+    if country is not None:
+        query = query.filter(Warehouse.country == country)
+    query = query.filter(*_threshold_filters(_total_quantity, Warehouse.capacity, min_utilization, max_utilization))
+
+    return [{
+        "id": row.id,
+        "name": row.name,
+        "country": row.country,
+        "capacity": row.capacity,
+        "total_quantity": row.total_quantity,
+        "item_count": row.item_count,
+        "items_in_stock": row.items_in_stock,
+        "utilization": _percent(row.total_quantity, row.capacity)
+    } for row in query.order_by(Warehouse.id)]
+
+
+def country_utilization(min_utilization=None, max_utilization=None):
+    """Ocupación agregada por país: existencias de sus bodegas sobre la suma de sus capacidades."""
+    capacity = func.sum(Warehouse.capacity)
+    quantity = func.sum(_total_quantity)
+    query = db.session.query(
+        Warehouse.country,
+        func.count(Warehouse.id).label('warehouses'),
+        capacity.label('capacity'),
+        quantity.label('total_quantity')
+    ).outerjoin(WarehouseStockTotal, WarehouseStockTotal.warehouse_id == Warehouse.id).group_by(Warehouse.country)
+    query = query.having(*_threshold_filters(quantity, capacity, min_utilization, max_utilization))
+
+    return [{
+        "country": row.country,
+        "warehouses": row.warehouses,
+        "capacity": row.capacity,
+        "total_quantity": row.total_quantity,
+        "utilization": _percent(row.total_quantity, row.capacity)
+    } for row in query.order_by(Warehouse.country)]
@@ -0,0 +1,84 @@
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.database import dialect_insert
+from app.models.table_version import TableVersion
+
+_versions = TableVersion.__table__
+
+
+def table_versions(tables):
+    """
+    Versiones de escritura actuales de ``tables``, en el mismo orden.
+
+    Se leen de ``table_versions``, así coinciden en todas las instancias; una
+    tabla que nunca se escribió tiene versión 0.
+    """
+    rows = db.session.connection().execute(
+        select(_versions.c.table_name, _versions.c.version).where(_versions.c.table_name.in_(tables))
+    )
+    versions = dict(rows.all())
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def bump_tables(connection, tables):
+    """Sube en la transacción de ``connection`` la versión de las tablas indicadas."""
+    # Siempre en el mismo orden: dos transacciones que suben las mismas tablas no se interbloquean
+    values = [{'table_name': table, 'version': 1} for table in sorted(tables)]
+    upsert = dialect_insert(_versions)
+    if upsert is not None:
+        connection.execute(upsert.on_conflict_do_update(
+            index_elements=['table_name'],
+            set_={'version': _versions.c.version + 1}
+        ), values)
+        return
+    for value in values:
+        result = connection.execute(update(_versions).where(
+            _versions.c.table_name == value['table_name']
+        ).values(version=_versions.c.version + 1))
+        if result.rowcount == 0:
+            connection.execute(insert(_versions), [value])
+
+
+def written_tables(session):
+    """Tablas escritas en la transacción en curso de ``session`` y aún no confirmadas."""
+    return session.info.get('written_tables', set())
+
+
+def mark_written(session, tables):
+    """Registra tablas escritas en la transacción de ``session``; se versionan al confirmarla."""
+    session.info.setdefault('written_tables', set()).update(tables)
+
+
+# --------------------- ESCRITURAS POR SESIÓN ---------------------
+@event.listens_for(Session, 'after_flush')
+def _collect_orm_writes(session, flush_context):
+    tables = {obj.__table__.name for obj in (*session.new, *session.dirty, *session.deleted)
+              if hasattr(obj, '__table__')}
+    if tables:
+        mark_written(session, tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_statement_writes(orm_execute_state):
+    # INSERT/UPDATE/DELETE masivos con db.session.execute (importación de CSV)
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            mark_written(orm_execute_state.session, {table.name})
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_before_commit(session):
+    # El commit hace su flush después de este evento: se adelanta para ver todas las tablas escritas
+    session.flush()
+    tables = session.info.pop('written_tables', None)
+    if tables:
+        # La versión sube en la misma transacción: se confirma o se revierte junto con la escritura
+        bump_tables(session.connection(), tables)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_writes(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('written_tables', None)
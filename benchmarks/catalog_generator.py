@@ -0,0 +1,74 @@
+"""
+Generador de catálogos CSV sintéticos con el formato que importa ``CSVProcessor``.
+
+Cada fila corresponde a un par (producto, bodega) distinto. Con la misma
+semilla el catálogo base es siempre el mismo; ``revision`` y ``update_ratio``
+producen versiones posteriores en las que solo cambia la cantidad de una
+fracción de las filas, como en las re-subidas diarias de los proveedores.
+"""
+import argparse
+import csv
+import random
+
+HEADER = [
+    'sku', 'manufacturer_id', 'name', 'description', 'unit_price', 'storage_conditions',
+    'delivery_time', 'warehouse_id', 'quantity', 'location', 'expiry_date'
+]
+
+STORAGE_CONDITIONS = ['Seco', 'Refrigerado', 'Congelado', 'Temperatura ambiente']
+
+
+def generate_rows(rows, products, warehouses, seed=0, revision=0, update_ratio=0.0):
+    """Genera las filas del catálogo como listas de strings, sin mantenerlas en memoria."""
+    if rows > products * warehouses:
+        raise ValueError("rows no puede superar products * warehouses")
+
+    base = random.Random(seed)
+    updates = random.Random(f"{seed}-{revision}")
+    for i in range(rows):
+        product = i % products
+        warehouse = (i // products) % warehouses + 1
+        quantity = base.randint(0, 1000)
+        if revision and updates.random() < update_ratio:
+            quantity = updates.randint(0, 1000)
+        yield [
+            f"BENCH-{product:07d}",
+            str(product % 50 + 1),
+            f"Producto sintético {product}",
+            f"Descripción del producto {product}",
+            f"{(product % 9000) / 10 + 1:.2f}",
+            STORAGE_CONDITIONS[product % len(STORAGE_CONDITIONS)],
+            str(product % 15 + 1),
+            str(warehouse),
+            str(quantity),
+            f"P{warehouse:02d}-{product % 100:02d}",
+            str(1735689600 + product * 60)
+        ]
+
+
+def write_catalog(path, rows, products, warehouses, seed=0, revision=0, update_ratio=0.0):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(generate_rows(rows, products, warehouses, seed, revision, update_ratio))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un catálogo CSV sintético")
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--products', type=int, default=None, help="por defecto rows / warehouses")
+    parser.add_argument('--warehouses', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--revision', type=int, default=0)
+    parser.add_argument('--update-ratio', type=float, default=0.0)
+    args = parser.parse_args()
+
+    products = args.products or -(-args.rows // args.warehouses)
+    write_catalog(args.path, args.rows, products, args.warehouses, args.seed, args.revision, args.update_ratio)
+    print(f"Catálogo escrito en {args.path}")
+
+
+if __name__ == '__main__':
+    main()
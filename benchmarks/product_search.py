@@ -0,0 +1,69 @@
+"""
+Latencia de la búsqueda parcial por nombre con el índice de n-gramas en memoria.
+
+Uso:
+    python -m benchmarks.product_search --products 1000000 --queries 500
+
+En PostgreSQL la búsqueda la atiende el índice GIN de pg_trgm; este
+benchmark mide el índice que se usa con los demás motores.
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from app.services.product_search import NgramIndex
+
+WORDS = [
+    'kit', 'guantes', 'jeringa', 'gasa', 'venda', 'sutura', 'catéter', 'mascarilla', 'alcohol',
+    'termómetro', 'tensiómetro', 'bisturí', 'apósito', 'suero', 'algodón', 'esparadrapo',
+    'nitrilo', 'látex', 'estéril', 'desechable', 'pediátrico', 'quirúrgico', 'adulto', 'talla'
+]
+
+
+def synthetic_names(count, seed=0):
+    rng = random.Random(seed)
+    for product_id in range(1, count + 1):
+        yield product_id, f"{' '.join(rng.sample(WORDS, 3))} {rng.randint(1, 999)}ml"
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del índice de n-gramas de productos")
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    index = NgramIndex()
+    started = time.perf_counter()
+    index.build(synthetic_names(args.products, args.seed))
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(args.seed + 1)
+    queries = [rng.choice(WORDS)[:rng.randint(3, 8)] + (' ' + rng.choice(WORDS)[:3] if rng.random() < 0.5 else '')
+               for _ in range(args.queries)]
+    latencies = {True: [], False: []}
+    results = 0
+    for ranked in (False, True):
+        for query in queries:
+            started = time.perf_counter()
+            found = index.search(query, ranked)
+            latencies[ranked].append((time.perf_counter() - started) * 1000)
+            results += len(found) if ranked else 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    print(f"productos: {args.products}  construcción: {build_seconds:.1f} s  RSS: {peak:.0f} MB")
+    print(f"consultas: {len(queries)}  resultados promedio: {results / len(queries):.0f}")
+    for ranked, label in ((False, 'filtro'), (True, 'con ranking')):
+        print(f"{label:<12} p50: {percentile(latencies[ranked], 0.5):.2f} ms  "
+              f"p99: {percentile(latencies[ranked], 0.99):.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,3 +10,62 @@ class Config:
     PORT = int(os.getenv('PORT', 8080))
     PORT_SWAGGER = int(os.getenv('PORT_SWAGGER', 443))
     BASE_URL = os.getenv('BASE_URL', 'https://inventory-service-190711226672.us-central1.run.app')
+    # Origen de los archivos CSV: 'gcs', 'local' (STORAGE_LOCAL_ROOT/<bucket>/<archivo>) o 'memory'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'gcs')
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', './storage')
+    # Importación de CSV: lectura por bloques desde el almacenamiento
+    CSV_STREAMING = os.getenv('CSV_STREAMING', 'false').lower() == 'true'
+    CSV_STREAM_CHUNK_SIZE = int(os.getenv('CSV_STREAM_CHUNK_SIZE', 1024 * 1024))
+    # 'row' (fila por fila) o 'bulk' (consultas y upserts por bloque)
+    CSV_IMPORT_MODE = os.getenv('CSV_IMPORT_MODE', 'row')
+    CSV_IMPORT_CHUNK_SIZE = int(os.getenv('CSV_IMPORT_CHUNK_SIZE', 1000))
+    # Guardar la última fila confirmada para retomar archivos en reentregas
+    CSV_IMPORT_CHECKPOINTS = os.getenv('CSV_IMPORT_CHECKPOINTS', 'false').lower() == 'true'
+    # Procesos para convertir y validar filas en paralelo (0 o 1: en el mismo hilo). Apagado por defecto:
+    # enviar las filas a otro proceso cuesta tanto como convertirlas (ver benchmarks/csv_import.py)
+    CSV_PARSE_WORKERS = int(os.getenv('CSV_PARSE_WORKERS', 0))
+    # Reimportación incremental: omitir filas cuyo contenido no cambió desde la importación anterior
+    CSV_IMPORT_DIFF = os.getenv('CSV_IMPORT_DIFF', 'false').lower() == 'true'
+    # Importaciones en segundo plano: el endpoint de Pub/Sub responde 202 y encola el trabajo
+    CSV_IMPORT_ASYNC = os.getenv('CSV_IMPORT_ASYNC', 'false').lower() == 'true'
+    CSV_IMPORT_WORKERS = int(os.getenv('CSV_IMPORT_WORKERS', 2))
+    CSV_IMPORT_QUEUE_SIZE = int(os.getenv('CSV_IMPORT_QUEUE_SIZE', 8))
+    # Intentos de un trabajo fallido y segundos sin avances tras los que uno en curso se da por abandonado
+    CSV_IMPORT_MAX_ATTEMPTS = int(os.getenv('CSV_IMPORT_MAX_ATTEMPTS', 3))
+    CSV_IMPORT_JOB_STALE_AFTER = int(os.getenv('CSV_IMPORT_JOB_STALE_AFTER', 900))
+    # Descartar reentregas de Pub/Sub por messageId y generación del objeto
+    PUBSUB_DEDUPE = os.getenv('PUBSUB_DEDUPE', 'false').lower() == 'true'
+    PUBSUB_DEDUPE_CACHE_SIZE = int(os.getenv('PUBSUB_DEDUPE_CACHE_SIZE', 10000))
+    PUBSUB_DEDUPE_CACHE_TTL = int(os.getenv('PUBSUB_DEDUPE_CACHE_TTL', 3600))
+    # Importación parcial: aplicar las filas válidas y guardar las rechazadas en un archivo aparte
+    CSV_IMPORT_PARTIAL = os.getenv('CSV_IMPORT_PARTIAL', 'false').lower() == 'true'
+    # Bucket de los archivos de rechazos (vacío: el mismo del CSV) y prefijo que Pub/Sub no importa
+    CSV_REJECTS_BUCKET = os.getenv('CSV_REJECTS_BUCKET', '')
+    CSV_REJECTS_PREFIX = os.getenv('CSV_REJECTS_PREFIX', 'rejects/')
+    # Búsqueda parcial por nombre: 'auto' (pg_trgm en PostgreSQL, n-gramas en memoria en otros motores),
+    # 'trigram', 'ngram' o 'ilike'
+    PRODUCT_SEARCH_ENGINE = os.getenv('PRODUCT_SEARCH_ENGINE', 'auto')
+    # Segundos tras los que el índice en memoria se reconstruye para ver escrituras de otras instancias
+    PRODUCT_SEARCH_INDEX_TTL = int(os.getenv('PRODUCT_SEARCH_INDEX_TTL', 300))
+    # Total de los listados paginados: 'exact', 'cached' (conteo exacto en caché), 'estimate'
+    # (estimación del planificador de PostgreSQL) o 'none'; cada petición puede pedir otro con page[total]
+    PAGINATION_TOTAL_MODE = os.getenv('PAGINATION_TOTAL_MODE', 'exact')
+    PAGINATION_COUNT_CACHE_SIZE = int(os.getenv('PAGINATION_COUNT_CACHE_SIZE', 1024))
+    PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 60))
+    # Filas por bloque al exportar el inventario completo (/api/inventory/export)
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+    # ETag / If-None-Match en las lecturas de inventario y productos, derivados de las versiones de escritura
+    HTTP_ETAGS = os.getenv('HTTP_ETAGS', 'false').lower() == 'true'
+    # s-maxage de Cache-Control: segundos que la CDN puede responder sin consultar el servicio
+    HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 5))
+    # Caché en memoria de productos por id y SKU (importación de CSV); tamaño y segundos de vida
+    PRODUCT_CATALOG_CACHE = os.getenv('PRODUCT_CATALOG_CACHE', 'false').lower() == 'true'
+    PRODUCT_CATALOG_CACHE_SIZE = int(os.getenv('PRODUCT_CATALOG_CACHE_SIZE', 10000))
+    PRODUCT_CATALOG_CACHE_TTL = int(os.getenv('PRODUCT_CATALOG_CACHE_TTL', 300))
+    # Movimientos máximos por petición a /api/inventory/transfers
+    TRANSFER_MAX_MOVES = int(os.getenv('TRANSFER_MAX_MOVES', 5000))
+    # Ajustes máximos por petición a /api/inventory/adjustments
+    ADJUSTMENT_MAX_ITEMS = int(os.getenv('ADJUSTMENT_MAX_ITEMS', 10000))
+    # Segundos de antigüedad de los movimientos que entran en un snapshot del libro: los más recientes
+    # podrían pertenecer a transacciones aún sin confirmar
+    LEDGER_SNAPSHOT_LAG = int(os.getenv('LEDGER_SNAPSHOT_LAG', 300))
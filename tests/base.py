@@ -0,0 +1,64 @@
+import unittest
+import safrs
+from flask import Flask
+from safrs import SAFRSAPI
+from app import db
+from app.models import Manufacturer, Product, Warehouse
+from app.routes.inventory import inventory_bp
+
+def create_test_app(exposed_models=(), database_uri='sqlite://'):
+    """App Flask sobre SQLite (en memoria por defecto) con las rutas de inventario; ``exposed_models`` se publican por SAFRSAPI (solo GET)"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    db.init_app(app)
+    if exposed_models:
+        # jsonapi_format_response arma los enlaces con url_for de los modelos publicados
+        with app.app_context():
+            api = SAFRSAPI(app, host='localhost', port=5000, prefix='/api')
+            for model in exposed_models:
+                api.expose_object(model, methods=["GET"])
+    app.register_blueprint(inventory_bp, url_prefix='/api/inventory')
+    # SAFRSAPI hace lo mismo: Model.query usa la sesión de safrs.DB
+    safrs.DB = db
+    return app
+
+def add_manufacturer():
+    db.session.add(Manufacturer(id=1, name="Fabricante", email="a@b.co", country="CO"))
+
+def add_warehouses(*warehouse_ids, country="CO", capacity=1000):
+    for warehouse_id in warehouse_ids:
+        db.session.add(Warehouse(id=warehouse_id, name=f"Bodega {warehouse_id}", address="Calle 1",
+                                 country=country, capacity=capacity))
+
+def add_products(*product_ids, name="Producto"):
+    for product_id in product_ids:
+        db.session.add(Product(id=product_id, manufacturer_id=1, name=f"{name} {product_id}",
+                               sku=f"SKU{product_id}", unit_price=1))
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Base de las pruebas contra SQLite en memoria: una app por clase, tablas
+    nuevas por prueba y el fabricante 1 ya creado. Cada clase agrega sus
+    datos en setUp después de super().setUp().
+    """
+    exposed_models = ()
+    database_uri = 'sqlite://'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.app = create_test_app(cls.exposed_models, cls.database_uri)
+
+    def setUp(self):
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        add_manufacturer()
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
@@ -15,3 +15,10 @@ def test_health_check(client):
     assert response.status_code == 200
     json_data = response.get_json()
     assert json_data == {"status": "UP"}
+
+def test_cache_stats(client):
+    response = client.get("/cache/stats")
+    assert response.status_code == 200
+    json_data = response.get_json()
+    assert set(json_data) == {"product_catalog", "page_counts", "pubsub_dedupe"}
+    assert {"hits", "misses", "hit_ratio", "size", "maxsize"} <= set(json_data["product_catalog"])
@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from benchmarks.catalog_generator import generate_rows
+from benchmarks.csv_import import compare, measure_reference, run_scenario
+
+class TestCatalogGenerator(unittest.TestCase):
+
+    def test_rows_are_unique_and_deterministic(self):
+        """Test que el catálogo no repite (sku, bodega) y es reproducible con la misma semilla"""
+        rows = list(generate_rows(200, products=50, warehouses=4, seed=7))
+        self.assertEqual(len({(row[0], row[7]) for row in rows}), 200)
+        self.assertEqual(rows, list(generate_rows(200, products=50, warehouses=4, seed=7)))
+
+    def test_revision_changes_only_quantities(self):
+        """Test que una revisión cambia solo la cantidad de una fracción de las filas"""
+        base = list(generate_rows(1000, products=100, warehouses=10, seed=1))
+        updated = list(generate_rows(1000, products=100, warehouses=10, seed=1, revision=1, update_ratio=0.2))
+        changed = [i for i, (old, new) in enumerate(zip(base, updated)) if old != new]
+        self.assertTrue(0 < len(changed) < 400)
+        for i in changed:
+            self.assertEqual(base[i][:8] + base[i][9:], updated[i][:8] + updated[i][9:])
+
+    def test_rejects_more_rows_than_pairs(self):
+        """Test que no se piden más filas que pares (producto, bodega)"""
+        with self.assertRaises(ValueError):
+            list(generate_rows(11, products=5, warehouses=2))
+
+class TestCSVImportBenchmark(unittest.TestCase):
+
+    def test_run_scenario_measures_both_phases(self):
+        """Test que el benchmark importa y re-importa un catálogo pequeño en SQLite"""
+        scenario = {
+            'key': 'sqlite:bulk:100', 'database_url': None, 'mode': 'bulk', 'rows': 100,
+            'products': 50, 'warehouses': 2, 'update_ratio': 0.1, 'seed': 0,
+            'chunk_size': 40, 'parse_workers': 0, 'diff': False
+        }
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_scenario(scenario, workdir)
+
+        self.assertEqual([r['key'] for r in results], ['sqlite:bulk:100:load', 'sqlite:bulk:100:reimport'])
+        for result in results:
+            self.assertGreater(result['rows_per_second'], 0)
+            self.assertGreater(result['queries'], 0)
+            self.assertGreater(result['peak_rss_mb'], 0)
+
+    def test_compare_reports_regressions(self):
+        """Test que se detectan regresiones de velocidad y de número de consultas"""
+        baselines = {'k:load': {'rows_per_second': 1000.0, 'queries': 10, 'peak_rss_mb': 100.0}}
+        ok = [{'key': 'k:load', 'rows_per_second': 900.0, 'queries': 10, 'peak_rss_mb': 110.0}]
+        slow = [{'key': 'k:load', 'rows_per_second': 500.0, 'queries': 12, 'peak_rss_mb': 100.0}]
+
+        self.assertEqual(compare(ok, baselines, tolerance=0.3), [])
+        self.assertEqual(len(compare(slow, baselines, tolerance=0.3)), 2)
+        self.assertEqual(compare([{'key': 'otro:load', 'rows_per_second': 1.0, 'queries': 99,
+                                   'peak_rss_mb': 1.0}], baselines, tolerance=0.3), [])
+
+    def test_compare_relative_to_reference(self):
+        """Test que con la carga de referencia una máquina más lenta no cuenta como regresión"""
+        baselines = {'k:load': {'rows_per_second': 1000.0, 'relative_speed': 0.1, 'queries': 10, 'peak_rss_mb': 100.0}}
+        slower_host = [{'key': 'k:load', 'rows_per_second': 400.0, 'relative_speed': 0.1, 'queries': 10,
+                        'peak_rss_mb': 100.0}]
+        regression = [{'key': 'k:load', 'rows_per_second': 1000.0, 'relative_speed': 0.05, 'queries': 10,
+                       'peak_rss_mb': 100.0}]
+
+        self.assertEqual(compare(slower_host, baselines, tolerance=0.3), [])
+        self.assertEqual(compare(regression, baselines, tolerance=0.3),
+                         ['k:load: relative_speed 0.05 (referencia 0.1)'])
+
+    def test_measure_reference(self):
+        """Test que la carga de referencia devuelve filas/s"""
+        self.assertGreater(measure_reference(rows=200, repeat=1), 0)
+
+if __name__ == '__main__':
+    unittest.main()
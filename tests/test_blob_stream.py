@@ -0,0 +1,54 @@
+import csv
+import os
+import tempfile
+import unittest
+from app.services.blob_stream import open_csv_stream, InMemoryBlob, LocalFileBlob
+
+class TestBlobStream(unittest.TestCase):
+
+    def setUp(self):
+        self.csv_text = (
+            "sku,name,quantity\n"
+            "SKU1,Café molido,10\n"
+            "SKU2,\"Nombre con\nsalto de línea\",20\n"
+        )
+
+    def test_in_memory_blob_stream_rows(self):
+        """Test lectura por bloques de un blob en memoria"""
+        blob = InMemoryBlob("catalogo.csv", self.csv_text)
+
+        # Bloques de 3 bytes para forzar caracteres multibyte partidos
+        with open_csv_stream(blob, chunk_size=3) as stream:
+            rows = list(csv.DictReader(stream))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['name'], "Café molido")
+        self.assertEqual(rows[1]['name'], "Nombre con\nsalto de línea")
+        self.assertEqual(rows[1]['quantity'], "20")
+
+    def test_local_file_blob_stream_rows(self):
+        """Test lectura por bloques de un archivo local"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False,
+                                         encoding='utf-8', newline='') as f:
+            f.write(self.csv_text)
+        try:
+            blob = LocalFileBlob(f.name)
+            with open_csv_stream(blob, chunk_size=4) as stream:
+                rows = list(csv.DictReader(stream))
+
+            self.assertEqual([row['sku'] for row in rows], ['SKU1', 'SKU2'])
+            self.assertEqual(blob.download_as_text(), self.csv_text)
+
+            blob.reload()
+            self.assertIsNotNone(blob.generation)
+        finally:
+            os.remove(f.name)
+
+    def test_in_memory_blob_rejects_text_mode(self):
+        """Test que solo se soporta lectura binaria"""
+        blob = InMemoryBlob("catalogo.csv", self.csv_text)
+        with self.assertRaises(ValueError):
+            blob.open('r')
+
+if __name__ == '__main__':
+    unittest.main()
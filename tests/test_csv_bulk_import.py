@@ -0,0 +1,397 @@
+import csv
+import io
+import unittest
+from unittest.mock import patch
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.database import create_missing_columns, create_missing_indexes, failed_unique_indexes
+from app.models.product import Product
+from app.models.inventory_item import InventoryItem
+from app.models.import_checkpoint import ImportCheckpoint
+from app.models.import_row_hash import ImportRowHash
+from app.services.csv_processor import CSVProcessor
+from app.services.blob_stream import InMemoryBlob
+from app.services.storage_backends import InMemoryStorageBackend, set_storage_backend
+from tests.base import DatabaseTestCase
+
+HEADER = "sku,manufacturer_id,name,description,unit_price,storage_conditions,delivery_time,warehouse_id,quantity,location,expiry_date\n"
+
+def _csv_row(sku, warehouse_id, quantity, location='A1'):
+    return f"{sku},1,Producto {sku},Descripción,10.50,Seco,3,{warehouse_id},{quantity},{location},1714974947\n"
+
+class TestCSVBulkImport(DatabaseTestCase):
+    """Pruebas del modo 'bulk' contra una base SQLite real en memoria"""
+
+    def _run(self, csv_text, chunk_size=2):
+        blob = InMemoryBlob("catalogo.csv", HEADER + csv_text)
+        processor = CSVProcessor("test-bucket", "catalogo.csv", blob=blob,
+                                 streaming=True, mode='bulk', chunk_size=chunk_size)
+        return processor.process()
+
+    def _items(self):
+        return {
+            (sku, warehouse_id): (quantity, location)
+            for sku, warehouse_id, quantity, location in db.session.query(
+                Product.sku, InventoryItem.warehouse_id, InventoryItem.quantity, InventoryItem.location
+            ).join(Product, Product.id == InventoryItem.product_id).all()
+        }
+
+    def test_bulk_inserts_products_and_items(self):
+        """Test que el modo bulk crea productos e items nuevos"""
+        success, message = self._run(
+            _csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 20) + _csv_row("SKU1", 2, 30)
+        )
+
+        self.assertTrue(success, message)
+        self.assertEqual(db.session.query(Product).count(), 2)
+        self.assertEqual(self._items(), {
+            ("SKU1", 1): (10, "A1"),
+            ("SKU2", 1): (20, "A1"),
+            ("SKU1", 2): (30, "A1"),
+        })
+
+    def test_bulk_updates_existing_items(self):
+        """Test que una segunda importación actualiza los items existentes"""
+        self._run(_csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 20))
+        success, _ = self._run(_csv_row("SKU1", 1, 99, location="Z9") + _csv_row("SKU3", 1, 5))
+
+        self.assertTrue(success)
+        self.assertEqual(db.session.query(Product).count(), 3)
+        self.assertEqual(self._items()[("SKU1", 1)], (99, "Z9"))
+        self.assertEqual(self._items()[("SKU2", 1)], (20, "A1"))
+
+    def test_bulk_last_row_wins_within_chunk(self):
+        """Test que filas repetidas en un mismo bloque se resuelven con la última"""
+        success, _ = self._run(_csv_row("SKU1", 1, 10) + _csv_row("SKU1", 1, 15), chunk_size=10)
+
+        self.assertTrue(success)
+        self.assertEqual(self._items(), {("SKU1", 1): (15, "A1")})
+
+    def test_bulk_with_parallel_parsing(self):
+        """Test que la conversión en procesos aplica las filas en orden"""
+        blob = InMemoryBlob("catalogo.csv", HEADER + "".join(
+            _csv_row(f"SKU{i}", 1, i) for i in range(1, 11)
+        ) + _csv_row("SKU1", 1, 100))
+        processor = CSVProcessor("test-bucket", "catalogo.csv", blob=blob, streaming=True,
+                                 mode='bulk', chunk_size=3, parse_workers=2)
+
+        success, _ = processor.process()
+
+        self.assertTrue(success)
+        self.assertEqual(processor.rows_processed, 11)
+        items = self._items()
+        self.assertEqual(len(items), 10)
+        # La última aparición del SKU en el archivo es la que queda
+        self.assertEqual(items[("SKU1", 1)], (100, "A1"))
+
+    def test_bulk_from_storage_backend(self):
+        """Test que sin blob explícito el archivo se obtiene del backend configurado"""
+        backend = InMemoryStorageBackend()
+        backend.put("test-bucket", "catalogo.csv", HEADER + _csv_row("SKU1", 1, 10))
+        set_storage_backend(backend)
+        try:
+            success, _ = CSVProcessor("test-bucket", "catalogo.csv", mode='bulk').process()
+        finally:
+            set_storage_backend(None)
+
+        self.assertTrue(success)
+        self.assertEqual(self._items(), {("SKU1", 1): (10, "A1")})
+
+    def test_bulk_invalid_row_rolls_back(self):
+        """Test que una fila inválida revierte la importación"""
+        success, message = self._run(_csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, "x"), chunk_size=10)
+
+        self.assertFalse(success)
+        self.assertTrue(message.startswith("Error procesando el archivo:"))
+        self.assertEqual(db.session.query(Product).count(), 0)
+
+    def test_bulk_falls_back_to_row_without_unique_index(self):
+        """Test que si el índice único no se pudo crear, la importación usa el modo 'row'"""
+        db.session.execute(text("DROP INDEX ix_inventory_items_product_warehouse"))
+        db.session.add_all([InventoryItem(product_id=99, warehouse_id=1, quantity=1),
+                            InventoryItem(product_id=99, warehouse_id=1, quantity=2)])
+        db.session.commit()
+        try:
+            create_missing_indexes()
+            self.assertIn('ix_inventory_items_product_warehouse', failed_unique_indexes)
+
+            blob = InMemoryBlob("catalogo.csv", HEADER + _csv_row("SKU2", 1, 10))
+            processor = CSVProcessor("test-bucket", "catalogo.csv", blob=blob, streaming=True, mode='bulk')
+            self.assertEqual(processor.mode, 'row')
+            success, message = processor.process()
+        finally:
+            failed_unique_indexes.clear()
+
+        self.assertTrue(success, message)
+        self.assertEqual(self._items()[("SKU2", 1)], (10, "A1"))
+
+class TestCSVImportCheckpoints(DatabaseTestCase):
+    """Pruebas de confirmación por bloques y reanudación de importaciones"""
+
+    def _processor(self, blob, mode='bulk'):
+        return CSVProcessor("test-bucket", "catalogo.csv", blob=blob, streaming=True,
+                            mode=mode, chunk_size=2, checkpoints=True)
+
+    def _quantity(self, sku):
+        return db.session.query(InventoryItem.quantity).join(
+            Product, Product.id == InventoryItem.product_id
+        ).filter(Product.sku == sku).scalar()
+
+    def test_failed_chunk_keeps_previous_chunks(self):
+        """Test que un error solo revierte el bloque en curso"""
+        blob = InMemoryBlob("catalogo.csv", HEADER + _csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 20)
+                            + _csv_row("SKU3", 1, "x") + _csv_row("SKU4", 1, 40), generation=7)
+
+        success, _ = self._processor(blob).process()
+
+        self.assertFalse(success)
+        self.assertEqual(self._quantity("SKU1"), 10)
+        self.assertIsNone(self._quantity("SKU3"))
+        checkpoint = db.session.query(ImportCheckpoint).one()
+        self.assertEqual((checkpoint.generation, checkpoint.last_row, checkpoint.completed), (7, 2, False))
+
+    def test_redelivery_resumes_from_checkpoint(self):
+        """Test que una reentrega continúa desde la última fila confirmada"""
+        blob = InMemoryBlob("catalogo.csv", HEADER + _csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 20)
+                            + _csv_row("SKU3", 1, "x") + _csv_row("SKU4", 1, 40), generation=7)
+        self._processor(blob).process()
+
+        # Las filas ya confirmadas no se vuelven a aplicar aunque cambien en el archivo
+        blob.data = (HEADER + _csv_row("SKU1", 1, 11) + _csv_row("SKU2", 1, 21)
+                     + _csv_row("SKU3", 1, 30) + _csv_row("SKU4", 1, 40)).encode('utf-8')
+        success, _ = self._processor(blob, mode='row').process()
+
+        self.assertTrue(success)
+        self.assertEqual(self._quantity("SKU1"), 10)
+        self.assertEqual(self._quantity("SKU3"), 30)
+        self.assertEqual(self._quantity("SKU4"), 40)
+        checkpoint = db.session.query(ImportCheckpoint).one()
+        self.assertEqual((checkpoint.last_row, checkpoint.completed), (4, True))
+
+    def test_completed_file_is_skipped(self):
+        """Test que un archivo ya completado no se vuelve a procesar"""
+        blob = InMemoryBlob("catalogo.csv", HEADER + _csv_row("SKU1", 1, 10), generation=7)
+        self._processor(blob).process()
+
+        success, message = self._processor(blob).process()
+
+        self.assertTrue(success)
+        self.assertEqual(message, "Archivo ya procesado anteriormente")
+
+    def test_new_generation_starts_over(self):
+        """Test que una nueva versión del archivo se procesa desde el inicio"""
+        blob = InMemoryBlob("catalogo.csv", HEADER + _csv_row("SKU1", 1, 10), generation=7)
+        self._processor(blob).process()
+
+        newer = InMemoryBlob("catalogo.csv", HEADER + _csv_row("SKU1", 1, 99), generation=8)
+        success, _ = self._processor(newer).process()
+
+        self.assertTrue(success)
+        self.assertEqual(self._quantity("SKU1"), 99)
+        self.assertEqual(db.session.query(ImportCheckpoint).count(), 2)
+
+class TestCSVDiffImport(DatabaseTestCase):
+    """Pruebas de la reimportación incremental por huellas de contenido"""
+
+    def _run(self, csv_text, mode='bulk'):
+        blob = InMemoryBlob("catalogo.csv", HEADER + csv_text)
+        processor = CSVProcessor("test-bucket", "catalogo.csv", blob=blob, streaming=True,
+                                 mode=mode, chunk_size=2, diff=True, source="proveedor-1")
+        success, message = processor.process()
+        self.assertTrue(success, message)
+        return processor
+
+    def _item(self, sku, warehouse_id):
+        return db.session.query(InventoryItem).join(
+            Product, Product.id == InventoryItem.product_id
+        ).filter(Product.sku == sku, InventoryItem.warehouse_id == warehouse_id).one()
+
+    def _check_diff(self, mode):
+        self._run(_csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 20) + _csv_row("SKU3", 1, 30), mode)
+        # Marcar el item sin cambios para detectar si se reescribe
+        self._item("SKU1", 1).updated_at = 1
+        db.session.commit()
+
+        processor = self._run(_csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 25) + _csv_row("SKU4", 2, 40), mode)
+
+        self.assertEqual((processor.rows_processed, processor.rows_skipped, processor.rows_removed), (3, 1, 1))
+        self.assertEqual(self._item("SKU1", 1).updated_at, 1)
+        self.assertEqual(self._item("SKU2", 1).quantity, 25)
+        self.assertEqual(self._item("SKU4", 2).quantity, 40)
+        # La fila retirada queda sin existencias pero conserva el item
+        self.assertEqual(self._item("SKU3", 1).quantity, 0)
+        self.assertEqual(
+            {(row.sku, row.warehouse_id) for row in db.session.query(ImportRowHash)},
+            {("SKU1", 1), ("SKU2", 1), ("SKU4", 2)}
+        )
+
+    def test_diff_bulk_mode(self):
+        """Test que el modo diff solo escribe filas nuevas, modificadas o retiradas (bulk)"""
+        self._check_diff('bulk')
+
+    def test_diff_row_mode(self):
+        """Test que el modo diff solo escribe filas nuevas, modificadas o retiradas (fila por fila)"""
+        self._check_diff('row')
+
+    def test_identical_reimport_writes_nothing(self):
+        """Test que un catálogo idéntico no modifica ningún item"""
+        csv_text = _csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 20)
+        self._run(csv_text)
+
+        processor = self._run(csv_text)
+
+        self.assertEqual((processor.rows_skipped, processor.rows_removed), (2, 0))
+
+    def test_removed_rows_found_in_database(self):
+        """Test que las filas ausentes se buscan en la base por bloques, incluidas las huellas sin marca"""
+        self._run("".join(_csv_row(f"SKU{i}", 1, i) for i in range(1, 6)))
+        # Huella guardada antes de que existiera run_id
+        db.session.query(ImportRowHash).filter_by(sku="SKU5").update({'run_id': None})
+        db.session.commit()
+
+        processor = self._run(_csv_row("SKU1", 1, 1) + _csv_row("SKU5", 1, 5))
+
+        self.assertEqual((processor.rows_skipped, processor.rows_removed), (2, 3))
+        self.assertEqual([self._item(f"SKU{i}", 1).quantity for i in range(1, 6)], [1, 0, 0, 0, 5])
+        self.assertEqual({row.sku for row in db.session.query(ImportRowHash)}, {"SKU1", "SKU5"})
+
+    def test_run_id_added_to_existing_table(self):
+        """Test que al iniciar se agrega run_id a una tabla de huellas creada antes de la columna"""
+        db.session.execute(text("ALTER TABLE import_row_hashes DROP COLUMN run_id"))
+        db.session.commit()
+
+        create_missing_columns()
+
+        self.assertIn('run_id', {column['name'] for column in inspect(db.engine).get_columns('import_row_hashes')})
+        self.assertEqual(self._run(_csv_row("SKU1", 1, 10)).rows_processed, 1)
+
+class TestCSVPartialImport(DatabaseTestCase):
+    """Pruebas del modo parcial: las filas válidas se aplican y las inválidas van al archivo de rechazos"""
+
+    def setUp(self):
+        super().setUp()
+        self.backend = InMemoryStorageBackend()
+        set_storage_backend(self.backend)
+
+    def tearDown(self):
+        set_storage_backend(None)
+        super().tearDown()
+
+    def _run(self, csv_text, mode='bulk', filename="catalogo.csv"):
+        self.backend.put("test-bucket", filename, HEADER + csv_text, generation=5)
+        processor = CSVProcessor("test-bucket", filename, streaming=True, mode=mode,
+                                 chunk_size=2, partial=True, generation=5)
+        success, message = processor.process()
+        self.assertTrue(success, message)
+        return processor, message
+
+    def _rejects(self, filename="catalogo.csv"):
+        blob = self.backend.get_blob("test-bucket", f"rejects/{filename}.5.rejects.csv")
+        return list(csv.DictReader(io.StringIO(blob.download_as_text())))
+
+    def _quantities(self):
+        return {
+            sku: quantity
+            for sku, quantity in db.session.query(Product.sku, InventoryItem.quantity).join(
+                Product, Product.id == InventoryItem.product_id
+            )
+        }
+
+    def _check_invalid_rows(self, mode):
+        processor, message = self._run(
+            _csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, "x") + _csv_row("SKU3", 1, -4)
+            + _csv_row("SKU4", 1, 40) + _csv_row("", 1, 5),
+            mode=mode
+        )
+
+        self.assertEqual(self._quantities(), {"SKU1": 10, "SKU4": 40})
+        self.assertEqual((processor.rows_processed, processor.rows_rejected), (5, 3))
+        self.assertEqual(processor.reject_file, "test-bucket/rejects/catalogo.csv.5.rejects.csv")
+        self.assertIn("3 filas rechazadas", message)
+
+        rejects = self._rejects()
+        self.assertEqual([row['line'] for row in rejects], ['2', '3', '5'])
+        self.assertEqual(rejects[1]['reason'], "La cantidad no puede ser negativa")
+        self.assertEqual(rejects[0]['quantity'], "x")
+
+    def test_partial_bulk_mode(self):
+        """Test que el modo parcial rechaza solo las filas inválidas (bulk)"""
+        self._check_invalid_rows('bulk')
+
+    def test_partial_row_mode(self):
+        """Test que el modo parcial rechaza solo las filas inválidas (fila por fila)"""
+        self._check_invalid_rows('row')
+
+    def test_database_error_rejects_only_failing_row(self):
+        """Test que un error de base de datos en un bloque se aísla a la fila que lo causa"""
+        original = CSVProcessor._process_chunk
+
+        def failing_chunk(processor, rows):
+            if any(row.sku == "SKU2" for row in rows):
+                raise IntegrityError("INSERT", {}, Exception("restricción violada"))
+            return original(processor, rows)
+
+        with patch.object(CSVProcessor, '_process_chunk', failing_chunk):
+            processor, _ = self._run(_csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, 20) + _csv_row("SKU3", 1, 30))
+
+        self.assertEqual(self._quantities(), {"SKU1": 10, "SKU3": 30})
+        rejects = self._rejects()
+        self.assertEqual([(row['line'], row['sku']) for row in rejects], [('2', 'SKU2')])
+        self.assertIn("restricción violada", rejects[0]['reason'])
+
+    def test_fixed_reject_file_can_be_reimported(self):
+        """Test que el archivo de rechazos corregido se importa como un catálogo más"""
+        self._run(_csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, "x"))
+        fixed = self._rejects()[0]
+        fixed['quantity'] = '20'
+
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=list(fixed))
+        writer.writeheader()
+        writer.writerow(fixed)
+        self.backend.put("test-bucket", "corregido.csv", output.getvalue())
+        success, _ = CSVProcessor("test-bucket", "corregido.csv", streaming=True, mode='bulk',
+                                  partial=True).process()
+
+        self.assertTrue(success)
+        self.assertEqual(self._quantities(), {"SKU1": 10, "SKU2": 20})
+
+    def test_resumed_import_keeps_earlier_rejects(self):
+        """Test que al reanudar una importación parcial se conservan los rechazos de los bloques confirmados"""
+        original = CSVProcessor._process_chunk
+
+        def failing_chunk(processor, rows):
+            if any(row.sku == "SKU3" for row in rows):
+                raise RuntimeError("conexión perdida")
+            return original(processor, rows)
+
+        self.backend.put("test-bucket", "catalogo.csv", HEADER + _csv_row("SKU1", 1, 10) + _csv_row("SKU2", 1, "x")
+                         + _csv_row("SKU3", 1, 30) + _csv_row("SKU4", 1, 40) + _csv_row("SKU5", 1, "y"),
+                         generation=5)
+        with patch.object(CSVProcessor, '_process_chunk', failing_chunk):
+            success, _ = CSVProcessor("test-bucket", "catalogo.csv", streaming=True, mode='bulk', chunk_size=2,
+                                      partial=True, checkpoints=True).process()
+        self.assertFalse(success)
+        self.assertEqual([row['line'] for row in self._rejects()], ['2'])
+
+        processor = CSVProcessor("test-bucket", "catalogo.csv", streaming=True, mode='bulk', chunk_size=2,
+                                 partial=True, checkpoints=True)
+        success, message = processor.process()
+
+        self.assertTrue(success, message)
+        self.assertEqual(self._quantities(), {"SKU1": 10, "SKU3": 30, "SKU4": 40})
+        self.assertEqual(processor.rows_rejected, 2)
+        self.assertEqual([row['line'] for row in self._rejects()], ['2', '5'])
+        self.assertIn("2 filas rechazadas", message)
+
+    def test_no_rejects_no_file(self):
+        """Test que sin filas rechazadas no se sube ningún archivo"""
+        processor, message = self._run(_csv_row("SKU1", 1, 10))
+
+        self.assertEqual(message, "Archivo procesado exitosamente")
+        self.assertIsNone(processor.reject_file)
+        self.assertEqual(list(self.backend.blobs), [("test-bucket", "catalogo.csv")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from app.services import csv_parsing
+from app.services.csv_parsing import ParsedRow, RejectedRow, parse_row, parse_chunk, parse_chunks
+
+def _row(sku, quantity='10'):
+    return {
+        'sku': sku, 'manufacturer_id': '1', 'name': 'Producto', 'description': 'Desc',
+        'unit_price': '10.50', 'storage_conditions': 'Seco', 'delivery_time': '3',
+        'warehouse_id': '2', 'quantity': quantity, 'location': 'A1', 'expiry_date': '1714974947'
+    }
+
+class TestCSVParsing(unittest.TestCase):
+
+    def test_parse_row_converts_types(self):
+        """Test conversión de una fila a tipos"""
+        parsed = parse_row(5, _row('SKU1'))
+
+        self.assertIsInstance(parsed, ParsedRow)
+        self.assertEqual(parsed.line, 5)
+        self.assertEqual(parsed.manufacturer_id, 1)
+        self.assertEqual(parsed.unit_price, 10.5)
+        self.assertEqual(parsed.warehouse_id, 2)
+        self.assertEqual(parsed.quantity, 10)
+        self.assertEqual(parsed.expiry_date, 1714974947)
+
+    def test_parse_row_invalid_value(self):
+        """Test que un valor no numérico se rechaza"""
+        with self.assertRaises(ValueError):
+            parse_row(1, _row('SKU1', quantity='diez'))
+
+    def test_parse_chunk_partial_collects_rejects(self):
+        """Test que en modo parcial las filas inválidas se devuelven como rechazos"""
+        missing = _row('SKU4')
+        del missing['location']
+        extra = {**_row('SKU5'), None: ['sobra']}
+
+        parsed = parse_chunk([(1, _row('SKU1')), (2, _row('SKU2', quantity='diez')),
+                              (3, _row('SKU3', quantity='-1')), (4, missing), (5, extra)], partial=True)
+
+        self.assertIsInstance(parsed[0], ParsedRow)
+        self.assertEqual([type(row) for row in parsed[1:]], [RejectedRow] * 4)
+        self.assertEqual([row.line for row in parsed[1:]], [2, 3, 4, 5])
+        self.assertIn("location", parsed[3].reason)
+
+    def test_parse_chunks_inline_keeps_order(self):
+        """Test conversión en el mismo hilo"""
+        chunks = [[(1, _row('SKU1')), (2, _row('SKU2'))], [(3, _row('SKU3'))]]
+
+        result = list(parse_chunks(iter(chunks), workers=0))
+
+        self.assertEqual([[row.sku for row in chunk] for chunk in result], [['SKU1', 'SKU2'], ['SKU3']])
+
+    def test_parse_chunks_process_pool_keeps_order(self):
+        """Test que el pool de procesos devuelve los bloques en orden de lectura"""
+        chunks = [[(i, _row(f'SKU{i}'))] for i in range(1, 21)]
+
+        result = list(parse_chunks(iter(chunks), workers=2))
+
+        self.assertEqual([chunk[0].line for chunk in result], list(range(1, 21)))
+
+    def test_parse_chunks_process_pool_propagates_errors(self):
+        """Test que un error de conversión en un proceso llega al escritor"""
+        chunks = [[(1, _row('SKU1'))], [(2, _row('SKU2', quantity='x'))]]
+        parsed = parse_chunks(iter(chunks), workers=2)
+
+        self.assertEqual(next(parsed)[0].sku, 'SKU1')
+        with self.assertRaises(ValueError):
+            next(parsed)
+
+    def test_process_pool_does_not_fork(self):
+        """Test que el pool no usa fork: el servidor tiene hilos cuyos locks se copiarían tomados"""
+        list(parse_chunks(iter([[(1, _row('SKU1'))]]), workers=2))
+        pool = csv_parsing._pools[2]
+
+        self.assertNotEqual(pool._mp_context.get_start_method(), 'fork')
+        csv_parsing.shutdown_pools()
+        self.assertEqual(csv_parsing._pools, {})
+
+if __name__ == '__main__':
+    unittest.main()
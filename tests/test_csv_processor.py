@@ -4,6 +4,8 @@ import io
 from datetime import datetime
 from flask import Flask
 from app.services.csv_processor import CSVProcessor
+from app.services.blob_stream import InMemoryBlob
+from app.services.storage_backends import set_storage_backend
 from app.models.product import Product
 from app.models.inventory_item import InventoryItem
 from app import db
@@ -22,6 +24,8 @@ class TestCSVProcessor(unittest.TestCase):
         # Crear un contexto de aplicación para las pruebas
         self.app_context = _test_flask_app.app_context()
         self.app_context.push()
+        # El cliente de GCS se comparte entre importaciones; cada prueba usa su propio mock
+        set_storage_backend(None)
 
         # CSV de ejemplo para las pruebas
         self.sample_csv = """sku,manufacturer_id,name,description,unit_price,storage_conditions,delivery_time,warehouse_id,quantity,location,expiry_date
@@ -32,8 +36,9 @@ SKU456,2,Another Product,This is another test product,20.50,Refrigerated,3,2,50,
     def tearDown(self):
         # Limpiar el contexto de aplicación después de cada prueba
         self.app_context.pop()
+        set_storage_backend(None)
 
-    @patch('app.services.csv_processor.storage.Client')
+    @patch('app.services.storage_backends.storage.Client')
     @patch('app.services.csv_processor.Product.query')
     @patch('app.services.csv_processor.InventoryItem.query')
     @patch('app.services.csv_processor.db.session')
@@ -74,7 +79,7 @@ SKU456,2,Another Product,This is another test product,20.50,Refrigerated,3,2,50,
         self.assertTrue(success)
         self.assertEqual(message, "Archivo procesado exitosamente")
 
-    @patch('app.services.csv_processor.storage.Client')
+    @patch('app.services.storage_backends.storage.Client')
     @patch('app.services.csv_processor.Product.query')
     @patch('app.services.csv_processor.InventoryItem.query')
     @patch('app.services.csv_processor.db.session')
@@ -130,7 +135,7 @@ SKU456,2,Another Product,This is another test product,20.50,Refrigerated,3,2,50,
         self.assertTrue(success)
         self.assertEqual(message, "Archivo procesado exitosamente")
 
-    @patch('app.services.csv_processor.storage.Client')
+    @patch('app.services.storage_backends.storage.Client')
     @patch('app.services.csv_processor.Product.query')
     @patch('app.services.csv_processor.InventoryItem.query')
     @patch('app.services.csv_processor.db.session')
@@ -172,7 +177,7 @@ SKU456,2,Another Product,This is another test product,20.50,Refrigerated,3,2,50,
         self.assertTrue(success)
         self.assertEqual(message, "Archivo procesado exitosamente")
 
-    @patch('app.services.csv_processor.storage.Client')
+    @patch('app.services.storage_backends.storage.Client')
     @patch('app.services.csv_processor.db.session')
     @patch('app.services.csv_processor.Product')
     @patch('app.services.csv_processor.InventoryItem')
@@ -195,7 +200,7 @@ SKU456,2,Another Product,This is another test product,20.50,Refrigerated,3,2,50,
         self.assertFalse(success)
         self.assertEqual(message, "Error procesando el archivo: Error de descarga")
 
-    @patch('app.services.csv_processor.storage.Client')
+    @patch('app.services.storage_backends.storage.Client')
     @patch('app.services.csv_processor.db.session')
     @patch('app.services.csv_processor.Product.query')
     @patch('app.services.csv_processor.InventoryItem.query')
@@ -227,7 +232,7 @@ SKU456,2,Another Product,This is another test product,20.50,Refrigerated,3,2,50,
         self.assertFalse(success)
         self.assertEqual(message, "Error procesando el archivo: Error de base de datos")
 
-    @patch('app.services.csv_processor.storage.Client')
+    @patch('app.services.storage_backends.storage.Client')
     @patch('app.services.csv_processor.db.session')
     @patch('app.services.csv_processor.Product.query')
     @patch('app.services.csv_processor.InventoryItem.query')
@@ -251,5 +256,32 @@ SKU456,2,Another Product,This is another test product,20.50,Refrigerated,3,2,50,
         self.assertFalse(success)
         self.assertTrue("Error procesando el archivo:" in message)
 
+    @patch('app.services.storage_backends.storage.Client')
+    @patch('app.services.csv_processor.Product.query')
+    @patch('app.services.csv_processor.InventoryItem.query')
+    @patch('app.services.csv_processor.db.session')
+    def test_process_streaming_blob(self, mock_db_session, mock_inventory_item_query,
+                                    mock_product_query, mock_storage_client):
+        """Test procesamiento en modo streaming con un blob en memoria"""
+        mock_product_query.filter_by.return_value.first.return_value = None
+        mock_inventory_item_query.filter_by.return_value.first.return_value = None
+
+        blob = InMemoryBlob(self.filename, self.sample_csv)
+        blob.download_as_text = MagicMock(side_effect=AssertionError("no debe descargarse completo"))
+
+        processor = CSVProcessor(self.bucket_name, self.filename, blob=blob, streaming=True)
+        success, message = processor.process()
+
+        # No se crea cliente de GCS cuando se inyecta el blob
+        mock_storage_client.assert_not_called()
+
+        # Se procesaron las dos filas
+        self.assertEqual(mock_product_query.filter_by.call_count, 2)
+        self.assertEqual(mock_db_session.add.call_count, 4)
+        mock_db_session.commit.assert_called_once()
+
+        self.assertTrue(success)
+        self.assertEqual(message, "Archivo procesado exitosamente")
+
 if __name__ == '__main__':
     unittest.main()
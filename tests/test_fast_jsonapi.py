@@ -0,0 +1,58 @@
+import json
+import unittest
+from unittest.mock import patch
+from app import db
+from app.models import Product, InventoryItem
+from app.services import fast_jsonapi
+from tests.base import DatabaseTestCase, add_warehouses
+
+class TestFastJsonapi(DatabaseTestCase):
+    """Serialización por filas de la búsqueda parcial contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        db.session.add(Product(id=1, manufacturer_id=1, name="Jeringa 5ml", sku="JER5", unit_price="12.50"))
+        db.session.add(Product(id=2, manufacturer_id=1, name="Jeringa 10ml", sku="JER10", unit_price=3))
+        add_warehouses(1, 2, 3, 4)
+        for warehouse_id in range(1, 5):
+            db.session.add(InventoryItem(product_id=1, warehouse_id=warehouse_id, quantity=warehouse_id,
+                                         location=f"A-{warehouse_id}"))
+        db.session.add(InventoryItem(product_id=2, warehouse_id=1, quantity=7))
+        db.session.commit()
+
+    def test_included_deduplicated(self):
+        """Test que cada producto aparece una vez en included aunque esté en varias bodegas"""
+        response = self.client.get('/api/inventory/search_by_product_name_partial?name=jeringa')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        body = response.get_json()
+        self.assertEqual(len(body['data']), 5)
+        self.assertEqual(sorted(product['id'] for product in body['included']), ['1', '2'])
+        product = next(product for product in body['included'] if product['id'] == '1')
+        self.assertEqual(product['attributes']['unit_price'], 12.5)
+        self.assertEqual(product['attributes']['sku'], "JER5")
+        item = body['data'][0]
+        self.assertEqual(item['attributes']['product_name'], "Jeringa 5ml")
+        self.assertEqual(item['relationships']['product']['data'], {"type": "Product", "id": "1"})
+        self.assertEqual(body['meta'], {"count": 5, "limit": 250, "total": 5})
+
+    def test_cursor_mode(self):
+        """Test que el modo cursor pagina las filas de columnas"""
+        body = self.client.get('/api/inventory/search_by_product_name_partial?name=jeringa'
+                               '&page[limit]=3&page[cursor]=').get_json()
+        self.assertEqual([item['id'] for item in body['data']], ['1', '2', '3'])
+        body = self.client.get(body['links']['next']).get_json()
+        self.assertEqual([item['id'] for item in body['data']], ['4', '5'])
+        self.assertIsNone(body['links']['next'])
+
+    def test_dumps_without_orjson(self):
+        """Test que sin orjson se codifica con json y el resultado es equivalente"""
+        document = {"data": [{"name": "Jeringa ñ", "quantity": 3, "expiry_date": None}]}
+        with patch.object(fast_jsonapi, 'orjson', None):
+            fallback = fast_jsonapi.dumps(document)
+        self.assertEqual(json.loads(fallback), document)
+        self.assertEqual(json.loads(fast_jsonapi.dumps(document)), document)
+
+if __name__ == '__main__':
+    unittest.main()
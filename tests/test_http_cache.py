@@ -0,0 +1,157 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event
+from app import db
+from app.models import Manufacturer, Product, InventoryItem, InventoryTransaction, Warehouse
+from app.services.http_cache import compute_etag, init_http_cache, route_tables
+from app.services.write_versions import bump_tables
+from tests.base import DatabaseTestCase, add_warehouses
+
+@patch('app.services.http_cache.Config.HTTP_ETAGS', True)
+class TestConditionalGet(DatabaseTestCase):
+    """GET condicionales con ETag derivados de las versiones de escritura"""
+
+    exposed_models = (Product, InventoryItem, Warehouse)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        init_http_cache(cls.app)
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1)
+        db.session.add(Product(id=1, manufacturer_id=1, name="Guantes", sku="SKU1", unit_price=1))
+        db.session.add(InventoryItem(id=1, product_id=1, warehouse_id=1, quantity=5))
+        db.session.commit()
+        self.queries = []
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._count)
+        super().tearDown()
+
+    def _count(self, conn, cursor, statement, *args):
+        self.queries.append(statement)
+
+    def test_not_modified_skips_queries(self):
+        """Test que If-None-Match con el ETag vigente responde 304 leyendo solo las versiones de escritura"""
+        url = '/api/inventory/search_by_product_name_partial?name=guantes'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=0, s-maxage=5')
+
+        self.queries.clear()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(response.data, b'')
+        self.assertEqual(len(self.queries), 1)
+        self.assertIn('FROM table_versions', self.queries[0])
+
+    def test_etag_changes_after_commit(self):
+        """Test que una escritura confirmada cambia el ETag y una revertida no"""
+        url = '/api/products/'
+        etag = self.client.get(url).headers['ETag']
+
+        db.session.get(InventoryItem, 1).quantity = 7
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        db.session.get(InventoryItem, 1).quantity = 7
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_etag_shared_across_instances(self):
+        """Test que el ETag solo depende de la base: otra instancia lo calcula igual y ve sus escrituras"""
+        url = '/api/products/'
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(compute_etag(url + '?', route_tables(url)), etag[3:-1])
+
+        # Escritura de otra instancia: la versión sube en la base y no en la memoria de este proceso
+        bump_tables(db.session.connection(), {'products'})
+        db.session.commit()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_included_tables_change_etag(self):
+        """Test que los recursos incluibles de /api/products forman parte del ETag"""
+        for table in ('manufacturers', 'product_images', 'product_country_regulations'):
+            self.assertIn(table, route_tables('/api/products'))
+        url = '/api/products/'
+        etag = self.client.get(url).headers['ETag']
+
+        db.session.get(Manufacturer, 1).name = "Otro fabricante"
+        db.session.commit()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_etag_depends_on_query_string(self):
+        """Test que cada combinación de parámetros tiene su propio ETag"""
+        first = self.client.get('/api/inventory/search_by_product_name_partial?name=guantes')
+        second = self.client.get('/api/inventory/search_by_product_name_partial?name=guan')
+
+        self.assertNotEqual(first.headers['ETag'], second.headers['ETag'])
+
+    def test_errors_and_other_routes_without_etag(self):
+        """Test que las respuestas con error, o con HTTP_ETAGS apagado, no llevan ETag"""
+        response = self.client.get('/api/inventory/search_by_product_name_partial')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response.headers)
+
+        with patch('app.services.http_cache.Config.HTTP_ETAGS', False):
+            response = self.client.get('/api/products/')
+        self.assertNotIn('ETag', response.headers)
+
+    def test_ledger_etag_changes_after_transaction(self):
+        """Test que un movimiento nuevo cambia el ETag del reporte de conciliación"""
+        url = '/api/inventory/ledger/reconciliation'
+        etag = self.client.get(url).headers['ETag']
+
+        db.session.add(InventoryTransaction(inventory_item_id=1, transaction_type='IN', quantity=5,
+                                            transaction_date=1000, user_id=1))
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['items_with_drift'], 0)
+
+    def test_history_etag_changes_after_transaction(self):
+        """Test que un movimiento nuevo cambia el ETag del historial"""
+        url = '/api/inventory/transactions?inventory_item_id=1'
+        etag = self.client.get(url).headers['ETag']
+
+        db.session.add(InventoryTransaction(inventory_item_id=1, transaction_type='IN', quantity=2,
+                                            transaction_date=1000, user_id=1))
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['data']), 1)
+
+    def test_route_tables_by_most_specific_prefix(self):
+        """Test que el historial, el libro y la ocupación dependen de sus propias tablas"""
+        self.assertEqual(route_tables('/api/inventory/transactions'), ('inventory_transactions',))
+        self.assertIn('inventory_snapshots', route_tables('/api/inventory/ledger/quantities'))
+        self.assertIn('warehouse_stock_totals', route_tables('/api/inventory/utilization/warehouses'))
+        self.assertEqual(route_tables('/api/inventory/all_items'),
+                         ('inventory_items', 'products', 'warehouses', 'inventory_transactions'))
+
+    def test_included_warehouse_changes_etag(self):
+        """Test que renombrar la bodega incluida con include=warehouse cambia el ETag de los items"""
+        url = '/api/inventory/all_items?include=warehouse'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        db.session.get(Warehouse, 1).name = "Bodega renombrada"
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from app import db
+from app.models import ImportJob
+from app.services.import_jobs import ImportJobManager, ImportQueueFullError, QUEUED, RUNNING, SUCCEEDED, FAILED
+from tests.base import DatabaseTestCase
+
+class TestImportJobManager(DatabaseTestCase):
+    """Trabajos de importación guardados en import_jobs contra SQLite"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Base en archivo: los hilos del pool usan su propia conexión, como en PostgreSQL
+        cls.directory = tempfile.mkdtemp()
+        cls.database_uri = f"sqlite:///{os.path.join(cls.directory, 'jobs.db')}"
+        super().setUpClass()
+        with cls.app.app_context():
+            # WAL: la sesión de la prueba no bloquea las escrituras de los hilos mientras lee
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.manager = ImportJobManager(max_workers=1, max_queued=1, max_attempts=2, stale_after=60)
+
+    @staticmethod
+    def _processor(mock_csv_processor, process):
+        processor = MagicMock(rows_processed=0, rows_rejected=0, reject_file=None)
+        processor.process.side_effect = process
+        mock_csv_processor.return_value = processor
+        return processor
+
+    def _finished(self, job):
+        self.manager.wait(job.id, timeout=5)
+        db.session.expire_all()
+        return db.session.get(ImportJob, job.id)
+
+    @patch('app.services.import_jobs.Config.PUBSUB_DEDUPE', True)
+    @patch('app.services.import_jobs.pubsub_dedupe')
+    @patch('app.services.import_jobs.CSVProcessor')
+    def test_job_succeeds_and_reports_progress(self, mock_csv_processor, mock_pubsub_dedupe):
+        """Test que un trabajo exitoso guarda su avance y solo entonces registra el mensaje"""
+        def process():
+            on_progress = mock_csv_processor.call_args.kwargs['on_progress']
+            on_progress(500)
+            self.assertEqual(db.session.get(ImportJob, job_id).rows_processed, 500)
+            mock_pubsub_dedupe.record_message.assert_not_called()
+            processor.rows_processed = 1000
+            return True, "Archivo procesado exitosamente"
+
+        processor = self._processor(mock_csv_processor, process)
+
+        job, created = self.manager.submit(self.app, 'test-bucket', 'test-file.csv', '42', message_id='m-1')
+        job_id = job.id
+        job = self._finished(job)
+
+        self.assertTrue(created)
+        self.assertEqual((job.state, job.attempts, job.rows_processed), (SUCCEEDED, 1, 1000))
+        self.assertEqual(job.message, "Archivo procesado exitosamente")
+        self.assertIsNone(job.active_key)
+        self.assertEqual(mock_csv_processor.call_args.kwargs['generation'], '42')
+        mock_pubsub_dedupe.record_message.assert_called_once_with('m-1', 'test-bucket', 'test-file.csv', '42')
+        mock_pubsub_dedupe.mark_completed.assert_called_once_with('test-bucket', 'test-file.csv', '42')
+
+        # El estado se lee de la base: otra instancia lo ve igual
+        other = ImportJobManager(max_workers=1, max_queued=1)
+        self.assertEqual(other.get(job_id).to_dict()['state'], SUCCEEDED)
+
+    @patch('app.services.import_jobs.pubsub_dedupe')
+    @patch('app.services.import_jobs.CSVProcessor')
+    def test_failed_job_is_retried_until_attempts_run_out(self, mock_csv_processor, mock_pubsub_dedupe):
+        """Test que un trabajo fallido conserva el archivo para reintentarlo hasta agotar los intentos"""
+        mock_csv_processor.side_effect = Exception("Error de almacenamiento")
+
+        job, _ = self.manager.submit(self.app, 'test-bucket', 'test-file.csv', message_id='m-1')
+        job = self._finished(job)
+        self.assertEqual((job.state, job.attempts, job.message), (FAILED, 1, "Error: Error de almacenamiento"))
+        self.assertIsNotNone(job.active_key)
+
+        # La reentrega del mismo archivo lo retoma en lugar de crear otro trabajo
+        again, created = self.manager.submit(self.app, 'test-bucket', 'test-file.csv')
+        self.assertFalse(created)
+        self.assertEqual(again.id, job.id)
+        job = self._finished(job)
+        self.assertEqual((job.state, job.attempts), (FAILED, 2))
+        self.assertIsNone(job.active_key)
+        mock_pubsub_dedupe.record_message.assert_not_called()
+
+    @patch('app.services.import_jobs.CSVProcessor')
+    def test_duplicate_submission_returns_active_job(self, mock_csv_processor):
+        """Test que el mismo archivo no se importa dos veces en paralelo"""
+        release = threading.Event()
+        self._processor(mock_csv_processor, lambda: release.wait(5) and (True, "ok"))
+
+        first, _ = self.manager.submit(self.app, 'test-bucket', 'test-file.csv')
+        second, created = self.manager.submit(self.app, 'test-bucket', 'test-file.csv')
+        release.set()
+        self._finished(first)
+
+        self.assertFalse(created)
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(mock_csv_processor.call_count, 1)
+
+    @patch('app.services.import_jobs.CSVProcessor')
+    def test_queue_full(self, mock_csv_processor):
+        """Test que se rechazan trabajos cuando el pool y la cola están llenos"""
+        release = threading.Event()
+        self._processor(mock_csv_processor, lambda: release.wait(5) and (True, "ok"))
+
+        first, _ = self.manager.submit(self.app, 'test-bucket', 'a.csv')
+        second, _ = self.manager.submit(self.app, 'test-bucket', 'b.csv')
+        with self.assertRaises(ImportQueueFullError):
+            self.manager.submit(self.app, 'test-bucket', 'c.csv')
+        release.set()
+        self._finished(first)
+        self._finished(second)
+        self.assertIsNone(db.session.query(ImportJob).filter_by(filename='c.csv').first())
+
+    @patch('app.services.import_jobs.CSVProcessor')
+    def test_resume_abandoned_and_failed_jobs(self, mock_csv_processor):
+        """Test que al iniciar se retoman los trabajos sin avances y los fallidos, pero no los vivos"""
+        self._processor(mock_csv_processor, lambda: (True, "ok"))
+        old = int(time.time()) - 3600
+        for job_id, state, heartbeat in (('abandoned', RUNNING, old), ('failed', FAILED, old),
+                                         ('alive', RUNNING, int(time.time())), ('queued', QUEUED, old)):
+            db.session.add(ImportJob(id=job_id, bucket='b', filename=f'{job_id}.csv', state=state, attempts=1,
+                                     active_key=ImportJob.key_for('b', f'{job_id}.csv', None), heartbeat_at=heartbeat))
+        db.session.commit()
+
+        manager = ImportJobManager(max_workers=1, max_queued=5, stale_after=60)
+        self.assertEqual(manager.resume(self.app), 3)
+        for job_id in ('abandoned', 'failed', 'queued'):
+            manager.wait(job_id, timeout=5)
+        db.session.expire_all()
+
+        states = {job.id: (job.state, job.attempts) for job in db.session.query(ImportJob)}
+        self.assertEqual(states, {'abandoned': (SUCCEEDED, 2), 'failed': (SUCCEEDED, 2),
+                                  'queued': (SUCCEEDED, 2), 'alive': (RUNNING, 1)})
+        self.assertEqual(manager.resume(self.app), 0)
+
+if __name__ == '__main__':
+    unittest.main()
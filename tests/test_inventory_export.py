@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+import unittest
+from unittest.mock import patch
+from app import db
+from app.models import InventoryItem
+from tests.base import DatabaseTestCase, add_products, add_warehouses
+
+class TestInventoryExport(DatabaseTestCase):
+    """Exportación por streaming de /api/inventory/export contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1, 2)
+        add_products(*range(1, 6))
+        for i in range(1, 6):
+            db.session.add(InventoryItem(id=i, product_id=i, warehouse_id=1 + i % 2, quantity=i * 10,
+                                         location=f"A-{i}", created_at=1, updated_at=100 + i))
+        db.session.commit()
+
+    @patch('app.services.inventory_export.Config.EXPORT_BATCH_SIZE', 2)
+    def test_ndjson_streams_in_batches(self):
+        """Test que el NDJSON trae todos los items y se entrega por bloques"""
+        response = self.client.get('/api/inventory/export')
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertTrue(response.is_streamed)
+        chunks = list(response.response)
+        self.assertEqual(len(chunks), 3)
+        rows = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [1, 2, 3, 4, 5])
+        self.assertEqual(rows[0], {
+            "id": 1, "product_id": 1, "warehouse_id": 2, "quantity": 10, "location": "A-1",
+            "expiry_date": None, "created_at": 1, "updated_at": 101
+        })
+
+    def test_csv_with_product_and_filters(self):
+        """Test que el CSV aplica los filtros e incluye SKU y nombre del producto"""
+        response = self.client.get('/api/inventory/export?format=csv&include=product&warehouse_id=2&updated_since=102')
+
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=inventory.csv')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['id'] for row in rows], ['3', '5'])
+        self.assertEqual(rows[0]['product_sku'], 'SKU3')
+        self.assertEqual(rows[0]['product_name'], 'Producto 3')
+
+    def test_csv_without_rows_has_header(self):
+        """Test que una exportación vacía devuelve solo el encabezado"""
+        response = self.client.get('/api/inventory/export?format=csv&warehouse_id=9')
+
+        self.assertEqual(response.get_data(as_text=True).strip(),
+                         'id,product_id,warehouse_id,quantity,location,expiry_date,created_at,updated_at')
+
+    def test_invalid_parameters(self):
+        """Test que un formato o una relación no admitidos devuelven 400"""
+        response = self.client.get('/api/inventory/export?format=xml')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "Unsupported export format: xml"})
+
+        response = self.client.get('/api/inventory/export?include=transactions')
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,11 +22,10 @@ class TestInventoryItem(unittest.TestCase):
         # Mock the query behavior
         mock_query = MagicMock()
         mock_query.filter_by.return_value.first.return_value = mock_inventory_item
-        InventoryItem.query = mock_query
-
-        # Test the query
-        retrieved = InventoryItem.query.filter_by(product_id=123).first()
-        self.assertEqual(retrieved, mock_inventory_item)
+        with patch.object(InventoryItem, 'query', mock_query):
+            # Test the query
+            retrieved = InventoryItem.query.filter_by(product_id=123).first()
+            self.assertEqual(retrieved, mock_inventory_item)
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,7 @@ import pytest
 import json
 import time
 from flask import Flask
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 from app.routes.inventory import inventory_bp
 from app.models.inventory_item import InventoryItem
@@ -58,6 +59,19 @@ def create_mock_inventory_item(id=1, product=None, warehouse_id=1, quantity=50):
     mock_item.updated_at = int(time.time())
     return mock_item
 
+def create_mock_item_row(item):
+    """Helper para convertir un item mock en la fila de columnas que lee la búsqueda parcial"""
+    product = item.product
+    return SimpleNamespace(
+        id=item.id, product_id=item.product_id, warehouse_id=item.warehouse_id, quantity=item.quantity,
+        location=item.location, expiry_date=item.expiry_date, created_at=item.created_at,
+        updated_at=item.updated_at, product_name=product.name, product_sku=product.sku,
+        product_description=product.description, product_unit_price=product.unit_price,
+        product_storage_conditions=product.storage_conditions, product_delivery_time=product.delivery_time,
+        product_manufacturer_id=product.manufacturer_id, product_created_at=product.created_at,
+        product_updated_at=product.updated_at
+    )
+
 def test_search_by_product_name_no_name(client):
     """Test para verificar el caso donde no se proporciona el parámetro 'name'"""
     response = client.get('/api/inventory/search_by_product_name')
@@ -77,6 +91,7 @@ def test_search_by_product_name(client, mock_db_query, mock_jsonapi_format_respo
     mock_query.count.return_value = 1
     mock_query.offset.return_value.limit.return_value.all.return_value = [mock_item]
     mock_db_query.join.return_value.filter.return_value = mock_query
+    mock_query.options.return_value = mock_query
 
     # Realizar la solicitud
     response = client.get('/api/inventory/search_by_product_name?name=Test+Product')
@@ -92,9 +107,8 @@ def test_search_by_product_name(client, mock_db_query, mock_jsonapi_format_respo
     mock_jsonapi_format_response.assert_called_once()
     args, kwargs = mock_jsonapi_format_response.call_args
     assert args[0] == [mock_item]
-    assert kwargs['page'] == 0
-    assert kwargs['limit'] == 250
-    assert kwargs['total'] == 1
+    assert kwargs['meta'] == {'offset': 0, 'limit': 250}
+    assert kwargs['count'] == 1
 
 def test_search_by_product_name_with_pagination(client, mock_db_query, mock_jsonapi_format_response):
     """Test para verificar la búsqueda por nombre de producto con paginación personalizada"""
@@ -107,6 +121,7 @@ def test_search_by_product_name_with_pagination(client, mock_db_query, mock_json
     mock_query.count.return_value = 100
     mock_query.offset.return_value.limit.return_value.all.return_value = mock_items
     mock_db_query.join.return_value.filter.return_value = mock_query
+    mock_query.options.return_value = mock_query
 
     # Realizar la solicitud con paginación personalizada
     response = client.get('/api/inventory/search_by_product_name?name=Test+Product&page[offset]=10&page[limit]=10')
@@ -122,9 +137,8 @@ def test_search_by_product_name_with_pagination(client, mock_db_query, mock_json
     mock_jsonapi_format_response.assert_called_once()
     args, kwargs = mock_jsonapi_format_response.call_args
     assert args[0] == mock_items
-    assert kwargs['page'] == 10
-    assert kwargs['limit'] == 10
-    assert kwargs['total'] == 100
+    assert kwargs['meta'] == {'offset': 10, 'limit': 10}
+    assert kwargs['count'] == 100
 
 def test_search_by_product_name_partial_no_name(client):
     """Test para verificar el caso donde no se proporciona el parámetro 'name' en búsqueda parcial"""
@@ -147,8 +161,9 @@ def test_search_by_product_name_partial(client, mock_db_query):
     # Configurar comportamiento del mock para query
     mock_query = MagicMock()
     mock_query.count.return_value = 2
-    mock_query.offset.return_value.limit.return_value.all.return_value = mock_items
+    mock_query.offset.return_value.limit.return_value.all.return_value = [create_mock_item_row(item) for item in mock_items]
     mock_db_query.join.return_value.filter.return_value = mock_query
+    mock_query.with_entities.return_value = mock_query
 
     # Realizar la solicitud
     response = client.get('/api/inventory/search_by_product_name_partial?name=Test')
@@ -179,8 +194,9 @@ def test_search_by_product_name_partial_with_pagination(client, mock_db_query):
     # Configurar comportamiento del mock para query
     mock_query = MagicMock()
     mock_query.count.return_value = 20
-    mock_query.offset.return_value.limit.return_value.all.return_value = mock_items
+    mock_query.offset.return_value.limit.return_value.all.return_value = [create_mock_item_row(item) for item in mock_items]
     mock_db_query.join.return_value.filter.return_value = mock_query
+    mock_query.with_entities.return_value = mock_query
 
     # Realizar la solicitud con paginación personalizada
     response = client.get('/api/inventory/search_by_product_name_partial?name=Test&page[offset]=5&page[limit]=5')
@@ -194,12 +210,14 @@ def test_search_by_product_name_partial_with_pagination(client, mock_db_query):
     assert data["meta"]["count"] == 5
     assert data["meta"]["limit"] == 5
     assert data["meta"]["total"] == 20
+    # El producto repetido en los 5 items se incluye una sola vez
+    assert len(data["included"]) == 1
 
     # Verificar que se usaron los parámetros de paginación correctos
     mock_query.offset.assert_called_once_with(5)
     mock_query.offset().limit.assert_called_once_with(5)
 
-def test_get_all_items(client, mock_jsonapi_format_response):
+def test_get_all_items(client, mock_db_query, mock_jsonapi_format_response):
     """Test para verificar la obtención de todos los items de inventario"""
     # Configurar la respuesta del mock
     mock_jsonapi_format_response.return_value = {'data': [{'id': '1'}, {'id': '2'}]}
@@ -213,10 +231,9 @@ def test_get_all_items(client, mock_jsonapi_format_response):
     # Verificar que se llamó a jsonapi_format_response con los parámetros correctos
     mock_jsonapi_format_response.assert_called_once()
     kwargs = mock_jsonapi_format_response.call_args.kwargs
-    assert kwargs['page'] == 0
-    assert kwargs['limit'] == 250
+    assert kwargs['meta'] == {'offset': 0, 'limit': 250}
 
-def test_get_all_items_with_pagination(client, mock_jsonapi_format_response):
+def test_get_all_items_with_pagination(client, mock_db_query, mock_jsonapi_format_response):
     """Test para verificar la obtención de todos los items de inventario con paginación"""
     # Configurar la respuesta del mock
     mock_jsonapi_format_response.return_value = {'data': [{'id': '1'}, {'id': '2'}]}
@@ -230,6 +247,5 @@ def test_get_all_items_with_pagination(client, mock_jsonapi_format_response):
     # Verificar que jsonapi_format_response fue llamado con los parámetros de paginación correctos
     mock_jsonapi_format_response.assert_called_once()
     kwargs = mock_jsonapi_format_response.call_args.kwargs
-    assert kwargs['page'] == 5
-    assert kwargs['limit'] == 5
+    assert kwargs['meta'] == {'offset': 5, 'limit': 5}
     # No verificamos el 'total' ya que depende de un mock que puede variar entre ejecuciones
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event
+from app import db
+from app.models import Product, InventoryItem, InventoryTransaction
+from tests.base import DatabaseTestCase, add_warehouses
+
+class TestItemLoading(DatabaseTestCase):
+    """Carga de las relaciones de InventoryItem por endpoint y por include="""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1)
+        for i in range(1, 4):
+            db.session.add(Product(id=i, manufacturer_id=1, name="Guantes", sku=f"SKU{i}", unit_price=1))
+            db.session.add(InventoryItem(id=i, product_id=i, warehouse_id=1, quantity=10))
+            for j in range(5):
+                db.session.add(InventoryTransaction(inventory_item_id=i, transaction_type="IN", quantity=2,
+                                                    transaction_date=j, user_id=1))
+        db.session.commit()
+        db.session.expunge_all()
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        self.format_patch = patch('app.routes.inventory.jsonapi_format_response')
+        self.mock_format = self.format_patch.start()
+        self.mock_format.side_effect = lambda items, **kwargs: {"data": [item.id for item in items]}
+
+    def tearDown(self):
+        self.format_patch.stop()
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        super().tearDown()
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def _items(self):
+        return self.mock_format.call_args.args[0]
+
+    def test_all_items_does_not_load_transactions(self):
+        """Test que el listado no une inventory_transactions ni multiplica filas"""
+        response = self.client.get('/api/inventory/all_items?page[total]=none')
+
+        self.assertEqual(response.get_json(), {"data": [1, 2, 3]})
+        self.assertEqual(len(self.statements), 1)
+        self.assertNotIn('inventory_transactions', self.statements[0])
+        self.assertNotIn('warehouses', self.statements[0])
+        self.assertIn('products', self.statements[0])
+
+        # Acceder a los movimientos no dispara consultas: la relación quedó sin cargar
+        self.assertEqual(self._items()[0].transactions, [])
+        self.assertEqual(len(self.statements), 1)
+
+    def test_include_transactions_uses_selectin(self):
+        """Test que include=transactions los carga en una consulta aparte"""
+        response = self.client.get('/api/inventory/all_items?page[total]=none&include=transactions,warehouse')
+
+        self.assertEqual(response.get_json(), {"data": [1, 2, 3]})
+        self.assertEqual(len(self.statements), 2)
+        self.assertIn('warehouses', self.statements[0])
+        self.assertNotIn('inventory_transactions', self.statements[0])
+        self.assertIn('FROM inventory_transactions', self.statements[1])
+        self.assertEqual([len(item.transactions) for item in self._items()], [5, 5, 5])
+        self.assertEqual(self._items()[0].warehouse.name, "Bodega 1")
+        self.assertEqual(len(self.statements), 2)
+
+    def test_search_reuses_product_join(self):
+        """Test que la búsqueda toma el producto del JOIN que ya hace"""
+        self.client.get('/api/inventory/search_by_product_name?name=Guantes&page[total]=none')
+
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(self.statements[0].count('JOIN products'), 1)
+        self.assertEqual(self._items()[0].product.sku, "SKU1")
+        self.assertEqual(len(self.statements), 1)
+
+    def test_invalid_include(self):
+        """Test que una relación desconocida en include= devuelve 400"""
+        response = self.client.get('/api/inventory/all_items?include=product,orders')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "Invalid Relationship 'orders'"})
+
+if __name__ == '__main__':
+    unittest.main()
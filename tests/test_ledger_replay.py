@@ -0,0 +1,104 @@
+import time
+import unittest
+from sqlalchemy import delete, text
+from app import db
+from app.models import InventoryItem, InventorySnapshot, InventoryTransaction
+from app.services.ledger_replay import replay_quantities, take_snapshots
+from tests.base import DatabaseTestCase, add_products, add_warehouses
+
+class TestLedgerReplay(DatabaseTestCase):
+    """Snapshots, repetición del libro y conciliación contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1)
+        add_products(1, 2, 3)
+        for i in (1, 2, 3):
+            db.session.add(InventoryItem(id=i, product_id=i, warehouse_id=1, quantity=0))
+        db.session.commit()
+        self.old = int(time.time()) - 3600
+
+    def _ledger(self, item_id, transaction_type, quantity, date):
+        db.session.add(InventoryTransaction(inventory_item_id=item_id, transaction_type=transaction_type,
+                                            quantity=quantity, transaction_date=date, user_id=1))
+        db.session.commit()
+
+    def test_replay_from_snapshot_and_tail(self):
+        """Test que snapshot más cola da lo mismo que el historial completo, también en un punto"""
+        self._ledger(1, 'IN', 50, self.old)
+        self._ledger(1, 'TRANSFER_OUT', 20, self.old + 10)
+        self._ledger(2, 'IN', 7, self.old + 20)
+
+        self.assertEqual(take_snapshots()[:2], (2, 3))
+        db.session.commit()
+        self._ledger(1, 'ADJUSTMENT', -5, self.old + 30)
+        self._ledger(3, 'TRANSFER_IN', 4, self.old + 40)
+
+        # Segunda toma: solo los items con movimientos nuevos
+        self.assertEqual(take_snapshots()[:2], (2, 5))
+        db.session.commit()
+        snapshots = {(row.inventory_item_id, row.as_of_transaction_id): row.quantity
+                     for row in db.session.query(InventorySnapshot)}
+        self.assertEqual(snapshots, {(1, 3): 30, (2, 3): 7, (1, 5): 25, (3, 5): 4})
+
+        self._ledger(2, 'OUT', 2, self.old + 50)
+        self.assertEqual(replay_quantities([1, 2, 3, 9]), {1: 25, 2: 5, 3: 4, 9: 0})
+        self.assertEqual(replay_quantities([1, 2, 3], as_of_date=self.old + 10), {1: 30, 2: 0, 3: 0})
+        self.assertEqual(replay_quantities([1, 2, 3], as_of_date=self.old + 35), {1: 25, 2: 7, 3: 0})
+        self.assertEqual(replay_quantities([1, 3], as_of_transaction_id=4), {1: 25, 3: 0})
+
+        response = self.client.get('/api/inventory/ledger/quantities?inventory_item_id=2&as_of_transaction_id=5')
+        self.assertEqual(response.get_json(), {"items": [{"id": 2, "quantity": 7}]})
+        self.assertEqual(self.client.get('/api/inventory/ledger/quantities').status_code, 400)
+
+    def test_snapshot_skips_recent_transactions(self):
+        """Test que los movimientos más nuevos que el margen quedan para la siguiente toma"""
+        self._ledger(1, 'IN', 10, self.old)
+        self._ledger(1, 'IN', 5, int(time.time()))
+
+        response = self.client.post('/api/inventory/ledger/snapshots')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"snapshots": 1, "as_of_transaction_id": 1, "as_of_date": self.old})
+        self.assertEqual(self.client.post('/api/inventory/ledger/snapshots').get_json()['snapshots'], 0)
+        self.assertEqual(replay_quantities([1]), {1: 15})
+
+    def test_reconciliation_report(self):
+        """Test que el reporte lista los items cuya cantidad no coincide con el libro"""
+        self._ledger(1, 'IN', 10, self.old)
+        self._ledger(2, 'IN', 3, self.old)
+        take_snapshots()
+        db.session.commit()
+        self._ledger(2, 'ADJUSTMENT', 2, self.old + 1)
+        db.session.query(InventoryItem).filter_by(id=1).update({"quantity": 10})
+        db.session.query(InventoryItem).filter_by(id=2).update({"quantity": 3})
+        db.session.query(InventoryItem).filter_by(id=3).update({"quantity": 8})
+        db.session.commit()
+
+        report = self.client.get('/api/inventory/ledger/reconciliation').get_json()
+        self.assertEqual((report['items_checked'], report['items_with_drift'], report['total_drift']), (3, 2, 10))
+        self.assertEqual([(row['inventory_item_id'], row['ledger_quantity'], row['drift']) for row in report['drift']],
+                         [(3, 0, 8), (2, 5, -2)])
+
+        limited = self.client.get('/api/inventory/ledger/reconciliation?limit=1').get_json()
+        self.assertEqual([row['inventory_item_id'] for row in limited['drift']], [3])
+
+    def test_deleting_item_removes_snapshots(self):
+        """Test que borrar un item con snapshots, por el ORM o con DELETE directo, borra sus snapshots"""
+        db.session.execute(text("PRAGMA foreign_keys=ON"))
+        self._ledger(1, 'IN', 10, self.old)
+        self._ledger(2, 'IN', 3, self.old)
+        self._ledger(3, 'IN', 4, self.old)
+        take_snapshots()
+        db.session.commit()
+
+        db.session.delete(db.session.get(InventoryItem, 1))
+        db.session.commit()
+        db.session.execute(delete(InventoryTransaction).where(InventoryTransaction.inventory_item_id == 2))
+        db.session.execute(delete(InventoryItem).where(InventoryItem.id == 2))
+        db.session.commit()
+
+        self.assertEqual([row.inventory_item_id for row in db.session.query(InventorySnapshot)], [3])
+        self.assertEqual(replay_quantities([3]), {3: 4})
+
+if __name__ == '__main__':
+    unittest.main()
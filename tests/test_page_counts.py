@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event, insert
+from app import db
+from app.models import Product, InventoryItem
+from app.services.page_counts import reset_count_cache
+from app.services.write_versions import table_versions
+from tests.base import DatabaseTestCase, add_warehouses
+
+class TestPageTotals(DatabaseTestCase):
+    """Modos de page[total] en los listados de inventario contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1)
+        for i in range(1, 6):
+            db.session.add(Product(id=i, manufacturer_id=1, name=f"Guantes talla {i}", sku=f"SKU{i}", unit_price=1))
+            db.session.add(InventoryItem(id=i, product_id=i, warehouse_id=1, quantity=i))
+        db.session.commit()
+        reset_count_cache()
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        super().tearDown()
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def _counts(self):
+        return sum('count(' in sql.lower() for sql in self.statements)
+
+    def _total(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.get_json()['meta']['total']
+
+    def test_cached_total_reused_until_write(self):
+        """Test que el conteo en caché se reutiliza y se invalida al confirmar una escritura"""
+        url = '/api/inventory/search_by_product_name_partial?name=guantes&page[limit]=2&page[total]=cached'
+
+        self.assertEqual(self._total(url), 5)
+        self.assertEqual(self._total(url + '&page[offset]=2'), 5)
+        # La clave no distingue mayúsculas, como la búsqueda
+        self.assertEqual(self._total(url.replace('guantes', 'GUANTES')), 5)
+        self.assertEqual(self._counts(), 1)
+
+        db.session.delete(db.session.get(InventoryItem, 5))
+        db.session.commit()
+
+        self.assertEqual(self._total(url), 4)
+        self.assertEqual(self._counts(), 2)
+        self.assertGreater(table_versions(('inventory_items',))[0], 0)
+
+    def test_cached_total_invalidated_by_bulk_statements(self):
+        """Test que los INSERT masivos de la importación también invalidan los conteos"""
+        url = '/api/inventory/search_by_product_name_partial?name=guantes&page[total]=cached'
+        self.assertEqual(self._total(url), 5)
+
+        add_warehouses(2)
+        db.session.flush()
+        db.session.execute(insert(InventoryItem.__table__), [
+            {'id': 6, 'product_id': 1, 'warehouse_id': 2, 'quantity': 1, 'created_at': 0, 'updated_at': 0}
+        ])
+        db.session.commit()
+
+        self.assertEqual(self._total(url), 6)
+
+    def test_cached_total_kept_after_rollback(self):
+        """Test que una escritura revertida no invalida los conteos"""
+        url = '/api/inventory/search_by_product_name_partial?name=guantes&page[total]=cached'
+        self._total(url)
+
+        db.session.delete(db.session.get(InventoryItem, 5))
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertEqual(self._total(url), 5)
+        self.assertEqual(self._counts(), 1)
+
+    def test_none_skips_count(self):
+        """Test que page[total]=none no cuenta y devuelve total nulo"""
+        url = '/api/inventory/search_by_product_name_partial?name=guantes&page[total]=none'
+
+        self.assertIsNone(self._total(url))
+        self.assertEqual(self._counts(), 0)
+
+    def test_estimate_falls_back_to_cached_outside_postgresql(self):
+        """Test que la estimación usa el conteo exacto en caché si el motor no es PostgreSQL"""
+        url = '/api/inventory/search_by_product_name_partial?name=guantes&page[total]=estimate'
+
+        self.assertEqual(self._total(url), 5)
+        self.assertEqual(self._total(url), 5)
+        self.assertEqual(self._counts(), 1)
+
+    @patch('app.routes.inventory.jsonapi_format_response')
+    def test_all_items_total_modes(self, mock_format):
+        """Test que all_items pasa el total según el modo y rechaza modos desconocidos"""
+        mock_format.return_value = {"data": []}
+
+        self.client.get('/api/inventory/all_items?page[total]=none')
+        self.assertIsNone(mock_format.call_args.kwargs['count'])
+        self.client.get('/api/inventory/all_items')
+        self.assertEqual(mock_format.call_args.kwargs['count'], 5)
+
+        response = self.client.get('/api/inventory/all_items?page[total]=approx')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "Unsupported total mode: approx"})
+
+class TestOffsetResponses(DatabaseTestCase):
+    """Listados con page[offset] serializados por el formateador real de SAFRS"""
+
+    exposed_models = (InventoryItem, Product)
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1)
+        for i in range(1, 4):
+            db.session.add(Product(id=i, manufacturer_id=1, name="Guantes", sku=f"SKU{i}", unit_price=1))
+            db.session.add(InventoryItem(id=i, product_id=i, warehouse_id=1, quantity=i))
+        db.session.commit()
+        reset_count_cache()
+
+    def test_total_reaches_meta(self):
+        """Test que all_items y search_by_product_name devuelven meta.total sin simular el formateador"""
+        for url in ('/api/inventory/all_items?page[offset]=1&page[limit]=1',
+                    '/api/inventory/search_by_product_name?name=Guantes&page[offset]=1&page[limit]=1'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            body = response.get_json()
+            self.assertEqual([item['id'] for item in body['data']], ['2'])
+            self.assertEqual((body['meta']['total'], body['meta']['offset'], body['meta']['limit']), (3, 1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
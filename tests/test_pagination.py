@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event
+from app import db
+from app.models import Product, InventoryItem
+from app.services.pagination import MAX_PAGE_LIMIT, InvalidCursorError, decode_cursor, encode_cursor
+from tests.base import DatabaseTestCase, add_warehouses
+
+class TestCursorEncoding(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Test que el cursor codifica y decodifica los valores de orden"""
+        cursor = encode_cursor([1714974947, 42])
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor, 2), [1714974947, 42])
+
+    def test_invalid_cursors(self):
+        """Test que se rechazan cursores malformados o de otro listado"""
+        for cursor in ('%%%', encode_cursor([1]), 'bm90IGpzb24', encode_cursor(['x', 1])):
+            with self.assertRaises(InvalidCursorError):
+                decode_cursor(cursor, 2)
+
+class TestKeysetPagination(DatabaseTestCase):
+    """Recorrido de los listados de inventario con page[cursor] contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1)
+        for i in range(1, 8):
+            db.session.add(Product(id=i, manufacturer_id=1, name=f"Guantes talla {i}", sku=f"SKU{i}", unit_price=1))
+            # updated_at repetido para que el desempate por id importe
+            db.session.add(InventoryItem(id=i, product_id=i, warehouse_id=1, quantity=i, updated_at=100 - i // 2))
+        db.session.commit()
+
+    def _walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            body = response.get_json()
+            pages.append([int(item['id']) for item in body['data']])
+            url = body['links']['next']
+        return pages
+
+    def test_partial_search_walks_all_pages(self):
+        """Test que links.next recorre todos los resultados sin repetir"""
+        pages = self._walk('/api/inventory/search_by_product_name_partial?name=guantes&page[limit]=3&page[cursor]=')
+
+        self.assertEqual(pages, [[1, 2, 3], [4, 5, 6], [7]])
+
+    def test_page_cost_does_not_depend_on_depth(self):
+        """Test que las páginas siguientes filtran por id y no cuentan el total"""
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        self._walk('/api/inventory/search_by_product_name_partial?name=guantes&page[limit]=2&page[cursor]=')
+
+        selects = [sql for sql in statements if 'FROM inventory_items' in sql]
+        self.assertEqual(len(selects), 4)
+        self.assertTrue(all('inventory_items.id > ?' in sql for sql in selects[1:]))
+        self.assertFalse(any('count(' in sql.lower() for sql in selects))
+
+    @patch('app.routes.inventory.jsonapi_format_response')
+    def test_all_items_by_updated_at(self, mock_format):
+        """Test que all_items pagina por (updated_at, id)"""
+        mock_format.side_effect = lambda items, **kwargs: {
+            "data": [{"id": str(item.id)} for item in items], "links": kwargs['links']
+        }
+
+        pages = self._walk('/api/inventory/all_items?sort=updated_at&page[limit]=3&page[cursor]=')
+        # Sin conteo en modo cursor: el tamaño de la página no se publica como total
+        self.assertNotIn('count', mock_format.call_args.kwargs)
+
+        # updated_at: 7 -> 97, 6 y 5 -> 97/98, ... ordenados por (updated_at, id)
+        expected = sorted(range(1, 8), key=lambda i: (100 - i // 2, i))
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+    def test_invalid_cursor_and_sort(self):
+        """Test que un cursor inválido o un orden no admitido devuelven 400"""
+        response = self.client.get('/api/inventory/all_items?page[cursor]=%%%')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "Invalid cursor"})
+
+        response = self.client.get('/api/inventory/search_by_product_name?name=x&sort=updated_at&page[cursor]=')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_limit_out_of_range(self):
+        """Test que page[limit] menor que 1 o mayor que el máximo devuelve 400 en modo cursor"""
+        for url in ('/api/inventory/all_items?page[cursor]=&page[limit]={}',
+                    '/api/inventory/search_by_product_name?name=x&page[cursor]=&page[limit]={}',
+                    '/api/inventory/search_by_product_name_partial?name=guantes&page[cursor]=&page[limit]={}'):
+            for limit in (0, -1, MAX_PAGE_LIMIT + 1):
+                response = self.client.get(url.format(limit))
+                self.assertEqual(response.status_code, 400, url.format(limit))
+                self.assertEqual(response.get_json(),
+                                 {"error": f"page[limit] must be between 1 and {MAX_PAGE_LIMIT}"})
+
+if __name__ == '__main__':
+    unittest.main()
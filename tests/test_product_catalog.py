@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event, update
+from app import db
+from app.models import Product
+from app.services.product_catalog import ProductCatalog, product_catalog
+from tests.base import DatabaseTestCase, add_products
+
+@patch('app.services.product_catalog.Config.PRODUCT_CATALOG_CACHE', True)
+class TestProductCatalog(DatabaseTestCase):
+    """Caché de productos por id y SKU contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_products(1, 2, 3)
+        db.session.commit()
+        product_catalog.clear()
+        self.queries = []
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._count)
+        product_catalog.clear()
+        super().tearDown()
+
+    def _count(self, conn, cursor, statement, *args):
+        self.queries.append(statement)
+
+    def test_lookups_by_sku_and_id_are_cached(self):
+        """Test que la segunda búsqueda por SKU o id no consulta la base"""
+        self.assertEqual(product_catalog.get_by_sku('SKU1').id, 1)
+        db.session.commit()
+        self.assertEqual(product_catalog.get_by_sku('SKU1').name, "Producto 1")
+        self.assertEqual(product_catalog.get_by_id(1).sku, 'SKU1')
+        self.assertIsNone(product_catalog.get_by_sku('NOPE'))
+
+        self.assertEqual(len(self.queries), 2)
+        stats = product_catalog.stats()
+        self.assertGreaterEqual(stats['hits'], 2)
+        self.assertGreaterEqual(stats['misses'], 2)
+
+    def test_ids_by_sku_reads_only_misses(self):
+        """Test que ids_by_sku consulta en un solo IN los SKU que no están en caché"""
+        product_catalog.get_by_sku('SKU1')
+        db.session.commit()
+        self.queries.clear()
+
+        self.assertEqual(product_catalog.ids_by_sku(['SKU1', 'SKU2', 'SKU3', 'NOPE']),
+                         {'SKU1': 1, 'SKU2': 2, 'SKU3': 3})
+        self.assertEqual(len(self.queries), 1)
+        self.assertNotIn("'SKU1'", self.queries[0])
+        db.session.commit()
+
+        self.assertEqual(product_catalog.ids_by_sku(['SKU2', 'SKU3']), {'SKU2': 2, 'SKU3': 3})
+        self.assertEqual(len(self.queries), 1)
+
+    def test_commit_invalidates_changed_products(self):
+        """Test que los cambios confirmados sobre Product invalidan sus entradas, también el SKU anterior"""
+        product_catalog.get_by_sku('SKU1')
+        db.session.commit()
+
+        product = db.session.get(Product, 1)
+        product.sku = 'SKU1-B'
+        product.name = "Renombrado"
+        db.session.commit()
+
+        self.assertIsNone(product_catalog.get_by_sku('SKU1'))
+        self.assertEqual(product_catalog.get_by_sku('SKU1-B').name, "Renombrado")
+
+    def test_rollback_keeps_entries_and_bulk_update_clears(self):
+        """Test que un cambio revertido no invalida y un UPDATE masivo vacía la caché"""
+        product_catalog.get_by_id(2)
+        db.session.commit()
+
+        db.session.get(Product, 2).name = "Temporal"
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(len(product_catalog.cache), 2)
+
+        db.session.execute(update(Product).where(Product.id == 2).values(name="Masivo"))
+        db.session.commit()
+        self.assertEqual(len(product_catalog.cache), 0)
+        self.assertEqual(product_catalog.get_by_id(2).name, "Masivo")
+
+    def test_uncommitted_products_not_cached(self):
+        """Test que lo leído en una transacción que escribió productos no se guarda"""
+        db.session.add(Product(id=9, manufacturer_id=1, name="Nuevo", sku="SKU9", unit_price=1))
+        db.session.flush()
+
+        self.assertEqual(product_catalog.get_by_sku('SKU9').id, 9)
+        db.session.rollback()
+
+        self.assertIsNone(product_catalog.get_by_sku('SKU9'))
+
+    def test_lru_eviction(self):
+        """Test que la caché acotada desaloja las entradas menos usadas"""
+        catalog = ProductCatalog(maxsize=2, ttl=60)
+        catalog.get_by_id(1)
+        catalog.get_by_id(2)
+
+        self.assertEqual(len(catalog.cache), 2)
+        self.assertGreater(catalog.stats()['evictions'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
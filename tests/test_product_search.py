@@ -0,0 +1,174 @@
+import threading
+import unittest
+from unittest.mock import patch
+from sqlalchemy.dialects import postgresql
+from app import db
+from app.models import Product
+from app.services.blob_stream import InMemoryBlob
+from app.services.csv_processor import CSVProcessor
+from app.services import product_search
+from app.services.product_search import (
+    NgramIndex, get_ngram_index, name_contains, reset_ngram_index, search_engine
+)
+from tests.base import DatabaseTestCase
+
+HEADER = "sku,manufacturer_id,name,description,unit_price,storage_conditions,delivery_time,warehouse_id,quantity,location,expiry_date\n"
+
+class TestNgramIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NgramIndex()
+        self.index.build([(1, "Kit de primeros auxilios"), (2, "Guantes de látex"),
+                          (3, "Kit"), (4, "Jeringa desechable KIT básico")])
+
+    def test_search_is_case_insensitive_substring(self):
+        """Test que la búsqueda equivale a ILIKE '%texto%'"""
+        self.assertEqual(set(self.index.search("LÁTEX")), {2})
+        self.assertEqual(set(self.index.search("kit")), {1, 3, 4})
+        self.assertEqual(self.index.search("auxilios de"), [])
+
+    def test_results_are_ranked(self):
+        """Test que los nombres más parecidos a la consulta van primero"""
+        self.assertEqual(self.index.search("kit")[0], 3)
+
+    def test_short_query_is_not_indexed(self):
+        """Test que con menos de tres caracteres el índice no responde"""
+        self.assertIsNone(self.index.search("ki"))
+
+    def test_updates_during_build_are_kept(self):
+        """Test que un cambio confirmado mientras se construye el índice no se pierde al reemplazarlo"""
+        def rows():
+            yield 1, "Kit de primeros auxilios"
+            self.index.update(5, "Kit nuevo")
+            self.index.update(1, None)
+            yield 2, "Guantes de látex"
+
+        self.index.build(rows())
+        self.assertEqual(set(self.index.search("kit")), {5})
+        self.assertEqual(len(self.index), 2)
+
+    def test_update_and_remove(self):
+        """Test que renombrar o eliminar un producto actualiza el índice"""
+        self.index.update(2, "Guantes de nitrilo")
+        self.index.update(3, None)
+
+        self.assertEqual(self.index.search("látex"), [])
+        self.assertEqual(self.index.search("nitrilo"), [2])
+        self.assertEqual(set(self.index.search("kit")), {1, 4})
+        self.assertEqual(len(self.index), 3)
+
+class TestProductSearch(DatabaseTestCase):
+    """Pruebas de la búsqueda por nombre contra SQLite con el índice en memoria"""
+
+    def setUp(self):
+        super().setUp()
+        reset_ngram_index()
+        db.session.add_all([
+            Product(id=1, manufacturer_id=1, name="Kit de sutura", sku="SKU1", unit_price=1),
+            Product(id=2, manufacturer_id=1, name="Gasas estériles", sku="SKU2", unit_price=1),
+            Product(id=3, manufacturer_id=1, name="Kit", sku="SKU3", unit_price=1)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        reset_ngram_index()
+        super().tearDown()
+
+    def _search(self, name):
+        return [product.id for product in db.session.query(Product).filter(name_contains(name)).order_by(Product.id)]
+
+    def test_engine_follows_database(self):
+        """Test que SQLite usa n-gramas en memoria y PostgreSQL pg_trgm"""
+        self.assertEqual(search_engine(), 'ngram')
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://u:p@localhost/db'
+        try:
+            self.assertEqual(search_engine(), 'trigram')
+            sql = str(name_contains("kit").compile(dialect=postgresql.dialect()))
+            self.assertIn("ILIKE", sql.upper())
+        finally:
+            self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+
+    @patch('app.services.product_search._trigram_ready', False)
+    def test_trigram_unavailable_uses_ilike(self):
+        """Test que sin pg_trgm en PostgreSQL la búsqueda no llama a similarity()"""
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://u:p@localhost/db'
+        try:
+            self.assertEqual(search_engine(), 'ilike')
+        finally:
+            self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        with patch('app.services.product_search.Config.PRODUCT_SEARCH_ENGINE', 'trigram'):
+            self.assertEqual(search_engine(), 'ilike')
+            with self.app.test_request_context():
+                self.assertEqual([product.id for product in Product.search_by_name("kit")], [3, 1])
+
+    def test_expired_index_is_rebuilt_in_background(self):
+        """Test que al vencer el TTL se responde con el índice actual y se reconstruye en otro hilo"""
+        index = get_ngram_index()
+        # Escritura de otra instancia: no pasa por los eventos de esta sesión
+        db.session.execute(Product.__table__.insert().values(
+            id=7, manufacturer_id=1, name="Kit dental", sku="SKU7", unit_price=1))
+        db.session.commit()
+
+        with patch('app.services.product_search.Config.PRODUCT_SEARCH_INDEX_TTL', -1):
+            self.assertIs(get_ngram_index(), index)
+            self.assertNotIn(7, index.names)
+            for thread in threading.enumerate():
+                if thread.name == 'product-search-index':
+                    thread.join(5)
+        self.assertIn(7, index.names)
+        self.assertEqual(self._search("dental"), [7])
+
+    def test_filter_uses_index(self):
+        """Test que el filtro se resuelve con los ids del índice"""
+        self.assertEqual(self._search("kit"), [1, 3])
+        self.assertEqual(self._search("ESTÉRIL"), [2])
+        self.assertEqual(self._search("no existe"), [])
+        # Consultas cortas usan ILIKE
+        self.assertEqual(self._search("ga"), [2])
+
+    def test_search_by_name_is_ranked(self):
+        """Test que search_by_name devuelve primero la coincidencia más parecida"""
+        with self.app.test_request_context():
+            found = Product.search_by_name("kit")
+
+        self.assertEqual([product.id for product in found], [3, 1])
+
+    def test_index_follows_orm_writes(self):
+        """Test que altas, cambios y bajas confirmadas se reflejan en el índice"""
+        self.assertEqual(len(get_ngram_index()), 3)
+
+        db.session.add(Product(id=4, manufacturer_id=1, name="Kit quirúrgico", sku="SKU4", unit_price=1))
+        db.session.get(Product, 2).name = "Vendas elásticas"
+        db.session.delete(db.session.get(Product, 3))
+        db.session.commit()
+
+        self.assertEqual(self._search("kit"), [1, 4])
+        self.assertEqual(self._search("gasas"), [])
+        self.assertEqual(self._search("vendas"), [2])
+
+    def test_rollback_is_not_indexed(self):
+        """Test que un producto no confirmado no entra al índice"""
+        get_ngram_index()
+        db.session.add(Product(id=5, manufacturer_id=1, name="Termómetro", sku="SKU5", unit_price=1))
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertIsNone(get_ngram_index().names.get(5))
+
+    def test_index_follows_bulk_import(self):
+        """Test que los productos creados por la importación bulk se indexan"""
+        get_ngram_index()
+        blob = InMemoryBlob("catalogo.csv", HEADER + "SKU9,1,Kit de curación,Desc,1.0,Seco,3,1,5,A1,1714974947\n")
+        success, _ = CSVProcessor("test-bucket", "catalogo.csv", blob=blob, streaming=True, mode='bulk').process()
+
+        self.assertTrue(success)
+        self.assertEqual(len(self._search("curación")), 1)
+
+    @patch('app.services.product_search.Config.PRODUCT_SEARCH_ENGINE', 'ilike')
+    def test_ilike_engine(self):
+        """Test que con el motor 'ilike' no se construye el índice"""
+        self.assertEqual(self._search("kit"), [1, 3])
+        self.assertIsNone(product_search._index.built_at)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -201,3 +201,146 @@ def test_process_csv_general_exception(mock_csv_processor, client):
     # Verificar resultados
     assert response.status_code == 500
     assert 'Error: Error no esperado' in response.data.decode('utf-8')
+
+@patch('app.routes.pubsub.Config.CSV_IMPORT_ASYNC', True)
+@patch('app.routes.pubsub.import_jobs')
+def test_process_csv_async_enqueues_job(mock_import_jobs, client):
+    # Configurar el mock para simular un trabajo encolado
+    job = MagicMock(id='abc123')
+    job.to_dict.return_value = {'id': 'abc123', 'state': 'queued'}
+    mock_import_jobs.submit.return_value = (job, True)
+
+    message_data = {
+        'bucket': 'test-bucket',
+        'filename': 'test-file.csv',
+        'generation': '1700000000000000'
+    }
+    request_data = create_pubsub_message(message_data)
+
+    response = client.post('/process-csv', json=request_data)
+
+    # Verificar que se respondió de inmediato con el trabajo
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data['job']['state'] == 'queued'
+    assert data['links']['self'] == '/api/pubsub/jobs/abc123'
+    args = mock_import_jobs.submit.call_args.args
+    assert args[1:] == ('test-bucket', 'test-file.csv', '1700000000000000')
+
+@patch('app.routes.pubsub.Config.CSV_IMPORT_ASYNC', True)
+@patch('app.routes.pubsub.import_jobs')
+def test_process_csv_async_queue_full(mock_import_jobs, client):
+    from app.services.import_jobs import ImportQueueFullError
+    mock_import_jobs.submit.side_effect = ImportQueueFullError()
+
+    request_data = create_pubsub_message({'bucket': 'test-bucket', 'filename': 'test-file.csv'})
+    response = client.post('/process-csv', json=request_data)
+
+    # Pub/Sub reintentará la entrega más tarde
+    assert response.status_code == 503
+    assert response.data.decode('utf-8') == 'Import queue is full'
+
+@patch('app.routes.pubsub.import_jobs')
+def test_get_import_job(mock_import_jobs, client):
+    job = MagicMock()
+    job.to_dict.return_value = {'id': 'abc123', 'state': 'running', 'rows_processed': 5000}
+    mock_import_jobs.get.return_value = job
+
+    response = client.get('/jobs/abc123')
+
+    assert response.status_code == 200
+    assert response.get_json()['rows_processed'] == 5000
+    mock_import_jobs.get.assert_called_once_with('abc123')
+
+@patch('app.routes.pubsub.import_jobs')
+def test_get_import_job_not_found(mock_import_jobs, client):
+    mock_import_jobs.get.return_value = None
+
+    response = client.get('/jobs/unknown')
+
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Job not found"}
+
+@patch('app.routes.pubsub.Config.PUBSUB_DEDUPE', True)
+@patch('app.routes.pubsub.pubsub_dedupe')
+@patch('app.routes.pubsub.CSVProcessor')
+def test_process_csv_duplicate_message(mock_csv_processor, mock_pubsub_dedupe, client):
+    # Simular que el messageId ya fue confirmado
+    mock_pubsub_dedupe.is_duplicate_message.return_value = True
+
+    request_data = create_pubsub_message({'bucket': 'test-bucket', 'filename': 'test-file.csv'})
+    response = client.post('/process-csv', json=request_data)
+
+    assert response.status_code == 200
+    assert response.data.decode('utf-8') == 'Duplicate message ignored'
+    mock_pubsub_dedupe.is_duplicate_message.assert_called_once_with('123456')
+    mock_csv_processor.assert_not_called()
+
+@patch('app.routes.pubsub.Config.PUBSUB_DEDUPE', True)
+@patch('app.routes.pubsub.pubsub_dedupe')
+@patch('app.routes.pubsub.CSVProcessor')
+def test_process_csv_completed_generation(mock_csv_processor, mock_pubsub_dedupe, client):
+    # Mensaje nuevo para una generación del archivo que ya se importó
+    mock_pubsub_dedupe.is_duplicate_message.return_value = False
+    mock_pubsub_dedupe.is_completed_object.return_value = True
+
+    message_data = {'bucket': 'test-bucket', 'filename': 'test-file.csv', 'generation': '7'}
+    response = client.post('/process-csv', json=create_pubsub_message(message_data))
+
+    assert response.status_code == 200
+    assert response.data.decode('utf-8') == 'File already processed'
+    mock_pubsub_dedupe.record_message.assert_called_once_with('123456', 'test-bucket', 'test-file.csv', '7')
+    mock_csv_processor.assert_not_called()
+
+@patch('app.routes.pubsub.Config.PUBSUB_DEDUPE', True)
+@patch('app.routes.pubsub.pubsub_dedupe')
+@patch('app.routes.pubsub.CSVProcessor')
+def test_process_csv_records_successful_message(mock_csv_processor, mock_pubsub_dedupe, client):
+    mock_pubsub_dedupe.is_duplicate_message.return_value = False
+    mock_pubsub_dedupe.is_completed_object.return_value = False
+    mock_csv_processor.return_value.process.return_value = (True, "ok")
+
+    message_data = {'bucket': 'test-bucket', 'filename': 'test-file.csv', 'generation': '7'}
+    response = client.post('/process-csv', json=create_pubsub_message(message_data))
+
+    assert response.status_code == 200
+    mock_pubsub_dedupe.record_message.assert_called_once_with('123456', 'test-bucket', 'test-file.csv', '7')
+    mock_pubsub_dedupe.mark_completed.assert_called_once_with('test-bucket', 'test-file.csv', '7')
+
+@patch('app.routes.pubsub.Config.PUBSUB_DEDUPE', True)
+@patch('app.routes.pubsub.pubsub_dedupe')
+@patch('app.routes.pubsub.CSVProcessor')
+def test_process_csv_failure_not_recorded(mock_csv_processor, mock_pubsub_dedupe, client):
+    # Un error debe permitir que Pub/Sub reintente la entrega
+    mock_pubsub_dedupe.is_duplicate_message.return_value = False
+    mock_pubsub_dedupe.is_completed_object.return_value = False
+    mock_csv_processor.return_value.process.return_value = (False, "Error al procesar")
+
+    response = client.post('/process-csv', json=create_pubsub_message({'bucket': 'b', 'filename': 'f.csv'}))
+
+    assert response.status_code == 500
+    mock_pubsub_dedupe.record_message.assert_not_called()
+
+@patch('app.routes.pubsub.Config.CSV_IMPORT_PARTIAL', True)
+@patch('app.routes.pubsub.CSVProcessor')
+def test_process_csv_reports_rejected_rows(mock_csv_processor, client):
+    processor_instance = mock_csv_processor.return_value
+    processor_instance.process.return_value = (True, "Archivo procesado con 2 filas rechazadas")
+    processor_instance.rows_rejected = 2
+    processor_instance.reject_file = 'b/rejects/f.csv.1.rejects.csv'
+
+    response = client.post('/process-csv', json=create_pubsub_message({'bucket': 'b', 'filename': 'f.csv'}))
+
+    assert response.status_code == 200
+    assert response.data.decode('utf-8') == 'CSV processed with 2 rejected rows: b/rejects/f.csv.1.rejects.csv'
+
+@patch('app.routes.pubsub.Config.CSV_IMPORT_PARTIAL', True)
+@patch('app.routes.pubsub.CSVProcessor')
+def test_process_csv_ignores_reject_files(mock_csv_processor, client):
+    # La notificación del propio archivo de rechazos no debe importarse
+    message_data = {'bucket': 'b', 'filename': 'rejects/f.csv.1.rejects.csv'}
+    response = client.post('/process-csv', json=create_pubsub_message(message_data))
+
+    assert response.status_code == 200
+    assert response.data.decode('utf-8') == 'Reject file ignored'
+    mock_csv_processor.assert_not_called()
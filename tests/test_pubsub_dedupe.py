@@ -0,0 +1,84 @@
+import unittest
+from flask import Flask
+from app import db
+from app.models.processed_message import ProcessedMessage
+from app.services.pubsub_dedupe import PubSubDeduplicator
+
+def _create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+class TestPubSubDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        self.app = _create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.dedupe = PubSubDeduplicator(maxsize=100, ttl=60)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_recorded_message_is_duplicate(self):
+        """Test que un messageId registrado se reconoce como duplicado"""
+        self.assertFalse(self.dedupe.is_duplicate_message('m-1'))
+
+        self.dedupe.record_message('m-1', 'test-bucket', 'a.csv', '7')
+
+        self.assertTrue(self.dedupe.is_duplicate_message('m-1'))
+        self.assertFalse(self.dedupe.is_duplicate_message('m-2'))
+        self.assertEqual(db.session.query(ProcessedMessage).one().generation, 7)
+
+    def test_duplicate_served_from_cache(self):
+        """Test que un duplicado conocido no consulta la base de datos"""
+        self.dedupe.record_message('m-1', 'test-bucket', 'a.csv', None)
+        db.session.query(ProcessedMessage).delete()
+        db.session.commit()
+
+        self.assertTrue(self.dedupe.is_duplicate_message('m-1'))
+        self.assertEqual(self.dedupe.cache.stats()['hits'], 1)
+
+    def test_persistent_store_shared_between_instances(self):
+        """Test que otra instancia (caché vacía) encuentra el mensaje en la tabla"""
+        self.dedupe.record_message('m-1', 'test-bucket', 'a.csv', '7')
+
+        other = PubSubDeduplicator(maxsize=100, ttl=60)
+
+        self.assertTrue(other.is_duplicate_message('m-1'))
+
+    def test_record_same_message_twice(self):
+        """Test que registrar dos veces el mismo mensaje no falla"""
+        self.dedupe.record_message('m-1', 'test-bucket', 'a.csv', '7')
+        PubSubDeduplicator(maxsize=100, ttl=60).record_message('m-1', 'test-bucket', 'a.csv', '7')
+
+        self.assertEqual(db.session.query(ProcessedMessage).count(), 1)
+
+    def test_completed_object_generation(self):
+        """Test deduplicación por generación del objeto"""
+        self.dedupe.record_message('m-1', 'test-bucket', 'a.csv', '7')
+        self.assertFalse(self.dedupe.is_completed_object('test-bucket', 'a.csv', '7'))
+
+        self.dedupe.mark_completed('test-bucket', 'a.csv', '7')
+
+        self.assertTrue(self.dedupe.is_completed_object('test-bucket', 'a.csv', '7'))
+        self.assertTrue(PubSubDeduplicator(100, 60).is_completed_object('test-bucket', 'a.csv', 7))
+        self.assertFalse(self.dedupe.is_completed_object('test-bucket', 'a.csv', '8'))
+        # Sin generación conocida no se puede deduplicar por objeto
+        self.assertFalse(self.dedupe.is_completed_object('test-bucket', 'a.csv', None))
+
+    def test_mark_completed_without_message(self):
+        """Test que se registra la generación aunque no haya mensaje previo"""
+        self.dedupe.mark_completed('test-bucket', 'b.csv', 9)
+
+        row = db.session.query(ProcessedMessage).one()
+        self.assertIsNone(row.message_id)
+        self.assertTrue(row.completed)
+
+if __name__ == '__main__':
+    unittest.main()
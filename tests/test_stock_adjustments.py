@@ -0,0 +1,89 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.models import InventoryItem, InventoryTransaction, ProductStockTotal
+from tests.base import DatabaseTestCase, add_products, add_warehouses
+
+class TestStockAdjustments(DatabaseTestCase):
+    """Ajustes en lote por /api/inventory/adjustments contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1, 2)
+        add_products(1, 2, 3)
+        for i in range(1, 4):
+            db.session.add(InventoryItem(id=i, product_id=i, warehouse_id=1, quantity=10))
+        db.session.add(InventoryItem(id=4, product_id=1, warehouse_id=2, quantity=5))
+        db.session.commit()
+
+    def _quantities(self):
+        return dict(db.session.query(InventoryItem.id, InventoryItem.quantity).order_by(InventoryItem.id))
+
+    def _post(self, adjustments):
+        return self.client.post('/api/inventory/adjustments', json={"user_id": 3, "adjustments": adjustments})
+
+    def test_adjustments_by_id_and_sku(self):
+        """Test que los ajustes por id y por SKU y bodega se aplican y quedan en el libro"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self._post([
+                {"inventory_item_id": 1, "delta": -4, "reason": "Pedido 77"},
+                {"sku": "SKU1", "warehouse_id": 2, "delta": 3, "reason": "Conteo cíclico"},
+                {"inventory_item_id": 1, "delta": -6},
+                {"sku": "SKU3", "warehouse_id": 1, "delta": 1}
+            ])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.get_json()['adjustments'], 4)
+        self.assertEqual(self._quantities(), {1: 0, 2: 10, 3: 11, 4: 8})
+
+        # Un solo UPDATE preparado y un solo INSERT para todo el lote
+        updates = [sql for sql in statements if sql.startswith('UPDATE inventory_items')]
+        inserts = [sql for sql in statements if sql.startswith('INSERT INTO inventory_transactions')]
+        self.assertEqual((len(updates), len(inserts)), (1, 1))
+
+        ledger = db.session.query(InventoryTransaction).order_by(InventoryTransaction.id).all()
+        self.assertEqual([(t.inventory_item_id, t.transaction_type, t.quantity, t.notes) for t in ledger], [
+            (1, 'ADJUSTMENT', -4, "Pedido 77"), (4, 'ADJUSTMENT', 3, "Conteo cíclico"),
+            (1, 'ADJUSTMENT', -6, None), (3, 'ADJUSTMENT', 1, None)
+        ])
+
+        totals = {row.product_id: (row.total_quantity, row.warehouses_in_stock)
+                  for row in db.session.query(ProductStockTotal)}
+        self.assertEqual(totals, {1: (8, 1), 2: (10, 1), 3: (11, 1)})
+
+    def test_negative_stock_rejects_whole_batch(self):
+        """Test que si un item quedaría en negativo no se aplica ningún ajuste"""
+        before = self._quantities()
+        response = self._post([
+            {"inventory_item_id": 2, "delta": 5},
+            {"inventory_item_id": 4, "delta": -3},
+            {"inventory_item_id": 4, "delta": -3}
+        ])
+
+        self.assertEqual(response.status_code, 409)
+        body = response.get_json()
+        self.assertEqual(body['error'], "Insufficient stock")
+        self.assertEqual([detail['adjustment'] for detail in body['details']], [1, 2])
+        self.assertEqual(body['details'][0]['available'], 5)
+        self.assertEqual(self._quantities(), before)
+        self.assertEqual(db.session.query(InventoryTransaction).count(), 0)
+
+    def test_unknown_items_and_invalid_bodies(self):
+        """Test que los items inexistentes devuelven 404 y los cuerpos inválidos 400"""
+        response = self._post([{"inventory_item_id": 99, "delta": 1}, {"sku": "SKU2", "warehouse_id": 2, "delta": 1}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json()['details'], [{"adjustment": 0}, {"adjustment": 1}])
+
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self._post([{"inventory_item_id": 1, "delta": 0}]).status_code, 400)
+        self.assertEqual(self._post([{"inventory_item_id": 1, "sku": "SKU1", "warehouse_id": 1, "delta": 1}]).status_code, 400)
+        self.assertEqual(self._post([{"sku": "SKU1", "delta": 1}]).status_code, 400)
+        self.assertEqual(self.client.post('/api/inventory/adjustments', json={"adjustments": []}).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
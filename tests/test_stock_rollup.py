@@ -0,0 +1,157 @@
+import unittest
+from sqlalchemy import case, func, update
+from app import db
+from app.models import Product, InventoryItem, ProductStockTotal, WarehouseStockTotal
+from app.services.csv_processor import CSVProcessor
+from app.services.blob_stream import InMemoryBlob
+from app.services.stock_rollup import apply_stock_deltas, ensure_stock_totals, rebuild_stock_totals
+from tests.base import DatabaseTestCase, add_products, add_warehouses
+
+HEADER = "sku,manufacturer_id,name,description,unit_price,storage_conditions,delivery_time,warehouse_id,quantity,location,expiry_date\n"
+
+def _csv_row(sku, warehouse_id, quantity):
+    return f"{sku},1,Producto {sku},Descripción,10.50,Seco,3,{warehouse_id},{quantity},A1,1714974947\n"
+
+class TestStockRollup(DatabaseTestCase):
+    """Pruebas de product_stock_totals frente a la agregación completa de inventory_items"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1, 2, 3)
+        add_products(1, 2)
+        db.session.commit()
+
+    def _rollup(self):
+        return {
+            row.product_id: (row.total_quantity, row.warehouse_count, row.warehouses_in_stock)
+            for row in db.session.query(ProductStockTotal)
+        }
+
+    def _warehouse_rollup(self):
+        return {
+            row.warehouse_id: (row.total_quantity, row.item_count, row.items_in_stock)
+            for row in db.session.query(WarehouseStockTotal)
+        }
+
+    def _aggregate(self, column=InventoryItem.product_id):
+        return {
+            key: (total, count, in_stock)
+            for key, total, count, in_stock in db.session.query(
+                column,
+                func.sum(InventoryItem.quantity),
+                func.count(),
+                func.sum(case((InventoryItem.quantity > 0, 1), else_=0))
+            ).group_by(column)
+        }
+
+    def test_orm_changes_update_totals(self):
+        """Test que altas, cambios, traslados y bajas por el ORM mantienen los totales"""
+        db.session.add_all([
+            InventoryItem(product_id=1, warehouse_id=1, quantity=10),
+            InventoryItem(product_id=1, warehouse_id=2, quantity=0),
+            InventoryItem(product_id=2, warehouse_id=1, quantity=5)
+        ])
+        db.session.commit()
+        self.assertEqual(self._rollup(), {1: (10, 2, 1), 2: (5, 1, 1)})
+
+        # Con los atributos expirados tras el commit, el valor anterior se carga al asignar
+        item = db.session.query(InventoryItem).filter_by(product_id=1, warehouse_id=2).one()
+        item.quantity = 7
+        moved = db.session.query(InventoryItem).filter_by(product_id=2, warehouse_id=1).one()
+        moved.product_id = 1
+        moved.warehouse_id = 3
+        db.session.commit()
+        self.assertEqual(self._rollup(), {1: (22, 3, 3)})
+        self.assertEqual(self._rollup(), self._aggregate())
+        self.assertEqual(self._warehouse_rollup(), {1: (10, 1, 1), 2: (7, 1, 1), 3: (5, 1, 1)})
+
+        db.session.delete(db.session.query(InventoryItem).filter_by(warehouse_id=1).one())
+        db.session.commit()
+        self.assertEqual(self._rollup(), {1: (12, 2, 2)})
+        self.assertEqual(self._warehouse_rollup(), self._aggregate(InventoryItem.warehouse_id))
+
+    def test_orm_change_uses_current_row(self):
+        """Test que el incremento se calcula contra la fila actual y no contra el valor que cargó la sesión"""
+        db.session.add(InventoryItem(product_id=1, warehouse_id=1, quantity=10))
+        db.session.commit()
+        item = db.session.query(InventoryItem).one()
+        self.assertEqual(item.quantity, 10)
+
+        # Otra transacción cambia la cantidad a 30 y sus totales después de que la sesión leyó el item
+        db.session.execute(update(InventoryItem.__table__).values(quantity=30))
+        apply_stock_deltas({(1, 1): [20, 0, 0]})
+
+        item.quantity = 50
+        db.session.commit()
+        self.assertEqual(self._rollup(), {1: (50, 1, 1)})
+        self.assertEqual(self._rollup(), self._aggregate())
+
+        # Sin leer antes el item: solo se asigna la cantidad sobre atributos expirados
+        item.quantity = 0
+        db.session.commit()
+        self.assertEqual(self._warehouse_rollup(), {1: (0, 1, 0)})
+
+    def test_rollback_discards_changes(self):
+        """Test que un rollback también revierte los totales"""
+        db.session.add(InventoryItem(product_id=1, warehouse_id=1, quantity=10))
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertEqual(self._rollup(), {})
+        self.assertEqual(self._warehouse_rollup(), {})
+
+    def _import(self, csv_text, mode, diff=False):
+        blob = InMemoryBlob("catalogo.csv", HEADER + csv_text)
+        success, message = CSVProcessor("test-bucket", "catalogo.csv", blob=blob, streaming=True,
+                                        mode=mode, chunk_size=2, diff=diff).process()
+        self.assertTrue(success, message)
+
+    def test_bulk_import_updates_totals(self):
+        """Test que la importación bulk y el retiro de filas del modo diff mantienen los totales"""
+        self._import(_csv_row("SKU1", 1, 10) + _csv_row("SKU1", 2, 0) + _csv_row("SKU3", 1, 4), 'bulk', diff=True)
+        self.assertEqual(self._rollup(), self._aggregate())
+        self.assertEqual(self._rollup()[1], (10, 2, 1))
+
+        # Re-importación: cambia una cantidad y el SKU3 ya no aparece (queda en 0)
+        self._import(_csv_row("SKU1", 1, 3) + _csv_row("SKU1", 2, 6), 'bulk', diff=True)
+        self.assertEqual(self._rollup(), self._aggregate())
+        self.assertEqual(self._rollup()[1], (9, 2, 2))
+        self.assertEqual(list(self._rollup().values())[-1], (0, 1, 0))
+        self.assertEqual(self._warehouse_rollup(), self._aggregate(InventoryItem.warehouse_id))
+        self.assertEqual(self._warehouse_rollup(), {1: (3, 2, 1), 2: (6, 1, 1)})
+
+    def test_search_with_stock_uses_totals(self):
+        """Test que la búsqueda por existencias filtra con los totales precalculados"""
+        db.session.add_all([
+            InventoryItem(product_id=1, warehouse_id=1, quantity=10),
+            InventoryItem(product_id=1, warehouse_id=2, quantity=10),
+            InventoryItem(product_id=2, warehouse_id=1, quantity=5)
+        ])
+        db.session.commit()
+
+        with self.app.test_request_context():
+            found = Product.search_by_name_with_stock("Producto", 15)
+
+        self.assertEqual([product.id for product in found], [1])
+
+    def test_ensure_backfills_empty_table(self):
+        """Test que la tabla se construye desde inventory_items si está vacía"""
+        db.session.add(InventoryItem(product_id=2, warehouse_id=1, quantity=8))
+        db.session.commit()
+        db.session.query(ProductStockTotal).delete()
+        db.session.commit()
+
+        ensure_stock_totals()
+
+        self.assertEqual(self._rollup(), {2: (8, 1, 1)})
+        rebuild_stock_totals()
+        self.assertEqual(self._rollup(), {2: (8, 1, 1)})
+
+        # Despliegue sobre una base que ya tenía product_stock_totals
+        db.session.query(WarehouseStockTotal).delete()
+        db.session.commit()
+        ensure_stock_totals()
+        self.assertEqual(self._warehouse_rollup(), {1: (8, 1, 1)})
+
+if __name__ == '__main__':
+    unittest.main()
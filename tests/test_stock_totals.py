@@ -0,0 +1,91 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.models import Product, InventoryItem
+from tests.base import DatabaseTestCase, add_products, add_warehouses
+
+class TestBatchedStockTotals(DatabaseTestCase):
+    """Pruebas del cálculo por lotes de total_quantity al serializar productos"""
+
+    exposed_models = (Product,)
+
+    def setUp(self):
+        super().setUp()
+        self.queries = []
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._count)
+        super().tearDown()
+
+    def _count(self, conn, cursor, statement, *args):
+        self.queries.append(statement)
+
+    def _create_products(self, count):
+        add_warehouses(1, 2)
+        add_products(*range(1, count + 1))
+        for i in range(1, count + 1):
+            db.session.add(InventoryItem(product_id=i, warehouse_id=1, quantity=i))
+            db.session.add(InventoryItem(product_id=i, warehouse_id=2, quantity=10))
+        db.session.commit()
+        db.session.remove()
+
+    def _total_queries(self):
+        return [q for q in self.queries if q.startswith('SELECT') and 'FROM product_stock_totals' in q]
+
+    def test_collection_uses_single_grouped_query(self):
+        """Test que un listado lee los totales de la página con una sola consulta"""
+        self._create_products(30)
+
+        with self.app.test_client() as client:
+            response = client.get('/api/products/?page[limit]=25')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        data = response.get_json()['data']
+        self.assertEqual(len(data), 25)
+        for product in data:
+            self.assertEqual(product['attributes']['total_quantity'], int(product['id']) + 10)
+        self.assertEqual(len(self._total_queries()), 1)
+
+    def test_query_count_independent_of_page_size(self):
+        """Test que el número de consultas no crece con el tamaño de la página"""
+        self._create_products(40)
+
+        counts = []
+        with self.app.test_client() as client:
+            for limit in (5, 40):
+                self.queries = []
+                response = client.get(f'/api/products/?page[limit]={limit}')
+                self.assertEqual(len(response.get_json()['data']), limit)
+                counts.append(len(self.queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_single_object_uses_individual_sum(self):
+        """Test que un solo producto consulta solo su fila"""
+        self._create_products(3)
+
+        with self.app.test_client() as client:
+            response = client.get('/api/products/2/')
+
+        self.assertEqual(response.get_json()['data']['attributes']['total_quantity'], 12)
+        self.assertEqual(len(self._total_queries()), 1)
+        self.assertNotIn(' IN ', self._total_queries()[0].upper())
+
+    def test_totals_refresh_after_item_change(self):
+        """Test que modificar un item en la petición descarta los totales calculados"""
+        self._create_products(3)
+
+        with self.app.test_request_context():
+            products = db.session.query(Product).order_by(Product.id).all()
+            self.assertEqual(products[0].to_dict()['total_quantity'], 11)
+
+            item = db.session.query(InventoryItem).filter_by(product_id=1, warehouse_id=1).first()
+            item.quantity = 100
+            db.session.flush()
+
+            self.assertEqual(products[0].to_dict()['total_quantity'], 110)
+            self.assertEqual(products[1].to_dict()['total_quantity'], 12)
+
+if __name__ == '__main__':
+    unittest.main()
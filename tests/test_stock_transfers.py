@@ -0,0 +1,102 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.models import InventoryItem, InventoryTransaction, ProductStockTotal
+from tests.base import DatabaseTestCase, add_products, add_warehouses
+
+class TestStockTransfers(DatabaseTestCase):
+    """Traslados entre bodegas por /api/inventory/transfers contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1, 2, 3)
+        add_products(1, 2)
+        db.session.add(InventoryItem(id=1, product_id=1, warehouse_id=1, quantity=100, expiry_date=123))
+        db.session.add(InventoryItem(id=2, product_id=1, warehouse_id=2, quantity=5, expiry_date=456))
+        db.session.add(InventoryItem(id=3, product_id=2, warehouse_id=1, quantity=10))
+        db.session.commit()
+
+    def _quantities(self):
+        return {(item.product_id, item.warehouse_id): item.quantity
+                for item in db.session.query(InventoryItem).order_by(InventoryItem.id)}
+
+    def _post(self, moves, **body):
+        return self.client.post('/api/inventory/transfers', json={"user_id": 7, "moves": moves, **body})
+
+    def test_batch_transfer_with_new_target(self):
+        """Test que un lote mueve existencias, crea el item de destino y registra el libro"""
+        response = self._post([
+            {"product_id": 1, "from_warehouse_id": 1, "to_warehouse_id": 2, "quantity": 30},
+            {"product_id": 1, "from_warehouse_id": 2, "to_warehouse_id": 3, "quantity": 35},
+            {"product_id": 2, "from_warehouse_id": 1, "to_warehouse_id": 3, "quantity": 10}
+        ], notes="Rebalanceo")
+
+        self.assertEqual(response.status_code, 201, response.data)
+        body = response.get_json()
+        self.assertEqual(body['moves'], 3)
+        self.assertEqual(len(body['transactions']), 6)
+        self.assertEqual(self._quantities(), {(1, 1): 70, (1, 2): 0, (2, 1): 0, (1, 3): 35, (2, 3): 10})
+
+        created = db.session.query(InventoryItem).filter_by(product_id=1, warehouse_id=3).one()
+        self.assertEqual(created.expiry_date, 456)
+        ledger = db.session.query(InventoryTransaction).order_by(InventoryTransaction.id).all()
+        self.assertEqual([(t.inventory_item_id, t.transaction_type, t.quantity) for t in ledger[:2]],
+                         [(1, 'TRANSFER_OUT', 30), (2, 'TRANSFER_IN', 30)])
+        self.assertTrue(all(t.user_id == 7 and t.notes == "Rebalanceo" for t in ledger))
+        self.assertEqual((ledger[2].from_warehouse_id, ledger[2].to_warehouse_id), (2, 3))
+
+        # El total por producto no cambia; sí las bodegas con existencias
+        totals = {row.product_id: (row.total_quantity, row.warehouse_count, row.warehouses_in_stock)
+                  for row in db.session.query(ProductStockTotal)}
+        self.assertEqual(totals, {1: (105, 3, 2), 2: (10, 2, 1)})
+
+    def test_insufficient_stock_rolls_back_batch(self):
+        """Test que si un movimiento no tiene existencias no se aplica ninguno"""
+        before = self._quantities()
+        response = self._post([
+            {"product_id": 1, "from_warehouse_id": 1, "to_warehouse_id": 3, "quantity": 50},
+            {"product_id": 1, "from_warehouse_id": 2, "to_warehouse_id": 1, "quantity": 6}
+        ])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json(), {"error": "Insufficient stock", "move": 1})
+        self.assertEqual(self._quantities(), before)
+        self.assertEqual(db.session.query(InventoryTransaction).count(), 0)
+
+    def test_invalid_requests(self):
+        """Test que los cuerpos inválidos y las bodegas inexistentes se rechazan"""
+        move = {"product_id": 1, "from_warehouse_id": 1, "to_warehouse_id": 2, "quantity": 1}
+
+        self.assertEqual(self.client.post('/api/inventory/transfers', data="x").status_code, 400)
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self.client.post('/api/inventory/transfers', json={"moves": [move]}).status_code, 400)
+        response = self._post([move, {**move, "quantity": 0}])
+        self.assertEqual((response.status_code, response.get_json()["move"]), (400, 1))
+        self.assertEqual(self._post([{**move, "to_warehouse_id": 1}]).status_code, 400)
+
+        response = self._post([{**move, "to_warehouse_id": 9}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json(), {"error": "Warehouse 9 not found", "move": 0})
+
+    def test_items_locked_in_key_order(self):
+        """Test que los items se leen en una sola consulta ordenada por (producto, bodega)"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self._post([
+                {"product_id": 2, "from_warehouse_id": 1, "to_warehouse_id": 2, "quantity": 1},
+                {"product_id": 1, "from_warehouse_id": 2, "to_warehouse_id": 1, "quantity": 1}
+            ])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        selects = [sql for sql in statements if sql.startswith('SELECT') and 'FROM inventory_items' in sql]
+        # La segunda es la de stock_rollup al hacer flush: vuelve a leer por id las filas ya bloqueadas
+        self.assertEqual(len(selects), 2)
+        self.assertIn('ORDER BY inventory_items.product_id, inventory_items.warehouse_id', selects[0])
+        self.assertNotIn('JOIN', selects[0])
+        self.assertIn('WHERE inventory_items.id IN', selects[1])
+
+if __name__ == '__main__':
+    unittest.main()
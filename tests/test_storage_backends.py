@@ -0,0 +1,106 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.services.blob_stream import open_csv_stream, MmapReader
+from app.services.storage_backends import (
+    StorageBackend, GCSStorageBackend, LocalStorageBackend, InMemoryStorageBackend,
+    create_storage_backend, get_storage_backend, set_storage_backend
+)
+
+class TestStorageBackends(unittest.TestCase):
+
+    def tearDown(self):
+        set_storage_backend(None)
+
+    @patch('app.services.storage_backends.storage.Client')
+    def test_gcs_backend_reuses_client(self, mock_storage_client):
+        """Test que el backend de GCS crea un único cliente"""
+        backend = GCSStorageBackend()
+
+        backend.get_blob('bucket-a', 'a.csv')
+        blob = backend.get_blob('bucket-b', 'b.csv')
+
+        mock_storage_client.assert_called_once()
+        mock_storage_client.return_value.bucket.assert_called_with('bucket-b')
+        self.assertIs(blob, mock_storage_client.return_value.bucket.return_value.blob.return_value)
+
+    def test_local_backend_reads_with_mmap(self):
+        """Test lectura de un archivo local mapeado en memoria"""
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'catalogos'))
+            with open(os.path.join(root, 'catalogos', 'a.csv'), 'w', encoding='utf-8', newline='') as f:
+                f.write("sku,name\nSKU1,Café\nSKU2,Té\n")
+
+            blob = LocalStorageBackend(root).get_blob('catalogos', 'a.csv')
+            with blob.open('rb') as raw:
+                self.assertIsInstance(raw, MmapReader)
+            with open_csv_stream(blob) as stream:
+                rows = list(csv.DictReader(stream))
+
+        self.assertEqual([row['name'] for row in rows], ['Café', 'Té'])
+
+    def test_local_backend_empty_file(self):
+        """Test que un archivo vacío se puede abrir"""
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'catalogos'))
+            open(os.path.join(root, 'catalogos', 'vacio.csv'), 'w').close()
+
+            blob = LocalStorageBackend(root).get_blob('catalogos', 'vacio.csv')
+            with open_csv_stream(blob) as stream:
+                self.assertEqual(list(csv.DictReader(stream)), [])
+
+    def test_local_backend_rejects_paths_outside_root(self):
+        """Test que no se permiten rutas fuera del directorio raíz"""
+        with tempfile.TemporaryDirectory() as root:
+            backend = LocalStorageBackend(root)
+            with self.assertRaises(ValueError):
+                backend.get_blob('catalogos', '../../etc/passwd')
+            with self.assertRaises(FileNotFoundError):
+                backend.get_blob('catalogos', 'no-existe.csv')
+
+    def test_local_backend_upload_creates_directories(self):
+        """Test que subir un archivo local crea los directorios intermedios"""
+        with tempfile.TemporaryDirectory() as root:
+            backend = LocalStorageBackend(root)
+            backend.upload('catalogos', 'rejects/a.csv', io.BytesIO("sku\nSKU1\n".encode('utf-8')))
+
+            self.assertEqual(backend.get_blob('catalogos', 'rejects/a.csv').download_as_text(), "sku\nSKU1\n")
+            with self.assertRaises(ValueError):
+                backend.upload('catalogos', '../../fuera.csv', io.BytesIO(b''))
+
+    def test_in_memory_backend(self):
+        """Test backend en memoria"""
+        backend = InMemoryStorageBackend()
+        backend.put('test-bucket', 'a.csv', "sku\nSKU1\n", generation=3)
+
+        blob = backend.get_blob('test-bucket', 'a.csv')
+
+        self.assertEqual(blob.generation, 3)
+        self.assertEqual(blob.download_as_text(), "sku\nSKU1\n")
+        with self.assertRaises(FileNotFoundError):
+            backend.get_blob('test-bucket', 'b.csv')
+
+    def test_shared_backend_from_config(self):
+        """Test selección del backend compartido según la configuración"""
+        with patch('app.services.storage_backends.Config.STORAGE_BACKEND', 'memory'):
+            backend = get_storage_backend()
+            self.assertIsInstance(backend, InMemoryStorageBackend)
+            self.assertIs(get_storage_backend(), backend)
+
+        with self.assertRaises(ValueError):
+            create_storage_backend('ftp')
+
+    def test_incomplete_backend_fails_on_creation(self):
+        """Test que un backend sin upload no se puede instanciar"""
+        class ReadOnlyBackend(StorageBackend):
+            def get_blob(self, bucket_name, filename):
+                return None
+
+        with self.assertRaises(TypeError):
+            ReadOnlyBackend()
+
+if __name__ == '__main__':
+    unittest.main()
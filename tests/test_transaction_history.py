@@ -0,0 +1,90 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.models import Product, InventoryItem, InventoryTransaction
+from app.services.pagination import MAX_PAGE_LIMIT
+from tests.base import DatabaseTestCase, add_warehouses
+
+class TestTransactionHistory(DatabaseTestCase):
+    """Historial de movimientos por /api/inventory/transactions contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        add_warehouses(1, 2)
+        db.session.add(Product(id=1, manufacturer_id=1, name="Producto", sku="SKU1", unit_price=1))
+        db.session.add(InventoryItem(id=1, product_id=1, warehouse_id=1, quantity=10))
+        db.session.add(InventoryItem(id=2, product_id=1, warehouse_id=2, quantity=10))
+        # Fechas repetidas para que el desempate por id importe
+        for i in range(1, 9):
+            db.session.add(InventoryTransaction(id=i, inventory_item_id=1 if i % 2 else 2,
+                                                transaction_type='IN' if i < 5 else 'ADJUSTMENT',
+                                                quantity=i, transaction_date=1000 + i // 3, user_id=1))
+        db.session.commit()
+
+    def _walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            body = response.get_json()
+            pages.append([int(row['id']) for row in body['data']])
+            url = body['links']['next']
+        return pages
+
+    def test_walks_newest_first(self):
+        """Test que el historial recorre (transaction_date, id) de más nuevo a más antiguo sin repetir"""
+        pages = self._walk('/api/inventory/transactions?page[limit]=3')
+
+        expected = sorted(range(1, 9), key=lambda i: (1000 + i // 3, i), reverse=True)
+        self.assertEqual(pages, [expected[:3], expected[3:6], expected[6:]])
+
+        body = self.client.get('/api/inventory/transactions?page[limit]=1').get_json()
+        self.assertEqual(body['data'][0]['attributes']['transaction_date'], 1002)
+        self.assertEqual(body['data'][0]['relationships']['inventory_item']['data']['id'], "2")
+
+        pages = self._walk('/api/inventory/transactions?sort=transaction_date&page[limit]=5')
+        self.assertEqual(sum(pages, []), list(reversed(expected)))
+
+    def test_filters(self):
+        """Test que se filtra por item, bodega, tipo y rango de fechas"""
+        def ids(query):
+            return sum(self._walk(f'/api/inventory/transactions?{query}'), [])
+
+        self.assertEqual(ids('inventory_item_id=1'), [7, 5, 3, 1])
+        self.assertEqual(ids('warehouse_id=2'), [8, 6, 4, 2])
+        self.assertEqual(ids('transaction_type=ADJUSTMENT&warehouse_id=1'), [7, 5])
+        self.assertEqual(ids('transaction_type=IN&transaction_type=ADJUSTMENT&date_from=1001&date_to=1001'), [5, 4, 3])
+
+    def test_item_history_uses_index(self):
+        """Test que el historial de un item sale ordenado del índice, sin ordenar en memoria"""
+        statements = []
+        listener = lambda *args: statements.append((args[2], args[3]))
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self.client.get('/api/inventory/transactions?inventory_item_id=1&page[limit]=2')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        sql, params = next((sql, params) for sql, params in statements if 'FROM inventory_transactions' in sql)
+        plan = ' '.join(row[-1] for row in db.session.connection().exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {sql}', tuple(params)
+        ))
+        self.assertIn('ix_inventory_transactions_item_date_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_page_limit_out_of_range(self):
+        """Test que page[limit] menor que 1 o mayor que el máximo devuelve 400"""
+        for limit in (0, -5, MAX_PAGE_LIMIT + 1):
+            response = self.client.get(f'/api/inventory/transactions?page[limit]={limit}')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json(), {"error": f"page[limit] must be between 1 and {MAX_PAGE_LIMIT}"})
+        self.assertEqual(len(self.client.get(f'/api/inventory/transactions?page[limit]={MAX_PAGE_LIMIT}')
+                             .get_json()['data']), 8)
+
+    def test_invalid_sort_and_cursor(self):
+        """Test que un orden no admitido o un cursor inválido devuelven 400"""
+        self.assertEqual(self.client.get('/api/inventory/transactions?sort=id').status_code, 400)
+        self.assertEqual(self.client.get('/api/inventory/transactions?page[cursor]=%%%').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from app.services.ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_get_and_stats(self):
+        """Test aciertos y fallos"""
+        self.cache.set('a', 1)
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+
+    def test_expired_entries_are_dropped(self):
+        """Test expiración por tiempo"""
+        self.cache.set('a', 1)
+        self.clock.now = 11
+
+        self.assertNotIn('a', self.cache)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        """Test que se desaloja la entrada usada hace más tiempo"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertIn('a', self.cache)
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_delete_and_clear(self):
+        """Test invalidación explícita"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.delete('a')
+        self.assertNotIn('a', self.cache)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from sqlalchemy import event, text
+from app import db
+from app.models import InventoryItem, ProductStockTotal, Warehouse, WarehouseStockTotal
+from tests.base import DatabaseTestCase, add_products, add_warehouses
+
+class TestWarehouseUtilization(DatabaseTestCase):
+    """Ocupación de bodegas por /api/inventory/utilization contra SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        for warehouse_id, country, capacity in ((1, "CO", 100), (2, "CO", 200), (3, "MX", 50), (4, "MX", 0)):
+            add_warehouses(warehouse_id, country=country, capacity=capacity)
+        add_products(1, 2)
+        db.session.add_all([
+            InventoryItem(id=1, product_id=1, warehouse_id=1, quantity=60),
+            InventoryItem(id=2, product_id=2, warehouse_id=1, quantity=35),
+            InventoryItem(id=3, product_id=1, warehouse_id=2, quantity=20),
+            InventoryItem(id=4, product_id=2, warehouse_id=2, quantity=0)
+        ])
+        db.session.commit()
+
+    def _warehouses(self, query=''):
+        response = self.client.get(f'/api/inventory/utilization/warehouses{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['id']: row['utilization'] for row in response.get_json()['warehouses']}
+
+    def test_utilization_per_warehouse(self):
+        """Test que la ocupación sale de los contadores, incluidas las bodegas vacías"""
+        response = self.client.get('/api/inventory/utilization/warehouses?country=CO')
+        rows = response.get_json()['warehouses']
+        self.assertEqual([(row['id'], row['total_quantity'], row['item_count'], row['items_in_stock'],
+                           row['utilization']) for row in rows], [(1, 95, 2, 2, 95.0), (2, 20, 2, 1, 10.0)])
+        self.assertEqual(self._warehouses(), {1: 95.0, 2: 10.0, 3: 0.0, 4: None})
+
+    def test_thresholds_follow_writes(self):
+        """Test que los umbrales filtran y reflejan las escrituras sin sumar inventory_items"""
+        self.assertEqual(self._warehouses('?min_utilization=90'), {1: 95.0})
+
+        db.session.add(InventoryItem(id=5, product_id=1, warehouse_id=3, quantity=48))
+        item = db.session.get(InventoryItem, 1)
+        item.quantity = 50
+        db.session.commit()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self.assertEqual(self._warehouses('?min_utilization=90'), {3: 96.0})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertFalse(any('FROM inventory_items' in sql for sql in statements))
+
+        self.assertEqual(self._warehouses('?min_utilization=10&max_utilization=85'), {1: 85.0, 2: 10.0})
+        self.assertEqual(db.session.get(WarehouseStockTotal, 3).total_quantity, 48)
+
+    def test_utilization_per_country(self):
+        """Test que la ocupación por país suma existencias y capacidades de sus bodegas"""
+        body = self.client.get('/api/inventory/utilization/countries').get_json()
+        self.assertEqual(body['countries'], [
+            {"country": "CO", "warehouses": 2, "capacity": 300, "total_quantity": 115, "utilization": 38.33},
+            {"country": "MX", "warehouses": 2, "capacity": 50, "total_quantity": 0, "utilization": 0.0}
+        ])
+
+        body = self.client.get('/api/inventory/utilization/countries?min_utilization=30').get_json()
+        self.assertEqual([row['country'] for row in body['countries']], ["CO"])
+
+    def test_invalid_thresholds(self):
+        """Test que un umbral no numérico o negativo devuelve 400"""
+        self.assertEqual(self.client.get('/api/inventory/utilization/warehouses?min_utilization=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/inventory/utilization/countries?max_utilization=-1').status_code, 400)
+
+    def test_delete_stocked_warehouse(self):
+        """Test que borrar una bodega con items borra su fila de totales y descuenta los productos"""
+        db.session.execute(text("PRAGMA foreign_keys=ON"))
+        db.session.delete(db.session.get(Warehouse, 1))
+        db.session.commit()
+
+        self.assertEqual(sorted(row.warehouse_id for row in db.session.query(WarehouseStockTotal)), [2])
+        self.assertEqual({row.product_id: row.total_quantity for row in db.session.query(ProductStockTotal)},
+                         {1: 20, 2: 0})
+        self.assertEqual(self._warehouses(), {2: 10.0, 3: 0.0, 4: None})
+
+if __name__ == '__main__':
+    unittest.main()